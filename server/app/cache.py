@@ -0,0 +1,105 @@
+"""Process-wide card catalog cache holding pre-serialized JSON.
+
+The card table only changes on admin edits and imports, so each worker keeps
+every card as ready-to-send JSON bytes keyed by id. Mutating repository
+methods bump ``CatalogState.card_revision`` in the same transaction; readers
+compare that single-row counter with the revision their cache was built from
+and reload the catalog when another request or worker has changed it.
+"""
+
+import json
+from bisect import bisect_right
+from typing import Awaitable, Callable, Iterable
+
+from fastapi import Request, Response
+from sqlmodel import Session, select
+
+from app.models import Card, CardRead, CatalogState
+
+_CARD_FIELDS = tuple(CardRead.__fields__)
+
+
+def encode_json(payload) -> bytes:
+    """Encode like FastAPI's ``JSONResponse`` so cached and uncached bodies match."""
+
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def read_catalog_revisions(session: Session) -> tuple[int, int]:
+    row = session.exec(
+        select(CatalogState.card_revision, CatalogState.deck_revision).where(CatalogState.id == 1)
+    ).first()
+    return (row[0], row[1]) if row else (0, 0)
+
+
+async def etag_response(
+    request: Request,
+    etag: str,
+    render: Callable[[], Awaitable[bytes | tuple[bytes, dict[str, str]]]],
+) -> Response:
+    """Answer ``If-None-Match`` hits with ``304`` and only render the body on a miss.
+
+    ``render`` is awaited and may also return ``(body, headers)`` to add headers
+    such as the next-page cursor that are only known once the body has been built.
+    """
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    candidates = request.headers.get("if-none-match")
+    if candidates:
+        tags = {tag.strip() for tag in candidates.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=304, headers=headers)
+    body = await render()
+    if isinstance(body, tuple):
+        body, extra_headers = body
+        headers.update(extra_headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+class CatalogCache:
+    """Catalog snapshot swapped atomically as one ``(stamp, ordered ids, cards)`` tuple."""
+
+    def __init__(self):
+        self._snapshot: tuple[tuple[str, int] | None, list[int], dict[int, bytes]] = (None, [], {})
+
+    def invalidate(self) -> None:
+        self._snapshot = (None, [], {})
+
+    def _current(self, session: Session) -> tuple[list[int], dict[int, bytes]]:
+        # Read the revision before the rows: if a writer commits in between, the cache
+        # is stamped with the older revision and simply reloads on the next request.
+        stamp = (str(session.get_bind().url), read_catalog_revisions(session)[0])
+        cached_stamp, ordered_ids, cards = self._snapshot
+        if stamp == cached_stamp:
+            return ordered_ids, cards
+        rows = session.connection().execute(
+            select(*(getattr(Card, field) for field in _CARD_FIELDS)).order_by(Card.id)
+        )
+        cards = {row.id: encode_json(dict(row._mapping)) for row in rows}
+        ordered_ids = list(cards)
+        self._snapshot = (stamp, ordered_ids, cards)
+        return ordered_ids, cards
+
+    def page(
+        self, session: Session, limit: int, offset: int, after: int | None = None
+    ) -> tuple[bytes, int | None]:
+        """Return a page body and its last id when the page is full.
+
+        ``after`` seeks past a card id with a binary search over the id-ordered
+        catalog, so deep pages cost the same as the first one.
+        """
+
+        ordered_ids, cards = self._current(session)
+        start = offset if after is None else bisect_right(ordered_ids, after)
+        page_ids = ordered_ids[start : start + limit]
+        body = b"[" + b",".join(cards[card_id] for card_id in page_ids) + b"]"
+        return body, page_ids[-1] if len(page_ids) == limit else None
+
+    def cards_json(self, session: Session, card_ids: Iterable[int]) -> list[bytes]:
+        """Return cached JSON for the given ids in id order, skipping unknown ids."""
+
+        _, cards = self._current(session)
+        return [cards[card_id] for card_id in sorted(set(card_ids)) if card_id in cards]
+
+
+catalog_cache = CatalogCache()
@@ -0,0 +1,58 @@
+"""Test database selection.
+
+Tests use a throwaway SQLite file by default. Set ``TEST_DATABASE_URL`` to a
+SQLAlchemy URL for a disposable database (e.g. a local PostgreSQL container) to
+run the suite against that server instead; its tables are dropped before each
+test. Tests marked ``sqlite_only`` inspect SQLite internals and are skipped then.
+"""
+
+import os
+import sys
+
+import pytest
+from sqlalchemy import MetaData, create_engine, make_url
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "sqlite_only: needs a SQLite file database")
+
+
+def pytest_collection_modifyitems(config, items):
+    if not TEST_DATABASE_URL:
+        return
+    skip = pytest.mark.skip(reason="SQLite-specific; TEST_DATABASE_URL is set")
+    for item in items:
+        if "sqlite_only" in item.keywords:
+            item.add_marker(skip)
+
+
+def _drop_all_tables(value: str) -> None:
+    url = make_url(value)
+    if url.drivername == "postgresql+asyncpg":
+        # The reset runs synchronously; app.db pairs asyncpg with psycopg the same way.
+        url = url.set(drivername="postgresql+psycopg")
+    engine = create_engine(url)
+    try:
+        with engine.begin() as connection:
+            metadata = MetaData()
+            metadata.reflect(connection)
+            metadata.drop_all(connection)
+    finally:
+        engine.dispose()
+
+
+@pytest.fixture()
+def database_url(tmp_path):
+    """``DATABASE_URL`` for one test: a fresh SQLite file or the emptied test server."""
+
+    if not TEST_DATABASE_URL:
+        yield str(tmp_path / "test.db")
+        return
+    _drop_all_tables(TEST_DATABASE_URL)
+    yield TEST_DATABASE_URL
+    # Reloading app.db builds a new engine per test; release the old one's server connections.
+    db = sys.modules.get("app.db")
+    if db is not None:
+        db.engine.dispose()
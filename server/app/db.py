@@ -1,131 +1,114 @@
-from collections.abc import Generator
-from contextlib import contextmanager
+from collections.abc import AsyncGenerator, Generator
+from contextlib import asynccontextmanager, contextmanager
 from pathlib import Path
 
-from sqlalchemy.exc import DatabaseError, OperationalError
-from sqlalchemy import inspect, text
-from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import URL, event, make_url
+from sqlalchemy.exc import DatabaseError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlmodel import Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app import models  # noqa: F401  Ensure models are registered with SQLModel metadata
 
-from app.config import get_settings
+from app import querylog
+from app.config import Settings, get_settings
+from app.metrics import instrument_engine
+from app.migrations import migrate
 
 
-def _build_engine():
-    settings = get_settings()
-    db_path = Path(settings.database_url)
-    if db_path.parent and not db_path.parent.exists():
-        db_path.parent.mkdir(parents=True, exist_ok=True)
-    return create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+def sqlite_pragmas(settings: Settings) -> list[str]:
+    if settings.database_profile != "tuned":
+        return []
+    return [
+        f"PRAGMA journal_mode={settings.sqlite_journal_mode}",
+        f"PRAGMA synchronous={settings.sqlite_synchronous}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size={settings.sqlite_cache_size}",
+    ]
 
 
-engine = _build_engine()
+def resolve_database_url(value: str) -> URL:
+    """Parse ``DATABASE_URL``: full SQLAlchemy URLs pass through, bare paths are SQLite files."""
 
-
-def _table_has_column(table_name: str, column_name: str) -> bool:
-    with engine.connect() as connection:
-        result = connection.exec_driver_sql(f"PRAGMA table_info('{table_name}')")
-        for row in result.fetchall():
-            if row[1] == column_name:
-                return True
-    return False
+    if "://" in value:
+        return make_url(value)
+    db_path = Path(value)
+    if db_path.parent and not db_path.parent.exists():
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+    return make_url(f"sqlite:///{db_path}")
 
 
-def _add_missing_max_spectators_column() -> None:
-    if _table_has_column("room", "max_spectators"):
-        return
+# The request path uses an async engine on the same database. URLs may name either kind of
+# driver; each engine swaps in its counterpart (postgresql+psycopg already does both).
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+_SYNC_DRIVERS = {"sqlite+aiosqlite": "sqlite", "postgresql+asyncpg": "postgresql+psycopg"}
 
-    with engine.begin() as connection:
-        try:
-            connection.exec_driver_sql(
-                "ALTER TABLE room ADD COLUMN max_spectators INTEGER NOT NULL DEFAULT 0"
-            )
-        except OperationalError as error:
-            # If a concurrent worker already added the column between the check above
-            # and this statement, ignore the duplicate-column error so startup
-            # continues for all processes.
-            message = str(getattr(error, "orig", error)).lower()
-            if "duplicate column name" not in message:
-                raise
-
-
-def _ensure_card_resource_columns() -> None:
-    inspector = inspect(engine)
-    card_columns = {column_info["name"] for column_info in inspector.get_columns("card")}
-    resource_columns = {"time", "reputation", "discipline", "documents", "technology"}
-    missing = resource_columns - card_columns
-    if not missing:
-        return
 
-    for column_name in sorted(missing):
-        with engine.begin() as connection:
-            connection.execute(
-                text(
-                    "ALTER TABLE card "
-                    f"ADD COLUMN {column_name} INTEGER NOT NULL DEFAULT 0"
-                )
-            )
-def _apply_migrations() -> None:
-    inspector = inspect(engine)
-    room_columns = {column_info["name"] for column_info in inspector.get_columns("room")}
-
-    if "max_spectators" not in room_columns:
-        with engine.begin() as connection:
-            connection.execute(
-                text(
-                    "ALTER TABLE room "
-                    "ADD COLUMN max_spectators INTEGER NOT NULL DEFAULT 0"
-                )
-            )
-
-    if "status" not in room_columns:
-        with engine.begin() as connection:
-            connection.execute(
-                text(
-                    "ALTER TABLE room "
-                    "ADD COLUMN status VARCHAR NOT NULL DEFAULT 'active'"
-                )
-            )
-    _ensure_card_resource_columns()
+def _build_engine(database_url: str, asynchronous: bool = False):
+    settings = get_settings()
+    url = resolve_database_url(database_url)
+    drivers = _ASYNC_DRIVERS if asynchronous else _SYNC_DRIVERS
+    url = url.set(drivername=drivers.get(url.drivername, url.drivername))
+    is_sqlite = url.get_backend_name() == "sqlite"
+    built = (create_async_engine if asynchronous else create_engine)(
+        url,
+        connect_args={"check_same_thread": False} if is_sqlite else {},
+        poolclass=AsyncAdaptedQueuePool if asynchronous else QueuePool,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_timeout=settings.database_pool_timeout,
+    )
+    instrument_engine(built.sync_engine if asynchronous else built)
+    if querylog.enabled(settings):
+        querylog.install(built.sync_engine if asynchronous else built, settings.sql_slow_query_ms)
+    pragmas = sqlite_pragmas(settings) if is_sqlite else []
+    if pragmas:
+
+        @event.listens_for(built.sync_engine if asynchronous else built, "connect")
+        def _apply_pragmas(dbapi_connection, _connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return built
+
+
+engine = _build_engine(get_settings().database_url)
+# ``None`` unless DATABASE_READ_URL is set; repositories then read from the primary.
+_read_url = get_settings().database_read_url
+read_engine = _build_engine(_read_url) if _read_url else None
+async_engine = _build_engine(get_settings().database_url, asynchronous=True)
+async_read_engine = _build_engine(_read_url, asynchronous=True) if _read_url else None
 
 
 def init_db() -> None:
     try:
-        SQLModel.metadata.create_all(engine)
+        migrate(engine)
     except DatabaseError as error:
-        if not _recreate_malformed_deck(error):
+        if not _discard_malformed_database(error):
             raise
-    _migrate_password_hash_column()
+        migrate(engine)
 
 
-def _recreate_malformed_deck(error: DatabaseError) -> bool:
+def _discard_malformed_database(error: DatabaseError) -> bool:
     message = str(getattr(error, "orig", error)).lower()
-    if "malformed database schema (deck)" not in message:
+    if "malformed database schema (deck)" not in message or engine.url.get_backend_name() != "sqlite":
         return False
 
-    db_path = Path(get_settings().database_url)
+    engine.dispose()
+    db_path = Path(engine.url.database)
     if db_path.exists():
         db_path.unlink()
-
-    SQLModel.metadata.create_all(engine)
     return True
 
 
-def _migrate_password_hash_column() -> None:
-    inspector = inspect(engine)
-    columns = {column["name"] for column in inspector.get_columns("user")}
-    if "password_hash" not in columns:
-        with engine.begin() as connection:
-            connection.execute(text("ALTER TABLE user ADD COLUMN password_hash VARCHAR"))
-    if "role" not in columns:
-        with engine.begin() as connection:
-            connection.execute(
-                text("ALTER TABLE user ADD COLUMN role VARCHAR NOT NULL DEFAULT 'guest'")
-            )
-    _add_missing_max_spectators_column()
-    _apply_migrations()
-
-
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     session = Session(engine)
@@ -142,3 +125,51 @@ def session_scope() -> Generator[Session, None, None]:
 def get_session() -> Generator[Session, None, None]:
     with session_scope() as session:
         yield session
+
+
+@contextmanager
+def read_session_scope() -> Generator[Session, None, None]:
+    """Read-only session on the replica, or on the primary when no replica is configured."""
+
+    session = Session(read_engine or engine)
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def get_read_session() -> Generator[Session | None, None, None]:
+    if read_engine is None:
+        yield None
+        return
+    with read_session_scope() as session:
+        yield session
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncGenerator[AsyncSession, None]:
+    session = AsyncSession(async_engine)
+    try:
+        yield session
+        # Requests that never touched the database (token auth, cached pages) skip the commit round-trip.
+        if session.in_transaction():
+            await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+@asynccontextmanager
+async def async_read_session_scope() -> AsyncGenerator[AsyncSession | None, None]:
+    """Async session on the replica, or ``None`` when no replica is configured."""
+
+    if async_read_engine is None:
+        yield None
+        return
+    session = AsyncSession(async_read_engine)
+    try:
+        yield session
+    finally:
+        await session.close()
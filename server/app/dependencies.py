@@ -1,17 +1,35 @@
+from collections.abc import AsyncGenerator
+
 from fastapi import Depends, HTTPException, Request, status
 
 from app.config import get_settings
-from app.db import get_session
-from app.repository import Repository
+from app.db import async_read_session_scope, async_session_scope
+from app.events import RoomEventHub, event_hub
+from app.game import GameEngine, game_engine
+from app.repository import AsyncRepository
 from app.models import Provider, Role, UserRead
+from app.sessions import session_tokens
+
+# Dependencies are ``async def`` even when they do not await: FastAPI runs plain
+# ``def`` dependencies on the threadpool, one hop per dependency per request.
 
 
-def get_settings_dep():
+async def get_settings_dep():
     return get_settings()
 
 
-def get_repository(session=Depends(get_session)) -> Repository:
-    return Repository(session)
+async def get_event_hub() -> RoomEventHub:
+    return event_hub
+
+
+async def get_game_engine() -> GameEngine:
+    return game_engine
+
+
+async def get_repository() -> AsyncGenerator[AsyncRepository, None]:
+    # One dependency owns the request's sessions; the repository is a thin per-request wrapper around them.
+    async with async_session_scope() as session, async_read_session_scope() as read_session:
+        yield AsyncRepository(session, read_session)
 
 
 def _extract_user_id(request: Request) -> str:
@@ -21,14 +39,31 @@ def _extract_user_id(request: Request) -> str:
     return user_id
 
 
-def get_current_user(request: Request, repo: Repository = Depends(get_repository)) -> UserRead:
+def _extract_bearer_token(request: Request) -> str | None:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    return token.strip()
+
+
+async def get_bearer_token(request: Request) -> str | None:
+    return _extract_bearer_token(request)
+
+
+async def get_current_user(
+    request: Request, repo: AsyncRepository = Depends(get_repository)
+) -> UserRead:
+    token = _extract_bearer_token(request)
+    if token:
+        # Signed session tokens carry the role, so no database or bcrypt work is needed.
+        return session_tokens.verify(token)
     user_id = _extract_user_id(request)
-    user = repo.get_user(user_id)
+    user = await repo.get_user(user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unknown user")
     if user.role == Role.ADMIN and user.provider == Provider.GUEST:
         password = request.headers.get("X-User-Password")
-        if not password or not repo.verify_guest_password(user_id, password):
+        if not password or not await repo.verify_guest_password(user_id, password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials",
@@ -36,7 +71,7 @@ def get_current_user(request: Request, repo: Repository = Depends(get_repository
     return user
 
 
-def get_active_user(current_user: UserRead = Depends(get_current_user)) -> UserRead:
+async def get_active_user(current_user: UserRead = Depends(get_current_user)) -> UserRead:
     if current_user.role == Role.GUEST:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -45,7 +80,7 @@ def get_active_user(current_user: UserRead = Depends(get_current_user)) -> UserR
     return current_user
 
 
-def get_admin_user(current_user: UserRead = Depends(get_current_user)) -> UserRead:
+async def get_admin_user(current_user: UserRead = Depends(get_current_user)) -> UserRead:
     if current_user.role != Role.ADMIN:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -54,8 +89,13 @@ def get_admin_user(current_user: UserRead = Depends(get_current_user)) -> UserRe
     return current_user
 
 
-def get_optional_user(request: Request, repo: Repository = Depends(get_repository)) -> UserRead | None:
+async def get_optional_user(
+    request: Request, repo: AsyncRepository = Depends(get_repository)
+) -> UserRead | None:
+    token = _extract_bearer_token(request)
+    if token:
+        return session_tokens.verify(token)
     user_id = request.headers.get("X-User-Id")
     if not user_id:
         return None
-    return repo.get_user(user_id)
+    return await repo.get_user(user_id)
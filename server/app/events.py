@@ -0,0 +1,117 @@
+"""In-process pub/sub hub that fans room events out to WebSocket subscribers.
+
+Events are encoded to compact JSON once per publish and pushed onto bounded
+per-subscriber queues, so an idle socket costs one small queue and a slow
+consumer can never grow memory: when its queue overflows it is emptied and
+sent a single ``resync`` event telling the client to refetch state over HTTP.
+"""
+
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+LOBBY_CHANNEL = ""
+DEFAULT_QUEUE_SIZE = 64
+_RESYNC_MESSAGE = json.dumps({"type": "resync"}, separators=(",", ":"))
+
+
+def encode_event(event: dict) -> str:
+    return json.dumps(event, separators=(",", ":"), default=str)
+
+
+class Subscription:
+    __slots__ = ("channel", "_queue")
+
+    def __init__(self, channel: str, queue_size: int):
+        self.channel = channel
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+
+    def push(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(_RESYNC_MESSAGE)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+
+class RoomEventHub:
+    """Channels are room codes; :data:`LOBBY_CHANNEL` carries public room summaries."""
+
+    def __init__(self, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._channels: dict[str, set[Subscription]] = defaultdict(set)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = threading.Lock()
+
+    def subscriber_count(self, channel: str | None = None) -> int:
+        if channel is not None:
+            return len(self._channels.get(channel, ()))
+        return sum(len(subscribers) for subscribers in self._channels.values())
+
+    def subscribe(self, channel: str) -> Subscription:
+        """Register a subscriber; must be called from the event loop serving the socket."""
+
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            subscription = Subscription(channel, self.queue_size)
+            self._channels[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._channels[subscription.channel]
+
+    def _deliver(self, channel: str, message: str) -> None:
+        for subscription in tuple(self._channels.get(channel, ())):
+            subscription.push(message)
+
+    def publish(self, channel: str, event: dict) -> None:
+        """Fan an event out to a channel; safe to call from worker threads.
+
+        Sync route handlers run in the threadpool, so deliveries are handed to the
+        loop that owns the subscriber queues instead of touching them directly.
+        """
+
+        if not self._channels.get(channel):
+            return
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        message = encode_event(event)
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(channel, message)
+        else:
+            loop.call_soon_threadsafe(self._deliver, channel, message)
+
+
+event_hub = RoomEventHub()
+
+
+def room_event(room: dict, event_type: str, **fields) -> dict:
+    """Delta describing a room change; ``room`` is a ``RoomRead``-shaped mapping."""
+
+    return {
+        "type": event_type,
+        "room": room["code"],
+        "status": room["status"],
+        "players": room["player_count"],
+        "spectators": room["spectator_count"],
+        **fields,
+    }
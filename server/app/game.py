@@ -0,0 +1,273 @@
+"""Authoritative in-memory match state for rooms.
+
+Matches never touch the database once started: the deck is resolved into a
+compact :class:`CardCatalog` and each player's hand, workspace and resources
+are stored in ``array`` buffers of catalog indices, so a single worker can
+keep thousands of matches resident and apply moves in microseconds.
+"""
+
+import random
+import threading
+from array import array
+from typing import Any, Callable, Iterable, NamedTuple, Sequence
+
+from app.models import CardBase
+
+RESOURCE_KEYS = ("time", "reputation", "discipline", "documents", "technology")
+STARTING_RESOURCES = (1, 1, 1, 1, 1)
+MAX_HAND_SIZE = 8
+
+
+class GameError(Exception):
+    """Raised when a move is not allowed; ``code`` mirrors the web client's error codes."""
+
+    NOT_FOUND = "MATCH_NOT_FOUND"
+    ALREADY_STARTED = "MATCH_ALREADY_STARTED"
+    NOT_A_PLAYER = "NOT_A_PLAYER"
+    DECK_EMPTY = "DECK_EMPTY"
+    HAND_FULL = "HAND_FULL"
+    CARD_NOT_IN_HAND = "CARD_NOT_IN_HAND"
+    CARD_NOT_IN_WORKSPACE = "CARD_NOT_IN_WORKSPACE"
+    INVALID_SETUP = "INVALID_SETUP"
+
+    def __init__(self, code: str, message: str | None = None):
+        super().__init__(message or code)
+        self.code = code
+
+
+class CardCatalog:
+    """Card ids and resource effects for one deck, stored column-wise.
+
+    ``effects`` holds ``len(RESOURCE_KEYS)`` signed bytes per card so applying a
+    card is a slice read instead of an attribute lookup per resource.
+    """
+
+    __slots__ = ("card_ids", "effects", "_index")
+
+    def __init__(self, cards: Iterable[tuple[int, Sequence[int]]]):
+        self.card_ids = array("l")
+        self.effects = array("b")
+        self._index: dict[int, int] = {}
+        for card_id, effects in cards:
+            if card_id in self._index:
+                continue
+            if len(effects) != len(RESOURCE_KEYS):
+                raise GameError(GameError.INVALID_SETUP, "Card effects must cover every resource")
+            self._index[card_id] = len(self.card_ids)
+            self.card_ids.append(card_id)
+            self.effects.extend(effects)
+
+    @classmethod
+    def from_cards(cls, cards: Iterable[CardBase]) -> "CardCatalog":
+        return cls(
+            (card.id, tuple(getattr(card, key) for key in RESOURCE_KEYS)) for card in cards
+        )
+
+    def __len__(self) -> int:
+        return len(self.card_ids)
+
+    def index_of(self, card_id: int) -> int:
+        try:
+            return self._index[card_id]
+        except KeyError:
+            raise GameError(GameError.INVALID_SETUP, f"Card {card_id} is not in the catalog") from None
+
+    def effects_of(self, index: int) -> array:
+        width = len(RESOURCE_KEYS)
+        return self.effects[index * width : (index + 1) * width]
+
+
+class PlayerState:
+    __slots__ = ("user_id", "hand", "workspace", "resources")
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.hand = array("H")
+        self.workspace = array("H")
+        self.resources = array("i", STARTING_RESOURCES)
+
+
+class Match:
+    __slots__ = ("room_code", "catalog", "deck", "discard", "players", "_seats")
+
+    def __init__(
+        self,
+        room_code: str,
+        catalog: CardCatalog,
+        deck_card_ids: Sequence[int],
+        player_ids: Sequence[str],
+        seed: int | None = None,
+    ):
+        if not player_ids:
+            raise GameError(GameError.INVALID_SETUP, "A match needs at least one player")
+        if len(catalog) > 0xFFFF:
+            raise GameError(GameError.INVALID_SETUP, "Deck catalog is too large")
+        self.room_code = room_code
+        self.catalog = catalog
+        order = [catalog.index_of(card_id) for card_id in deck_card_ids]
+        random.Random(seed).shuffle(order)
+        # Cards are drawn from the end of the array, like the web client's deck.pop().
+        self.deck = array("H", order)
+        self.discard = array("H")
+        self.players = tuple(PlayerState(user_id) for user_id in player_ids)
+        self._seats = {player.user_id: seat for seat, player in enumerate(self.players)}
+
+    def player(self, user_id: str) -> PlayerState:
+        seat = self._seats.get(user_id)
+        if seat is None:
+            raise GameError(GameError.NOT_A_PLAYER, "User is not playing in this match")
+        return self.players[seat]
+
+    def _take(self, pile: array, card_id: int, missing_code: str) -> int:
+        try:
+            # A card outside this deck's catalog cannot be in any pile either.
+            index = self.catalog.index_of(card_id)
+            position = pile.index(index)
+        except (GameError, ValueError):
+            raise GameError(missing_code) from None
+        del pile[position]
+        return index
+
+    def draw(self, user_id: str) -> int:
+        player = self.player(user_id)
+        if not self.deck:
+            raise GameError(GameError.DECK_EMPTY)
+        if len(player.hand) >= MAX_HAND_SIZE:
+            raise GameError(GameError.HAND_FULL, f"Hand is limited to {MAX_HAND_SIZE} cards")
+        index = self.deck.pop()
+        player.hand.append(index)
+        return self.catalog.card_ids[index]
+
+    def play(self, user_id: str, card_id: int) -> None:
+        """Move a card from the player's hand to their workspace."""
+
+        player = self.player(user_id)
+        player.workspace.append(self._take(player.hand, card_id, GameError.CARD_NOT_IN_HAND))
+
+    def recall(self, user_id: str, card_id: int) -> None:
+        """Move a card from the workspace back to the hand."""
+
+        player = self.player(user_id)
+        if len(player.hand) >= MAX_HAND_SIZE:
+            raise GameError(GameError.HAND_FULL, f"Hand is limited to {MAX_HAND_SIZE} cards")
+        player.hand.append(self._take(player.workspace, card_id, GameError.CARD_NOT_IN_WORKSPACE))
+
+    def discard_card(self, user_id: str, card_id: int) -> None:
+        """Drop a card from the hand without applying its effects."""
+
+        player = self.player(user_id)
+        self.discard.append(self._take(player.hand, card_id, GameError.CARD_NOT_IN_HAND))
+
+    def promote(self, user_id: str, card_id: int) -> tuple[int, ...]:
+        """Resolve a workspace card: apply its effects to the player's resources and discard it."""
+
+        player = self.player(user_id)
+        index = self._take(player.workspace, card_id, GameError.CARD_NOT_IN_WORKSPACE)
+        resources = player.resources
+        for position, delta in enumerate(self.catalog.effects_of(index)):
+            resources[position] += delta
+        self.discard.append(index)
+        return tuple(resources)
+
+    def snapshot(self, viewer_id: str | None = None) -> dict:
+        """Public match state; only the viewer's own hand is revealed."""
+
+        card_ids = self.catalog.card_ids
+        players = []
+        hand: list[int] = []
+        for player in self.players:
+            players.append(
+                {
+                    "user_id": player.user_id,
+                    "hand_count": len(player.hand),
+                    "workspace": [card_ids[index] for index in player.workspace],
+                    "resources": dict(zip(RESOURCE_KEYS, player.resources)),
+                }
+            )
+            if player.user_id == viewer_id:
+                hand = [card_ids[index] for index in player.hand]
+        return {
+            "room_code": self.room_code,
+            "deck_count": len(self.deck),
+            "discard_count": len(self.discard),
+            "players": players,
+            "hand": hand,
+        }
+
+
+class MoveResult(NamedTuple):
+    """What a move returned, with the deck size and the mover's snapshot taken under the same lock."""
+
+    value: Any
+    deck_count: int
+    snapshot: dict
+
+
+class GameEngine:
+    """Process-wide registry of running matches keyed by room code.
+
+    Moves are short and CPU-only, so a single lock keeps the registry and match
+    mutations consistent across the request threadpool without measurable contention.
+    """
+
+    def __init__(self):
+        self._matches: dict[str, Match] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._matches)
+
+    def start(
+        self,
+        room_code: str,
+        cards: Iterable[CardBase],
+        deck_card_ids: Sequence[int],
+        player_ids: Sequence[str],
+        seed: int | None = None,
+        viewer_id: str | None = None,
+    ) -> MoveResult:
+        match = Match(room_code, CardCatalog.from_cards(cards), deck_card_ids, player_ids, seed)
+        with self._lock:
+            if room_code in self._matches:
+                raise GameError(GameError.ALREADY_STARTED, "A match is already running in this room")
+            self._matches[room_code] = match
+            return MoveResult(match, len(match.deck), match.snapshot(viewer_id))
+
+    def get(self, room_code: str) -> Match:
+        match = self._matches.get(room_code)
+        if match is None:
+            raise GameError(GameError.NOT_FOUND, "No match is running in this room")
+        return match
+
+    def end(self, room_code: str) -> None:
+        with self._lock:
+            self._matches.pop(room_code, None)
+
+    def _move(self, room_code: str, user_id: str, apply: Callable[[Match], Any]) -> MoveResult:
+        # Reading the deck size and snapshot after releasing the lock could race with end() or other moves.
+        with self._lock:
+            match = self.get(room_code)
+            value = apply(match)
+            return MoveResult(value, len(match.deck), match.snapshot(user_id))
+
+    def draw(self, room_code: str, user_id: str) -> MoveResult:
+        return self._move(room_code, user_id, lambda match: match.draw(user_id))
+
+    def play(self, room_code: str, user_id: str, card_id: int) -> MoveResult:
+        return self._move(room_code, user_id, lambda match: match.play(user_id, card_id))
+
+    def recall(self, room_code: str, user_id: str, card_id: int) -> MoveResult:
+        return self._move(room_code, user_id, lambda match: match.recall(user_id, card_id))
+
+    def discard(self, room_code: str, user_id: str, card_id: int) -> MoveResult:
+        return self._move(room_code, user_id, lambda match: match.discard_card(user_id, card_id))
+
+    def promote(self, room_code: str, user_id: str, card_id: int) -> MoveResult:
+        return self._move(room_code, user_id, lambda match: match.promote(user_id, card_id))
+
+    def snapshot(self, room_code: str, viewer_id: str | None = None) -> dict:
+        with self._lock:
+            return self.get(room_code).snapshot(viewer_id)
+
+
+game_engine = GameEngine()
@@ -0,0 +1,133 @@
+"""Bounded worker pool for password hashing and verification.
+
+bcrypt is deliberately slow and releases the GIL while it runs, so hashes are
+sent to a small dedicated thread pool instead of running on request threads or
+the event loop. Admission is bounded twice: ``queue_limit`` caps the jobs
+waiting or running across the process, and ``identity_limit`` caps them per
+user or login name, so one client retrying passwords cannot fill the queue for
+everyone else. Both limits reject with ``429 Too Many Requests`` straight away
+rather than letting callers pile up behind the pool.
+"""
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.config import get_settings
+
+RETRY_AFTER_SECONDS = 1
+
+
+class _Timing:
+    __slots__ = ("count", "total", "peak")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.peak = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.peak = max(self.peak, seconds)
+
+    def as_dict(self) -> dict:
+        return {"count": self.count, "sum": self.total, "max": self.peak}
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_limit: int, identity_limit: int):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.identity_limit = identity_limit
+        # CryptContext is thread-safe for hash/verify; build it once per process.
+        self._context = CryptContext(schemes=["bcrypt_sha256", "bcrypt", "scrypt"], deprecated="auto")
+        self._executor = self._new_executor()
+        self._lock = threading.Lock()
+        self._identities: Counter[str] = Counter()
+        self._queued = 0
+        self._running = 0
+        self._peak_depth = 0
+        self._rejected = 0
+        self._wait = _Timing()
+        self._hash = _Timing()
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        # Threads start on first use, so an idle pool costs nothing.
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+
+    def close(self) -> None:
+        """Finish queued jobs and stop the pool threads; a later job starts a fresh pool."""
+
+        with self._lock:
+            executor, self._executor = self._executor, self._new_executor()
+        executor.shutdown(wait=True)
+
+    def hash(self, identity: str, password: str) -> Future:
+        return self._submit(identity, self._context.hash, password)
+
+    def verify(self, identity: str, password: str, password_hash: str) -> Future:
+        return self._submit(identity, self._context.verify, password, password_hash)
+
+    def _submit(self, identity: str, operation, *args) -> Future:
+        with self._lock:
+            depth = self._queued + self._running
+            if depth >= self.queue_limit or self._identities[identity] >= self.identity_limit:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many password checks in progress; retry shortly",
+                    headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+                )
+            self._identities[identity] += 1
+            self._queued += 1
+            self._peak_depth = max(self._peak_depth, depth + 1)
+            executor = self._executor
+        return executor.submit(self._run, identity, time.perf_counter(), operation, *args)
+
+    def _run(self, identity: str, submitted: float, operation, *args):
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._wait.observe(started - submitted)
+        try:
+            return operation(*args)
+        finally:
+            # Released before the caller wakes, so a follow-up check for the same identity is admitted.
+            with self._lock:
+                self._running -= 1
+                self._identities[identity] -= 1
+                if not self._identities[identity]:
+                    del self._identities[identity]
+                self._hash.observe(time.perf_counter() - started)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "identity_limit": self.identity_limit,
+                "queued": self._queued,
+                "running": self._running,
+                "peak_depth": self._peak_depth,
+                "rejected": self._rejected,
+                "wait_seconds": self._wait.as_dict(),
+                "hash_seconds": self._hash.as_dict(),
+            }
+
+
+def _build_password_hasher() -> PasswordHasher:
+    settings = get_settings()
+    return PasswordHasher(
+        settings.password_hash_workers,
+        settings.password_hash_queue_limit,
+        settings.password_hash_identity_limit,
+    )
+
+
+password_hasher = _build_password_hasher()
@@ -0,0 +1,146 @@
+"""Process-wide cache of OAuth providers' signing keys (JWKS).
+
+Key sets are cached per URL for the response's ``Cache-Control: max-age``
+(less its ``Age``), or ``JWKS_CACHE_TTL_SECONDS`` when the provider sends none.
+Once a set is in the last fifth of its lifetime, the next lookup still answers
+from the cache and refreshes it on a background thread, so a busy worker never
+waits on a fetch for keys it already has. A token signed with an unknown ``kid``
+(the provider rotated keys) triggers one refetch, but no more often than every
+``JWKS_REFETCH_INTERVAL_SECONDS``. Fetches are single-flight per URL: concurrent
+logins that all miss wait on the same request instead of each starting one.
+"""
+
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future, wait
+from dataclasses import dataclass
+from typing import Callable
+
+import requests
+from fastapi import HTTPException, status
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT_S = 5
+REFRESH_AHEAD_FRACTION = 0.2
+_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class _KeySet:
+    keys: dict[str, dict]
+    fetched_at: float
+    expires_at: float
+
+    @property
+    def refresh_at(self) -> float:
+        return self.expires_at - (self.expires_at - self.fetched_at) * REFRESH_AHEAD_FRACTION
+
+
+def _key_lifetime(response: requests.Response, default_ttl: float, min_ttl: float) -> float:
+    match = _MAX_AGE.search(response.headers.get("Cache-Control", ""))
+    if not match:
+        return default_ttl
+    age = response.headers.get("Age", "0")
+    lifetime = int(match.group(1)) - (int(age) if age.isdigit() else 0)
+    # max-age=0 (or a tiny value) must not turn every login into a fetch.
+    return max(lifetime, min_ttl)
+
+
+class JWKSCache:
+    def __init__(
+        self,
+        default_ttl: float,
+        refetch_interval: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.default_ttl = default_ttl
+        self.refetch_interval = refetch_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._key_sets: dict[str, _KeySet] = {}
+        self._inflight: dict[str, Future] = {}
+
+    def get_key(self, url: str, kid: str | None, block: bool = True) -> dict | None:
+        """Return the key ``kid`` from ``url``'s key set, fetching it if needed.
+
+        With ``block=False`` only cached keys are returned (``None`` otherwise),
+        so async callers can skip the threadpool on the common path.
+        """
+
+        now = self._clock()
+        key_set = self._key_sets.get(url)
+        if key_set is not None and now < key_set.expires_at:
+            if now >= key_set.refresh_at:
+                self._refresh_in_background(url)
+            if kid in key_set.keys:
+                return key_set.keys[kid]
+            if now - key_set.fetched_at < self.refetch_interval:
+                return None
+        if not block:
+            return None
+        return self._fetch(url).keys.get(kid)
+
+    def close(self) -> None:
+        """Wait for in-flight fetches and drop the cached key sets; later lookups fetch again."""
+
+        with self._lock:
+            inflight = list(self._inflight.values())
+        wait(inflight, timeout=FETCH_TIMEOUT_S)
+        with self._lock:
+            self._key_sets.clear()
+
+    def _refresh_in_background(self, url: str) -> None:
+        with self._lock:
+            if url in self._inflight:
+                return
+            future = self._inflight[url] = Future()
+        threading.Thread(target=self._load, args=(url, future), name="jwks-refresh", daemon=True).start()
+
+    def _fetch(self, url: str) -> _KeySet:
+        with self._lock:
+            future = self._inflight.get(url)
+            owner = future is None
+            if owner:
+                future = self._inflight[url] = Future()
+        if owner:
+            self._load(url, future)
+        return future.result()
+
+    def _load(self, url: str, future: Future) -> None:
+        try:
+            key_set = self._request(url)
+        except Exception as exc:  # noqa: BLE001 - handed to every waiter
+            logger.warning("Fetching provider keys from %s failed: %s", url, exc)
+            future.set_exception(exc)
+        else:
+            with self._lock:
+                self._key_sets[url] = key_set
+            future.set_result(key_set)
+        finally:
+            with self._lock:
+                self._inflight.pop(url, None)
+
+    def _request(self, url: str) -> _KeySet:
+        try:
+            response = requests.get(url, timeout=FETCH_TIMEOUT_S)
+        except requests.RequestException:
+            response = None
+        if response is None or response.status_code != 200:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Unable to fetch provider keys")
+        fetched_at = self._clock()
+        keys = {jwk.get("kid"): jwk for jwk in response.json().get("keys", [])}
+        lifetime = _key_lifetime(response, self.default_ttl, self.refetch_interval)
+        return _KeySet(keys=keys, fetched_at=fetched_at, expires_at=fetched_at + lifetime)
+
+
+def _build_jwks_cache() -> JWKSCache:
+    settings = get_settings()
+    return JWKSCache(settings.jwks_cache_ttl_seconds, settings.jwks_refetch_interval_seconds)
+
+
+jwks_cache = _build_jwks_cache()
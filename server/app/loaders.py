@@ -1,12 +1,72 @@
+"""Startup loader for the card data in ``cards/*.json``.
+
+A file holds either one card (``CardBase``) or a deck import document
+(``DeckImport``: a deck plus its cards, like ``cards/sample-deck.json``). Files
+are read, hashed and parsed on a thread pool. The ``cardfile`` manifest keeps
+the SHA-256 of every file already applied, so a boot only applies new or
+changed files, all in the caller's transaction: single cards go through one
+bulk insert, and each deck file runs under a savepoint so that a bad file is
+reported without undoing the others. Cards that already exist with the same
+content are reused; a changed file updates the card or deck it created before.
+The manifest also lists the cards a deck file embeds, so editing one of them in
+the file updates that card in place instead of conflicting with it.
+"""
+
+import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Iterable
 
-from sqlmodel import Session
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session, delete, select
 
-from app.models import CardBase
+from app.models import Card, CardBase, CardFile, Deck, DeckImport
 from app.repository import Repository
 
+MAX_PARSE_WORKERS = 8
+
+
+@dataclass
+class FileOutcome:
+    name: str
+    status: str  # loaded, skipped or failed
+    reason: str = ""
+
+
+@dataclass
+class LoadReport:
+    outcomes: list[FileOutcome] = field(default_factory=list)
+
+    def _with_status(self, status: str) -> list[FileOutcome]:
+        return [outcome for outcome in self.outcomes if outcome.status == status]
+
+    @property
+    def loaded(self) -> list[FileOutcome]:
+        return self._with_status("loaded")
+
+    @property
+    def skipped(self) -> list[FileOutcome]:
+        return self._with_status("skipped")
+
+    @property
+    def failed(self) -> list[FileOutcome]:
+        return self._with_status("failed")
+
+    def summary(self) -> str:
+        return f"{len(self.loaded)} loaded, {len(self.skipped)} skipped, {len(self.failed)} failed"
+
+
+@dataclass
+class _ParsedFile:
+    name: str
+    sha256: str
+    document: CardBase | DeckImport | None = None
+    error: str = ""
+
 
 def _iter_card_files(base_path: Path) -> Iterable[Path]:
     if not base_path.exists():
@@ -14,16 +74,162 @@ def _iter_card_files(base_path: Path) -> Iterable[Path]:
     return sorted(path for path in base_path.glob("*.json") if path.is_file())
 
 
-def load_cards_from_disk(session: Session, cards_path: Path) -> int:
+def _parse_file(path: Path, known_sha256: str | None) -> _ParsedFile | None:
+    """Hash ``path`` and parse it unless the manifest already has this content (``None``)."""
+
+    raw = path.read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    if digest == known_sha256:
+        return None
+    parsed = _ParsedFile(path.name, digest)
+    try:
+        data = json.loads(raw)
+    except ValueError as exc:
+        parsed.error = f"invalid JSON: {exc}"
+        return parsed
+    model = DeckImport if isinstance(data, dict) and "deck" in data else CardBase
+    try:
+        parsed.document = model.parse_obj(data)
+    except ValidationError as exc:
+        first = exc.errors()[0]
+        location = ".".join(str(part) for part in first["loc"])
+        parsed.error = f"not a valid {'deck' if model is DeckImport else 'card'} file: {location}: {first['msg']}"
+    return parsed
+
+
+def _describe_failure(error: Exception) -> str:
+    if isinstance(error, HTTPException):
+        detail = error.detail
+        if isinstance(detail, dict) and detail.get("conflicts"):
+            names = ", ".join(conflict["name"] for conflict in detail["conflicts"])
+            return f"conflicts with existing cards: {names}"
+        return str(detail)
+    return str(error).splitlines()[0]
+
+
+def _apply_new_cards(
+    repo: Repository, files: list[_ParsedFile], report: LoadReport
+) -> list[tuple[_ParsedFile, CardFile]]:
+    if not files:
+        return []
+    imported = repo.bulk_import_cards([parsed.document for parsed in files])
+    applied = []
+    for parsed, result in zip(files, imported.results):
+        if result.status == "conflict":
+            report.outcomes.append(FileOutcome(parsed.name, "failed", f"{result.name}: {result.detail}"))
+        else:
+            applied.append((parsed, CardFile(name=parsed.name, sha256=parsed.sha256, kind="card", card_id=result.id)))
+    return applied
+
+
+def _apply_deck_cards(
+    repo: Repository, cards: list[CardBase], previous: CardFile | None, deck: Deck | None
+) -> list[int]:
+    """Resolve a deck file's embedded cards to ids, updating the cards it resolved to last time.
+
+    A card keeps its id when its name and category still match one of those
+    cards; the remaining edited cards take the remaining ids in file order, so a
+    renamed card is renamed in place. Manifest entries written before
+    ``card_ids`` was recorded only match by name and category among the deck's
+    cards. Cards left over are imported like any other.
+    """
+
+    known_ids = previous.card_ids if previous and previous.card_ids is not None else None
+    candidate_ids = known_ids if known_ids is not None else (deck.card_ids if deck else [])
+    fields = tuple(CardBase.__fields__)
+    stored = {}
+    if candidate_ids:
+        stored = {card.id: card for card in repo.session.exec(select(Card).where(Card.id.in_(set(candidate_ids))))}
+    by_key = {(card.name, card.category): card_id for card_id, card in stored.items()}
+
+    card_ids: list[int | None] = []
+    unmatched = []
+    for index, card in enumerate(cards):
+        card_id = by_key.get((card.name, card.category))
+        card_ids.append(card_id)
+        if card_id is None:
+            unmatched.append(index)
+    if known_ids is not None:
+        spare = [card_id for card_id in dict.fromkeys(known_ids) if card_id in stored and card_id not in card_ids]
+        for index, card_id in zip(unmatched, spare):
+            card_ids[index] = card_id
+
+    for card, card_id in zip(cards, card_ids):
+        if card_id is None:
+            continue
+        content = tuple(getattr(card, field) for field in fields)
+        if content != tuple(getattr(stored[card_id], field) for field in fields):
+            repo.update_card(card_id, card)
+    missing = [index for index, card_id in enumerate(card_ids) if card_id is None]
+    if missing:
+        imported = repo._import_cards_or_raise([cards[index] for index in missing])
+        for index, card_id in zip(missing, imported):
+            card_ids[index] = card_id
+    return card_ids
+
+
+def _apply_changed(repo: Repository, parsed: _ParsedFile, previous: CardFile | None) -> CardFile:
+    """Apply a deck file, or a card file seen before, updating what it created last time."""
+
+    entry = CardFile(name=parsed.name, sha256=parsed.sha256, kind="card")
+    if isinstance(parsed.document, CardBase):
+        if repo.session.get(Card, previous.card_id) is None:
+            # Deleted since the last load: add it again.
+            entry.card_id = repo._import_cards_or_raise([parsed.document])[0]
+        else:
+            entry.card_id = repo.update_card(previous.card_id, parsed.document).id
+        return entry
+    payload: DeckImport = parsed.document
+    deck = repo.session.get(Deck, previous.deck_id) if previous and previous.deck_id is not None else None
+    entry.kind = "deck"
+    entry.card_ids = _apply_deck_cards(repo, payload.cards, previous, deck)
+    card_ids = repo._resolve_import_card_ids(payload.deck.card_ids, entry.card_ids)
+    entry.deck_id = repo._save_imported_deck(deck, payload.deck, card_ids).id
+    return entry
+
+
+def _describe_loaded(entry: CardFile) -> str:
+    return f"card {entry.card_id}" if entry.kind == "card" else f"deck {entry.deck_id}"
+
+
+def load_cards_from_disk(session: Session, cards_path: Path, workers: int | None = None) -> LoadReport:
     repo = Repository(session)
-    loaded = 0
-    for file_path in _iter_card_files(cards_path):
+    report = LoadReport()
+    files = list(_iter_card_files(cards_path))
+    manifest = {row.name: row for row in session.exec(select(CardFile))}
+    stale = set(manifest) - {path.name for path in files}
+    if stale:
+        session.exec(delete(CardFile).where(CardFile.name.in_(sorted(stale))))
+    if not files:
+        return report
+
+    known = [manifest[path.name].sha256 if path.name in manifest else None for path in files]
+    with ThreadPoolExecutor(max_workers=workers or min(MAX_PARSE_WORKERS, len(files))) as pool:
+        parsed_files = list(pool.map(_parse_file, files, known))
+
+    new_cards: list[_ParsedFile] = []
+    changed: list[_ParsedFile] = []
+    for path, parsed in zip(files, parsed_files):
+        if parsed is None:
+            report.outcomes.append(FileOutcome(path.name, "skipped", "unchanged since last load"))
+        elif parsed.error:
+            report.outcomes.append(FileOutcome(parsed.name, "failed", parsed.error))
+        elif isinstance(parsed.document, CardBase) and getattr(manifest.get(parsed.name), "card_id", None) is None:
+            new_cards.append(parsed)
+        else:
+            changed.append(parsed)
+
+    applied = _apply_new_cards(repo, new_cards, report)
+    for parsed in changed:
         try:
-            payload = json.loads(file_path.read_text())
-            card = CardBase.parse_obj(payload)
-            repo.add_card(card)
-            loaded += 1
-        except Exception:
-            # Skip malformed entries but continue boot
-            continue
-    return loaded
+            with session.begin_nested():
+                applied.append((parsed, _apply_changed(repo, parsed, manifest.get(parsed.name))))
+        except (HTTPException, SQLAlchemyError) as exc:
+            report.outcomes.append(FileOutcome(parsed.name, "failed", _describe_failure(exc)))
+
+    for parsed, entry in applied:
+        session.merge(entry)
+        report.outcomes.append(FileOutcome(parsed.name, "loaded", _describe_loaded(entry)))
+    session.flush()
+    report.outcomes.sort(key=lambda outcome: outcome.name)
+    return report
@@ -1,17 +1,21 @@
+import asyncio
 import logging
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, RedirectResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 
 from app.config import get_settings
 
-from app.db import init_db, session_scope
+from app import metrics, querylog
+from app.db import async_engine, async_read_engine, engine, init_db, read_engine, session_scope
+from app.game import GameError
+from app.hashing import password_hasher
+from app.jwks import jwks_cache
 from app.loaders import load_cards_from_disk
 from app.repository import Repository
-from app.models import Card
 from app.routes import admin, auth, cards, rooms
 
 logger = logging.getLogger(__name__)
@@ -51,7 +55,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+if querylog.enabled(settings):
+    app.add_middleware(
+        querylog.QueryBudgetMiddleware, budget=settings.sql_request_budget, action=settings.sql_budget_action
+    )
 
 
 def _mount_frontend(directory: Path, route: str, name: str) -> bool:
@@ -67,6 +77,23 @@ def _mount_frontend(directory: Path, route: str, name: str) -> bool:
 
 client_web_mounted = _mount_frontend(client_web_dir, "/client-web", "client-web")
 
+_GAME_ERROR_STATUS = {
+    GameError.NOT_FOUND: 404,
+    GameError.NOT_A_PLAYER: 403,
+    GameError.ALREADY_STARTED: 409,
+}
+
+
+@app.exception_handler(GameError)
+def _game_error_handler(_: Request, error: GameError):
+    """Translate rejected match moves into client errors carrying the game error code."""
+
+    return JSONResponse(
+        status_code=_GAME_ERROR_STATUS.get(error.code, 400),
+        content={"detail": str(error), "code": error.code},
+    )
+
+
 app.include_router(auth.router)
 app.include_router(cards.router)
 app.include_router(admin.router)
@@ -126,15 +153,36 @@ def admin_index():
 @app.on_event("startup")
 def _startup():
     init_db()
-    cards_dir = Path(__file__).resolve().parents[2] / "cards"
     with session_scope() as session:
-        repo = Repository(session)
-        has_cards = session.query(Card).first() is not None
-        if not has_cards:
-            load_cards_from_disk(session, cards_dir)
-        repo.ensure_admin_user()
+        report = load_cards_from_disk(session, Path(settings.cards_path))
+        Repository(session).ensure_admin_user()
+    logger.info("Card files: %s", report.summary())
+    for outcome in report.failed:
+        logger.warning("Card file %s not loaded: %s", outcome.name, outcome.reason)
+
+
+@app.on_event("shutdown")
+async def _shutdown():
+    # Disposed engines close their pooled connections; a later checkout opens a new pool.
+    for async_pool in (async_engine, async_read_engine):
+        if async_pool is not None:
+            await async_pool.dispose()
+    # The sync disposals, the bcrypt pool and an in-flight key fetch can block, so keep them off the event loop.
+    for sync_pool in (engine, read_engine):
+        if sync_pool is not None:
+            await asyncio.to_thread(sync_pool.dispose)
+    await asyncio.to_thread(password_hasher.close)
+    await asyncio.to_thread(jwks_cache.close)
 
 
 @app.get("/health")
 def healthcheck():
     return {"status": "ok"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """Request, repository, pool and password-hash metrics of this worker in Prometheus text format."""
+
+    engines = {"primary": engine, "read": read_engine, "async": async_engine, "async_read": async_read_engine}
+    return PlainTextResponse(metrics.render_metrics(engines), media_type=metrics.CONTENT_TYPE)
@@ -0,0 +1,55 @@
+"""Command line maintenance tasks for the game database.
+
+Run from the ``server`` directory, for example::
+
+    python -m app.maintenance room-counters --verify
+"""
+
+import argparse
+import sys
+
+from app.db import init_db, session_scope
+from app.repository import Repository
+
+
+def room_counters(verify_only: bool) -> int:
+    with session_scope() as session:
+        repo = Repository(session)
+        if verify_only:
+            mismatches = repo.verify_room_counters()
+        else:
+            mismatches = repo.rebuild_room_counters()
+
+    for mismatch in mismatches:
+        print(
+            f"{mismatch['code']}: players {mismatch['player_count']} -> "
+            f"{mismatch['expected_player_count']}, spectators "
+            f"{mismatch['spectator_count']} -> {mismatch['expected_spectator_count']}"
+        )
+    action = "found" if verify_only else "repaired"
+    print(f"{len(mismatches)} room counter mismatch(es) {action}")
+    return 1 if verify_only and mismatches else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="JOJ Game database maintenance")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    counters = subcommands.add_parser(
+        "room-counters", help="Rebuild room occupancy counters from memberships"
+    )
+    counters.add_argument(
+        "--verify",
+        action="store_true",
+        help="Only report mismatches; exit with status 1 when any are found",
+    )
+
+    args = parser.parse_args(argv)
+    init_db()
+    if args.command == "room-counters":
+        return room_counters(args.verify)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+"""Process-local request, repository and database metrics in the Prometheus text format.
+
+``MetricsMiddleware`` times every HTTP request and labels it with the matched
+route template (``/rooms/{room_code}``, not the raw path) and status code;
+requests no API route matched, such as static files and 404s, share the
+``unmatched`` label so stray paths cannot grow the label set. Public
+``Repository`` methods are wrapped by :func:`instrument_repository_method` to
+record their duration and the SQL statements they issue, counted by a
+``before_cursor_execute`` hook that ``app.db`` attaches to every engine. Only
+the outermost repository call is recorded: a method called from another one
+adds its time and statements to its caller. ``GET /metrics`` renders these
+together with connection pool usage and the password-hash pool totals.
+
+Every worker process keeps its own numbers; scrape each worker, or run one.
+"""
+
+import threading
+import time
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, TypeVar
+
+from sqlalchemy import Engine, event
+
+from app.hashing import password_hasher
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "unmatched"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+T = TypeVar("T")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [per-bucket counts (not cumulative), sum, count]
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, labels: tuple = ()) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, labels)} {count}")
+        return lines
+
+
+http_request_duration = Histogram(
+    "joj_http_request_duration_seconds",
+    "HTTP request latency by route template and status, until the response body is sent.",
+    ("method", "route", "status"),
+)
+repository_call_duration = Histogram(
+    "joj_repository_call_duration_seconds",
+    "Duration of outermost Repository method calls.",
+    ("method",),
+)
+repository_sql_statements = Counter(
+    "joj_repository_sql_statements_total",
+    "SQL statements executed inside Repository method calls.",
+    ("method",),
+)
+sql_statements = Counter("joj_sql_statements_total", "SQL statements executed on any engine.")
+
+# Statement counter of the repository call running in this context, if any.
+_repository_call: ContextVar[list[int] | None] = ContextVar("repository_call", default=None)
+
+
+def _count_statement(*_args) -> None:
+    sql_statements.inc()
+    call = _repository_call.get()
+    if call is not None:
+        call[0] += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Count the statements run on a (sync) engine; pass ``async_engine.sync_engine`` for async ones."""
+
+    event.listen(engine, "before_cursor_execute", _count_statement)
+
+
+def instrument_repository_method(name: str, function: Callable[..., T]) -> Callable[..., T]:
+    @wraps(function)
+    def method(*args, **kwargs):
+        if _repository_call.get() is not None:
+            return function(*args, **kwargs)
+        statements = [0]
+        token = _repository_call.set(statements)
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _repository_call.reset(token)
+            repository_call_duration.observe((name,), time.perf_counter() - started)
+            repository_sql_statements.inc((name,), statements[0])
+
+    return method
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streamed responses pass through untouched and are timed to their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # FastAPI records the matched route in the (shared) scope while routing.
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            http_request_duration.observe((scope["method"], route, status_code), time.perf_counter() - started)
+
+
+def _pool_lines(engines: dict[str, object]) -> list[str]:
+    gauges = {
+        "joj_db_pool_size": ("Configured pool size.", lambda pool: pool.size()),
+        "joj_db_pool_checked_out": ("Connections currently in use.", lambda pool: pool.checkedout()),
+        "joj_db_pool_checked_in": ("Idle connections kept by the pool.", lambda pool: pool.checkedin()),
+        "joj_db_pool_overflow": (
+            "Connections open beyond pool_size (negative while below it).",
+            lambda pool: pool.overflow(),
+        ),
+    }
+    lines = []
+    for name, (documentation, read) in gauges.items():
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+        for engine_name, engine in engines.items():
+            if engine is not None and hasattr(engine.pool, "checkedout"):
+                lines.append(f'{name}{{engine="{engine_name}"}} {read(engine.pool)}')
+    return lines
+
+
+def _password_hash_lines() -> list[str]:
+    stats = password_hasher.metrics()
+    lines = [
+        "# HELP joj_password_hash_in_flight Password hash jobs waiting for or running on the pool.",
+        "# TYPE joj_password_hash_in_flight gauge",
+        f'joj_password_hash_in_flight{{state="queued"}} {stats["queued"]}',
+        f'joj_password_hash_in_flight{{state="running"}} {stats["running"]}',
+        "# HELP joj_password_hash_rejected_total Password hash jobs rejected with 429.",
+        "# TYPE joj_password_hash_rejected_total counter",
+        f"joj_password_hash_rejected_total {stats['rejected']}",
+    ]
+    for name, key, documentation in (
+        ("joj_password_hash_wait_seconds", "wait_seconds", "Time password hash jobs waited for a pool thread."),
+        ("joj_password_hash_seconds", "hash_seconds", "Time spent in bcrypt hashing and verification."),
+    ):
+        timing = stats[key]
+        lines += [
+            f"# HELP {name} {documentation}",
+            f"# TYPE {name} summary",
+            f"{name}_sum {_format_value(timing['sum'])}",
+            f"{name}_count {timing['count']}",
+            f"# HELP {name}_max Slowest observation since the process started.",
+            f"# TYPE {name}_max gauge",
+            f"{name}_max {_format_value(timing['max'])}",
+        ]
+    return lines
+
+
+def render_metrics(engines: dict[str, object]) -> str:
+    """Every metric in the text exposition format; ``engines`` maps a label to a sync or async engine."""
+
+    metrics = (http_request_duration, repository_call_duration, repository_sql_statements, sql_statements)
+    lines = [line for metric in metrics for line in metric.render()]
+    lines += _pool_lines(engines)
+    lines += _password_hash_lines()
+    return "\n".join(lines) + "\n"
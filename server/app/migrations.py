@@ -0,0 +1,238 @@
+"""Numbered schema migrations tracked in a ``schema_version`` table.
+
+Startup reads the stored version with a single query and returns straight away
+when it matches :data:`LATEST_VERSION`. Otherwise the migrator takes a
+database-wide lock (``BEGIN IMMEDIATE`` on SQLite, a transaction-scoped
+advisory lock on PostgreSQL), re-reads the version, creates missing tables and
+applies every pending step in that one transaction. A concurrent worker blocks
+on the lock and then finds nothing left to do, so the steps never race each
+other. Steps stick to SQL that SQLite and PostgreSQL share and quote table names
+(``user`` is reserved on PostgreSQL).
+
+Databases created before versioning have no ``schema_version`` table; they
+start at version 0 and every step checks the live schema before altering it.
+New databases are created from the models and stamped with the latest version
+without running any steps. Add a migration by appending a function decorated
+with :func:`migration` using the next number; never renumber or edit a released
+step.
+"""
+
+import json
+from typing import Callable, NamedTuple
+
+from sqlalchemy import Connection, Engine, inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlmodel import SQLModel
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, description: str):
+    def register(apply: Callable[[Connection], None]) -> Callable[[Connection], None]:
+        if version != len(MIGRATIONS) + 1:
+            raise ValueError(f"Migration {version} registered out of order")
+        MIGRATIONS.append(Migration(version, description, apply))
+        return apply
+
+    return register
+
+
+# Arbitrary key shared by every worker that migrates the same PostgreSQL database.
+_PG_MIGRATION_LOCK = 0x4A4F4A
+
+
+def _quote(connection: Connection, name: str) -> str:
+    return connection.dialect.identifier_preparer.quote(name)
+
+
+def _columns(connection: Connection, table: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table)}
+
+
+def _add_columns(connection: Connection, table: str, definitions: dict[str, str]) -> list[str]:
+    existing = _columns(connection, table)
+    added = []
+    for name, definition in definitions.items():
+        if name not in existing:
+            connection.exec_driver_sql(
+                f"ALTER TABLE {_quote(connection, table)} ADD COLUMN {name} {definition}"
+            )
+            added.append(name)
+    return added
+
+
+@migration(1, "Local passwords and roles for users")
+def _user_password_and_role(connection: Connection) -> None:
+    _add_columns(
+        connection,
+        "user",
+        {"password_hash": "VARCHAR", "role": "VARCHAR NOT NULL DEFAULT 'guest'"},
+    )
+
+
+@migration(2, "Spectator limits and status for rooms")
+def _room_spectators_and_status(connection: Connection) -> None:
+    _add_columns(
+        connection,
+        "room",
+        {
+            "max_spectators": "INTEGER NOT NULL DEFAULT 0",
+            "status": "VARCHAR NOT NULL DEFAULT 'active'",
+        },
+    )
+
+
+@migration(3, "Resource effects for cards")
+def _card_resources(connection: Connection) -> None:
+    _add_columns(
+        connection,
+        "card",
+        {
+            name: "INTEGER NOT NULL DEFAULT 0"
+            for name in ("time", "reputation", "discipline", "documents", "technology")
+        },
+    )
+
+
+@migration(4, "Denormalized room occupancy counters")
+def _room_counters(connection: Connection) -> None:
+    added = _add_columns(
+        connection,
+        "room",
+        {"player_count": "INTEGER NOT NULL DEFAULT 0", "spectator_count": "INTEGER NOT NULL DEFAULT 0"},
+    )
+    if not added:
+        return
+    # Same repair as ``Repository.rebuild_room_counters``, in SQL so it shares this transaction.
+    connection.exec_driver_sql(
+        "INSERT INTO roommembership (room_code, user_id, role, joined_at) "
+        "SELECT code, host_user_id, 'player', created_at FROM room "
+        "WHERE host_user_id IS NOT NULL AND NOT EXISTS ("
+        "SELECT 1 FROM roommembership WHERE room_code = room.code AND user_id = room.host_user_id)"
+    )
+    connection.exec_driver_sql(
+        "UPDATE room SET "
+        "player_count = (SELECT count(*) FROM roommembership "
+        "WHERE room_code = room.code AND role != 'spectator'), "
+        "spectator_count = (SELECT count(*) FROM roommembership "
+        "WHERE room_code = room.code AND role = 'spectator')"
+    )
+
+
+@migration(5, "Deck revision for the catalog cache")
+def _catalog_deck_revision(connection: Connection) -> None:
+    _add_columns(connection, "catalogstate", {"deck_revision": "INTEGER NOT NULL DEFAULT 0"})
+
+
+@migration(6, "Indexes for room listings, memberships and guest logins")
+def _lookup_indexes(connection: Connection) -> None:
+    for statement in (
+        "CREATE INDEX IF NOT EXISTS ix_room_status_visibility_created_at "
+        "ON room (status, visibility, created_at, code)",
+        "CREATE INDEX IF NOT EXISTS ix_room_created_at ON room (created_at, code)",
+        "CREATE INDEX IF NOT EXISTS ix_room_host_user_id ON room (host_user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_roommembership_user_id ON roommembership (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_user_provider_display_name "
+        f"ON {_quote(connection, 'user')} (provider, display_name)",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+@migration(7, "Manifest of card files applied by the startup loader")
+def _card_file_manifest(connection: Connection) -> None:
+    # migrate() creates the cardfile table from the model before running steps; no data changes.
+    pass
+
+
+@migration(8, "Indexed deck_card membership backfilled from deck.card_ids")
+def _deck_cards(connection: Connection) -> None:
+    # The deckcard table and its card index come from the model; copy each deck's JSON list into it.
+    connection.exec_driver_sql("DELETE FROM deckcard")
+    rows = []
+    for deck_id, card_ids in connection.exec_driver_sql("SELECT id, card_ids FROM deck"):
+        if isinstance(card_ids, str):
+            card_ids = json.loads(card_ids)
+        rows.extend(
+            {"deck_id": deck_id, "position": position, "card_id": card_id}
+            for position, card_id in enumerate(card_ids or [])
+        )
+    if rows:
+        connection.execute(
+            text("INSERT INTO deckcard (deck_id, position, card_id) VALUES (:deck_id, :position, :card_id)"), rows
+        )
+
+
+@migration(9, "Card ids embedded in each deck file of the card file manifest")
+def _card_file_card_ids(connection: Connection) -> None:
+    # Older deck entries stay NULL; the loader then matches their cards by name and category.
+    _add_columns(connection, "cardfile", {"card_ids": "JSON"})
+
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def read_version(connection: Connection) -> int | None:
+    """Stored schema version, or ``None`` when the database predates versioning."""
+
+    try:
+        return connection.exec_driver_sql("SELECT version FROM schema_version").scalar_one()
+    except DBAPIError:
+        if inspect(connection).has_table("schema_version"):
+            raise
+        return None
+
+
+def _lock(connection: Connection) -> None:
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        return
+    connection.exec_driver_sql("BEGIN")
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_MIGRATION_LOCK})
+
+
+def _pending_version(connection: Connection) -> int:
+    # Inspect instead of calling read_version: a failed query would abort a PostgreSQL transaction.
+    inspector = inspect(connection)
+    if inspector.has_table("schema_version"):
+        return connection.exec_driver_sql("SELECT version FROM schema_version").scalar_one()
+    is_new = not inspector.has_table("user")
+    connection.exec_driver_sql("CREATE TABLE schema_version (version INTEGER NOT NULL)")
+    connection.exec_driver_sql("INSERT INTO schema_version (version) VALUES (0)")
+    return LATEST_VERSION if is_new else 0
+
+
+def migrate(engine: Engine) -> list[Migration]:
+    """Bring the database up to :data:`LATEST_VERSION` and return the steps applied."""
+
+    # The driver's implicit transactions would commit each DDL statement on its own;
+    # AUTOCOMMIT hands transaction control to the explicit BEGIN in _lock.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        if read_version(connection) == LATEST_VERSION:
+            return []
+        _lock(connection)
+        try:
+            version = _pending_version(connection)
+            SQLModel.metadata.create_all(connection)
+            applied = [step for step in MIGRATIONS if step.version > version]
+            for step in applied:
+                step.apply(connection)
+            connection.exec_driver_sql(
+                "INSERT INTO catalogstate (id, card_revision, deck_revision) SELECT 1, 0, 0 "
+                "WHERE NOT EXISTS (SELECT 1 FROM catalogstate WHERE id = 1)"
+            )
+            connection.execute(
+                text("UPDATE schema_version SET version = :version"), {"version": LATEST_VERSION}
+            )
+        except BaseException:
+            connection.exec_driver_sql("ROLLBACK")
+            raise
+        connection.exec_driver_sql("COMMIT")
+    return applied
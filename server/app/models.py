@@ -3,8 +3,7 @@ from enum import Enum
 from typing import List, Optional
 
 from pydantic import validator
-from sqlalchemy import Column, String, UniqueConstraint
-from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy import JSON, Column, Index, String, UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 
@@ -54,6 +53,34 @@ class CardRead(CardBase):
         orm_mode = True
 
 
+class CardBulkImport(SQLModel):
+    cards: List[CardBase] = Field(default_factory=list)
+
+
+class CardImportResult(SQLModel):
+    index: int = Field(..., description="Position of the card in the submitted list")
+    status: str = Field(..., description="created, reused, or conflict")
+    id: Optional[int] = Field(None, description="Stored card id; empty for conflicts")
+    name: str
+    category: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class CardBulkImportRead(SQLModel):
+    created: int = 0
+    reused: int = 0
+    conflicts: int = 0
+    results: List[CardImportResult] = Field(default_factory=list)
+
+
+class CatalogState(SQLModel, table=True):
+    """Single-row revision counters that let every worker detect stale catalog caches."""
+
+    id: int = Field(default=1, primary_key=True)
+    card_revision: int = Field(default=0)
+    deck_revision: int = Field(default=0)
+
+
 class DeckBase(SQLModel):
     name: str
     description: Optional[str] = None
@@ -64,6 +91,16 @@ class Deck(DeckBase, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
 
 
+class DeckCard(SQLModel, table=True):
+    """One entry of a deck's ``card_ids``, kept in sync by the repository for lookups by card."""
+
+    deck_id: int = Field(foreign_key="deck.id", primary_key=True)
+    position: int = Field(primary_key=True)
+    card_id: int
+
+    __table_args__ = (Index("ix_deckcard_card_id", "card_id", "deck_id"),)
+
+
 class DeckRead(DeckBase):
     id: int
 
@@ -76,6 +113,19 @@ class DeckImport(SQLModel):
     cards: List[CardBase] = Field(default_factory=list)
 
 
+class CardFile(SQLModel, table=True):
+    """Manifest of ``cards/*.json`` files applied by the startup loader, keyed by file name."""
+
+    name: str = Field(primary_key=True)
+    sha256: str
+    kind: str = Field(description="card or deck")
+    card_id: Optional[int] = Field(default=None, description="Card created from a card file")
+    deck_id: Optional[int] = Field(default=None, description="Deck created from a deck file")
+    # Card ids of a deck file's embedded cards, in file order, so an edited file updates them in place.
+    card_ids: Optional[List[int]] = Field(default=None, sa_column=Column(JSON))
+    loaded_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class User(SQLModel, table=True):
     id: str = Field(primary_key=True)
     provider: Provider
@@ -83,6 +133,8 @@ class User(SQLModel, table=True):
     display_name: str
     password_hash: str | None = Field(default=None, description="Hashed password for local auth")
 
+    __table_args__ = (Index("ix_user_provider_display_name", "provider", "display_name"),)
+
 
 class UserRead(SQLModel):
     id: str
@@ -94,6 +146,15 @@ class UserRead(SQLModel):
         orm_mode = True
 
 
+class SessionRead(UserRead):
+    """Login response: the user's own fields (as before), the same user nested for the web client, and a bearer token."""
+
+    user: UserRead
+    access_token: str
+    token_type: str = "bearer"
+    expires_in: int
+
+
 class LoginRequest(SQLModel):
     provider: Provider = Field(
         Provider.GUEST,
@@ -138,16 +199,35 @@ class RoomJoin(SQLModel):
     as_spectator: bool = False
 
 
+class MatchStart(SQLModel):
+    deck_id: int = Field(..., description="Deck to shuffle into the match draw pile")
+    seed: Optional[int] = Field(None, description="Optional shuffle seed for reproducible matches")
+
+
+class MatchMove(SQLModel):
+    card_id: int = Field(..., description="Card affected by the move")
+
+
 class Room(SQLModel, table=True):
     code: str = Field(primary_key=True, index=True)
     name: str
-    host_user_id: str = Field(foreign_key="user.id")
+    host_user_id: str = Field(foreign_key="user.id", index=True)
     max_players: int
     max_spectators: int
     visibility: str
     status: str = Field(default="active")
+    player_count: int = Field(default=0, description="Denormalized count of player memberships")
+    spectator_count: int = Field(
+        default=0, description="Denormalized count of spectator memberships"
+    )
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    # ``code`` trails the sort columns so cursor pages (see ``list_rooms``) read in index order.
+    __table_args__ = (
+        Index("ix_room_status_visibility_created_at", "status", "visibility", "created_at", "code"),
+        Index("ix_room_created_at", "created_at", "code"),
+    )
+
 
 class RoomRead(SQLModel):
     code: str
@@ -169,6 +249,6 @@ class RoomRead(SQLModel):
 
 class RoomMembership(SQLModel, table=True):
     room_code: str = Field(foreign_key="room.code", primary_key=True)
-    user_id: str = Field(foreign_key="user.id", primary_key=True)
+    user_id: str = Field(foreign_key="user.id", primary_key=True, index=True)
     role: str = Field(default="player")
     joined_at: datetime = Field(default_factory=datetime.utcnow)
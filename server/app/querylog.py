@@ -0,0 +1,114 @@
+"""Opt-in SQL diagnostics for development: a slow-query log and per-request statement budgets.
+
+Both are off unless configured. ``SQL_SLOW_QUERY_MS`` logs every statement
+that takes at least that long, with its bound parameters and the request route
+that issued it. ``SQL_REQUEST_BUDGET`` counts the statements each HTTP request
+runs and reports requests over the budget, which is how N+1 query patterns show
+up: a warning by default, or ``QueryBudgetExceeded`` raised out of the ASGI app
+with ``SQL_BUDGET_ACTION=raise`` so that test clients fail. Tests can give one
+block of requests a tighter budget with :func:`query_budget`.
+
+Counting relies on context variables: the middleware sets one per request and
+SQLAlchemy's cursor hooks read it, including inside ``run_sync`` greenlets and
+threadpool workers, which run with a copy of the request's context.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import Engine, event
+
+from app.config import Settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+class _RequestQueries:
+    __slots__ = ("scope", "count")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.count = 0
+
+    @property
+    def route(self) -> str:
+        # FastAPI stores the matched route in the scope; before routing only the raw path is known.
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', self.scope['path'])}"
+
+
+_request: ContextVar[_RequestQueries | None] = ContextVar("sql_request", default=None)
+_budget_override: ContextVar[int | None] = ContextVar("sql_budget_override", default=None)
+
+
+def enabled(settings: Settings) -> bool:
+    return settings.sql_slow_query_ms is not None or settings.sql_request_budget is not None
+
+
+def install(engine: Engine, slow_query_ms: float | None) -> None:
+    """Attach the statement counter and, with a threshold, the slow-query log to a sync engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        request = _request.get()
+        if request is not None:
+            request.count += 1
+        context.querylog_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed_ms = (time.perf_counter() - context.querylog_started) * 1000
+        if slow_query_ms is not None and elapsed_ms >= slow_query_ms:
+            request = _request.get()
+            logger.warning(
+                "Slow SQL (%.1f ms) in %s: %s; parameters: %r",
+                elapsed_ms,
+                request.route if request else "no request",
+                " ".join(statement.split()),
+                parameters,
+            )
+
+
+@contextmanager
+def query_budget(limit: int) -> Iterator[None]:
+    """Fail every request made inside the block that runs more than ``limit`` statements."""
+
+    token = _budget_override.set(limit)
+    try:
+        yield
+    finally:
+        _budget_override.reset(token)
+
+
+class QueryBudgetMiddleware:
+    def __init__(self, app, budget: int | None, action: str = "warn"):
+        self.app = app
+        self.budget = budget
+        self.action = action
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = _RequestQueries(scope)
+        token = _request.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request.reset(token)
+
+        override = _budget_override.get()
+        budget = override if override is not None else self.budget
+        if budget is None or request.count <= budget:
+            return
+        message = f"{request.route} ran {request.count} SQL statements, over its budget of {budget}"
+        if override is not None or self.action == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
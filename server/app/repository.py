@@ -1,21 +1,37 @@
+import asyncio
+import base64
+import json
 import secrets
-from typing import List, Optional, Tuple
+from concurrent.futures import Future
+from datetime import datetime
+from functools import wraps
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, TypeVar
 
-import requests
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from jose import jwt
 from jose.exceptions import JWTError
-from sqlalchemy import func, or_
-from sqlmodel import Session, delete, select
-from passlib.context import CryptContext
+from sqlalchemy import case, func, insert, or_, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.util import await_only
+from sqlmodel import Session, delete, select, update
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.cache import catalog_cache, encode_json, read_catalog_revisions
 from app.config import get_settings
+from app.hashing import password_hasher
+from app.jwks import jwks_cache
+from app.metrics import instrument_repository_method
 from app.models import (
     Card,
     CardBase,
+    CardBulkImportRead,
+    CardImportResult,
     CardRead,
+    CatalogState,
     Deck,
     DeckBase,
+    DeckCard,
     DeckImport,
     DeckRead,
     LoginRequest,
@@ -30,14 +46,18 @@ from app.models import (
 )
 
 
+# Keeps IN (...) lists well below SQLite's bound-parameter limit.
+_IN_CHUNK_SIZE = 500
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+T = TypeVar("T")
+
+
 class Repository:
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, read_session: Session | None = None):
         self.session = session
+        # Public list_*/get_*/export_* reads use the replica session when one is configured.
+        self.read_session = read_session or session
         self.settings = get_settings()
-        self._jwks_cache: dict[str, dict] = {}
-        self._pwd_context = CryptContext(
-            schemes=["bcrypt_sha256", "bcrypt", "scrypt"], deprecated="auto"
-        )
 
     # Card helpers
     def _ensure_card_unique(self, name: str, category: str | None, existing_id: int | None = None) -> None:
@@ -53,12 +73,39 @@ class Repository:
                 detail="Card with the same name and category already exists",
             )
 
+    def _bump_catalog_revision(self, cards: bool = False, decks: bool = False) -> None:
+        """Mark cards and/or decks as changed for every worker, atomically with the edit.
+
+        The counters back both the in-process catalog cache and the ETags of the
+        catalog and deck endpoints, so every mutating method must call this.
+        """
+
+        values = {}
+        if cards:
+            values["card_revision"] = CatalogState.card_revision + 1
+        if decks:
+            values["deck_revision"] = CatalogState.deck_revision + 1
+        self.session.exec(
+            update(CatalogState)
+            .where(CatalogState.id == 1)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if cards:
+            catalog_cache.invalidate()
+
+    def catalog_revisions(self) -> tuple[int, int]:
+        """Current ``(card_revision, deck_revision)`` pair used to build ETags."""
+
+        return read_catalog_revisions(self.read_session)
+
     def add_card(self, payload: CardBase) -> CardRead:
         self._ensure_card_unique(payload.name, payload.category)
         card = Card.from_orm(payload)
         self.session.add(card)
         self.session.flush()
         self.session.refresh(card)
+        self._bump_catalog_revision(cards=True)
         return CardRead.from_orm(card)
 
     def update_card(self, card_id: int, payload: CardBase) -> CardRead:
@@ -70,6 +117,7 @@ class Repository:
             setattr(card, field, value)
         self.session.add(card)
         self.session.flush()
+        self._bump_catalog_revision(cards=True)
         return CardRead.from_orm(card)
 
     def delete_card(self, card_id: int) -> None:
@@ -78,17 +126,50 @@ class Repository:
             raise HTTPException(status_code=404, detail="Card not found")
         self.session.delete(card)
         self.session.flush()
-        # Remove card id from decks
-        decks = self.session.exec(select(Deck).where(Deck.card_ids.contains([card_id]))).all()
+        # Remove card id from decks. Positions left behind by the deleted rows keep their order.
+        decks = self.session.exec(select(Deck).where(Deck.id.in_(self._deck_ids_using(card_id)))).all()
         for deck in decks:
             deck.card_ids = [c for c in deck.card_ids if c != card_id]
             self.session.add(deck)
+        if decks:
+            self.session.exec(delete(DeckCard).where(DeckCard.card_id == card_id))
+        self._bump_catalog_revision(cards=True, decks=bool(decks))
 
     def list_cards(self, limit: int, offset: int) -> List[CardRead]:
-        cards = self.session.exec(select(Card).offset(offset).limit(limit)).all()
+        cards = self.read_session.exec(select(Card).offset(offset).limit(limit)).all()
         return [CardRead.from_orm(card) for card in cards]
 
+    def list_cards_json(
+        self, limit: int, offset: int, cursor: str | None = None
+    ) -> tuple[bytes, str | None]:
+        """Serve a card page as JSON straight from the process-wide catalog cache.
+
+        Returns the page body and the cursor for the next page, if it may exist.
+        """
+
+        after = decode_cursor(cursor, int)[0] if cursor else None
+        body, last_id = catalog_cache.page(self.read_session, limit, offset, after)
+        return body, encode_cursor(last_id) if last_id is not None else None
+
     # Deck helpers
+    @staticmethod
+    def _deck_ids_using(card_id: int):
+        return select(DeckCard.deck_id).where(DeckCard.card_id == card_id).distinct()
+
+    def _sync_deck_cards(self, deck: Deck, new: bool = False) -> None:
+        """Rewrite the ``deckcard`` rows of a flushed deck from its ``card_ids``."""
+
+        if not new:
+            self.session.exec(delete(DeckCard).where(DeckCard.deck_id == deck.id))
+        if deck.card_ids:
+            self.session.connection().execute(
+                insert(DeckCard),
+                [
+                    {"deck_id": deck.id, "position": position, "card_id": card_id}
+                    for position, card_id in enumerate(deck.card_ids)
+                ],
+            )
+
     def _validate_cards_exist(self, card_ids: List[int]) -> None:
         if not card_ids:
             return
@@ -109,6 +190,8 @@ class Repository:
         self.session.add(deck)
         self.session.flush()
         self.session.refresh(deck)
+        self._sync_deck_cards(deck, new=True)
+        self._bump_catalog_revision(decks=True)
         return DeckRead.from_orm(deck)
 
     def update_deck(self, deck_id: int, payload: DeckBase) -> DeckRead:
@@ -120,77 +203,273 @@ class Repository:
             setattr(deck, field, value)
         self.session.add(deck)
         self.session.flush()
+        self._sync_deck_cards(deck)
+        self._bump_catalog_revision(decks=True)
         return DeckRead.from_orm(deck)
 
     def delete_deck(self, deck_id: int) -> None:
         deck = self.session.get(Deck, deck_id)
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
+        self.session.exec(delete(DeckCard).where(DeckCard.deck_id == deck_id))
         self.session.delete(deck)
         self.session.flush()
+        self._bump_catalog_revision(decks=True)
+
+    def get_deck(self, deck_id: int) -> DeckRead:
+        deck = self.read_session.get(Deck, deck_id)
+        if not deck:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        return DeckRead.from_orm(deck)
+
+    def list_decks(self, limit: int, offset: int, cursor: str | None = None) -> List[DeckRead]:
+        query = select(Deck).order_by(Deck.id)
+        if cursor:
+            query = query.where(Deck.id > decode_cursor(cursor, int)[0])
+        else:
+            query = query.offset(offset)
+        decks = self.read_session.exec(query.limit(limit)).all()
+        return [DeckRead.from_orm(deck) for deck in decks]
+
+    def list_card_decks(self, card_id: int) -> List[DeckRead]:
+        """Decks that contain ``card_id``, found through the ``deckcard`` index."""
 
-    def list_decks(self, limit: int, offset: int) -> List[DeckRead]:
-        decks = self.session.exec(select(Deck).offset(offset).limit(limit)).all()
+        if self.read_session.get(Card, card_id) is None:
+            raise HTTPException(status_code=404, detail="Card not found")
+        decks = self.read_session.exec(
+            select(Deck).where(Deck.id.in_(self._deck_ids_using(card_id))).order_by(Deck.id)
+        ).all()
         return [DeckRead.from_orm(deck) for deck in decks]
 
     def export_deck(self, deck_id: int) -> dict:
-        deck = self.session.get(Deck, deck_id)
+        deck = self.read_session.get(Deck, deck_id)
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
-        cards = []
-        if deck.card_ids:
-            cards = self.session.exec(select(Card).where(Card.id.in_(deck.card_ids))).all()
+        deck_card_ids = select(DeckCard.card_id).where(DeckCard.deck_id == deck_id)
+        cards = self.read_session.exec(select(Card).where(Card.id.in_(deck_card_ids)).order_by(Card.id)).all()
         return {
             "deck": DeckRead.from_orm(deck),
             "cards": [CardRead.from_orm(card) for card in cards],
         }
 
-    def import_deck(self, payload: DeckImport) -> DeckRead:
-        card_ids = self._prepare_import_card_ids(payload)
+    def export_deck_json(self, deck_id: int) -> bytes:
+        """``export_deck`` rendered as JSON with card bodies taken from the catalog cache."""
 
-        deck = Deck(
-            name=payload.deck.name,
-            description=payload.deck.description,
-            card_ids=card_ids,
+        row = self.read_session.connection().execute(
+            select(Deck.name, Deck.description, Deck.card_ids, Deck.id).where(Deck.id == deck_id)
+        ).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        deck = dict(row._mapping)
+        deck["card_ids"] = deck["card_ids"] or []
+        cards = catalog_cache.cards_json(self.read_session, deck["card_ids"])
+        return b'{"deck":' + encode_json(deck) + b',"cards":[' + b",".join(cards) + b"]}"
+
+    def iter_deck_export_ndjson(self, deck_id: int) -> Iterator[bytes]:
+        """Yield ``export_deck`` as NDJSON: a ``deck`` line, then one ``card`` line per distinct card.
+
+        Cards follow their first appearance in the deck and are streamed from a
+        server-side cursor in ``_IN_CHUNK_SIZE`` row batches, so only one batch of
+        card rows is held at a time. A missing deck raises before the first line.
+        """
+
+        connection = self.read_session.connection()
+        row = connection.execute(
+            select(Deck.name, Deck.description, Deck.card_ids, Deck.id).where(Deck.id == deck_id)
+        ).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Deck not found")
+        deck = dict(row._mapping)
+        deck["card_ids"] = deck["card_ids"] or []
+        yield encode_json({"deck": deck}) + b"\n"
+
+        columns = [getattr(Card, field) for field in CardRead.__fields__]
+        statement = (
+            select(*columns)
+            .join(DeckCard, DeckCard.card_id == Card.id)
+            .where(DeckCard.deck_id == deck_id)
+            .order_by(DeckCard.position)
+            .execution_options(stream_results=True, yield_per=_IN_CHUNK_SIZE)
         )
+        seen: set[int] = set()
+        for rows in connection.execute(statement).partitions():
+            lines = []
+            for card in rows:
+                if card.id not in seen:
+                    seen.add(card.id)
+                    lines.append(encode_json({"card": dict(card._mapping)}) + b"\n")
+            if lines:
+                yield b"".join(lines)
+
+    def _save_imported_deck(self, deck: Deck | None, payload: DeckBase, card_ids: list[int]) -> DeckRead:
+        new = deck is None
+        deck = deck or Deck(name=payload.name)
+        deck.name = payload.name
+        deck.description = payload.description
+        deck.card_ids = card_ids
         self.session.add(deck)
         self.session.flush()
         self.session.refresh(deck)
+        self._sync_deck_cards(deck, new)
+        self._bump_catalog_revision(decks=True)
         return DeckRead.from_orm(deck)
 
-    def import_deck_into_existing(self, deck_id: int, payload: DeckImport) -> DeckRead:
+    def _get_deck_row(self, deck_id: int) -> Deck:
         deck = self.session.get(Deck, deck_id)
         if not deck:
             raise HTTPException(status_code=404, detail="Deck not found")
+        return deck
 
+    def import_deck(self, payload: DeckImport) -> DeckRead:
         card_ids = self._prepare_import_card_ids(payload)
+        return self._save_imported_deck(None, payload.deck, card_ids)
 
-        deck.name = payload.deck.name
-        deck.description = payload.deck.description
-        deck.card_ids = card_ids
-        self.session.add(deck)
-        self.session.flush()
-        self.session.refresh(deck)
-        return DeckRead.from_orm(deck)
+    def import_deck_into_existing(self, deck_id: int, payload: DeckImport) -> DeckRead:
+        deck = self._get_deck_row(deck_id)
+        card_ids = self._prepare_import_card_ids(payload)
+        return self._save_imported_deck(deck, payload.deck, card_ids)
 
-    def _prepare_import_card_ids(self, payload: DeckImport) -> list[int]:
-        new_card_ids: list[int] = []
-        for card_payload in payload.cards:
-            card = Card.from_orm(card_payload)
-            self.session.add(card)
-            self.session.flush()
-            self.session.refresh(card)
-            new_card_ids.append(card.id)
+    def stream_import_deck(self, deck_id: int | None = None) -> "DeckStreamImport":
+        """Start an incremental import of ``iter_deck_export_ndjson`` output.
 
-        deck_payload = payload.deck
+        With ``deck_id`` the cards replace those of an existing deck, like
+        ``import_deck_into_existing``; otherwise a new deck is created.
+        """
 
+        return DeckStreamImport(self, self._get_deck_row(deck_id) if deck_id is not None else None)
+
+    def bulk_import_cards(self, cards: List[CardBase]) -> CardBulkImportRead:
+        """Insert many cards in one statement, reusing identical (name, category) matches.
+
+        Existing cards are looked up with a single ``IN`` query over the submitted
+        names; a card whose name and category already exist with the same content
+        is reused, a card that differs is reported as a conflict and skipped. If a
+        concurrent import commits one of the new keys first, the insert is rolled
+        back to a savepoint and the cards are classified again against it.
+        """
+
+        fields = tuple(CardBase.__fields__)
+        names = list({card.name for card in cards})
+        existing = self._existing_cards_by_key(names, fields)
+        while True:
+            results, pending = self._plan_bulk_import(cards, fields, existing)
+            if not pending:
+                break
+            try:
+                # A Core insert on the connection is batched into multi-row statements; the
+                # ORM bulk path splits on NULL columns. (name, category) is unique, so the
+                # RETURNING rows are matched by key rather than by parameter order.
+                with self.session.begin_nested():
+                    inserted = self.session.connection().execute(
+                        insert(Card).returning(Card.id, Card.name, Card.category),
+                        [dict(zip(fields, content)) for content, _ in pending.values()],
+                    ).all()
+                break
+            except IntegrityError:
+                refreshed = self._existing_cards_by_key(names, fields)
+                if not any(key in refreshed for key in pending):
+                    raise
+                # Each retry moves at least one key into ``existing``, so this terminates.
+                existing = refreshed
+
+        if pending:
+            for card_id, name, category in inserted:
+                first_index, *duplicates = pending[(name, category)][1]
+                results[first_index] = CardImportResult(
+                    index=first_index, status="created", id=card_id, name=name, category=category
+                )
+                for duplicate_index in duplicates:
+                    results[duplicate_index] = CardImportResult(
+                        index=duplicate_index, status="reused", id=card_id, name=name, category=category
+                    )
+            self._bump_catalog_revision(cards=True)
+
+        summary = CardBulkImportRead(results=results)
+        for result in results:
+            if result.status == "created":
+                summary.created += 1
+            elif result.status == "reused":
+                summary.reused += 1
+            else:
+                summary.conflicts += 1
+        return summary
+
+    def _existing_cards_by_key(
+        self, names: list[str], fields: tuple[str, ...]
+    ) -> dict[tuple[str, str | None], tuple[int, tuple]]:
+        name_at, category_at = fields.index("name"), fields.index("category")
+        existing: dict[tuple[str, str | None], tuple[int, tuple]] = {}
+        for start in range(0, len(names), _IN_CHUNK_SIZE):
+            rows = self.session.connection().execute(
+                select(Card.id, *(getattr(Card, field) for field in fields)).where(
+                    Card.name.in_(names[start : start + _IN_CHUNK_SIZE])
+                )
+            )
+            for card_id, *values in rows:
+                content = tuple(values)
+                existing[(content[name_at], content[category_at])] = (card_id, content)
+        return existing
+
+    @staticmethod
+    def _plan_bulk_import(
+        cards: List[CardBase],
+        fields: tuple[str, ...],
+        existing: dict[tuple[str, str | None], tuple[int, tuple]],
+    ) -> tuple[list[CardImportResult | None], dict[tuple[str, str | None], tuple[tuple, list[int]]]]:
+        results: list[CardImportResult | None] = [None] * len(cards)
+        # (name, category) -> (content, payload indexes sharing that content)
+        pending: dict[tuple[str, str | None], tuple[tuple, list[int]]] = {}
+        for index, card in enumerate(cards):
+            key = (card.name, card.category)
+            content = tuple(getattr(card, field) for field in fields)
+            if key in existing:
+                card_id, stored = existing[key]
+                if stored == content:
+                    results[index] = CardImportResult(
+                        index=index, status="reused", id=card_id, name=card.name, category=card.category
+                    )
+                else:
+                    results[index] = CardImportResult(
+                        index=index,
+                        status="conflict",
+                        name=card.name,
+                        category=card.category,
+                        detail="Card with the same name and category already exists",
+                    )
+            elif key in pending:
+                if pending[key][0] == content:
+                    pending[key][1].append(index)
+                else:
+                    results[index] = CardImportResult(
+                        index=index,
+                        status="conflict",
+                        name=card.name,
+                        category=card.category,
+                        detail="Differs from an earlier card with the same name and category",
+                    )
+            else:
+                pending[key] = (content, [index])
+        return results, pending
+
+    def _import_cards_or_raise(self, cards: List[CardBase], index_offset: int = 0) -> list[int]:
+        imported = self.bulk_import_cards(cards)
+        if imported.conflicts:
+            conflicts = []
+            for result in imported.results:
+                if result.status == "conflict":
+                    result.index += index_offset
+                    conflicts.append(result.dict())
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"message": "Some cards conflict with existing cards", "conflicts": conflicts},
+            )
+        return [result.id for result in imported.results]
+
+    def _resolve_import_card_ids(self, deck_card_ids: List[int], new_card_ids: list[int]) -> list[int]:
         if new_card_ids:
-            card_ids = list(deck_payload.card_ids or [])
+            card_ids = list(deck_card_ids or [])
             if card_ids:
-                unique_existing_ids: list[int] = []
-                for cid in card_ids:
-                    if cid not in unique_existing_ids:
-                        unique_existing_ids.append(cid)
+                unique_existing_ids = list(dict.fromkeys(card_ids))
 
                 replacement_map = {
                     old_id: new_id
@@ -203,25 +482,39 @@ class Repository:
             else:
                 card_ids = new_card_ids
         else:
-            card_ids = list(deck_payload.card_ids or [])
+            card_ids = list(deck_card_ids or [])
             self._validate_cards_exist(card_ids)
 
         return card_ids
 
+    def _prepare_import_card_ids(self, payload: DeckImport) -> list[int]:
+        new_card_ids = self._import_cards_or_raise(payload.cards) if payload.cards else []
+        return self._resolve_import_card_ids(payload.deck.card_ids, new_card_ids)
+
     # Auth helpers
-    def _hash_password(self, password: str) -> str:
-        return self._pwd_context.hash(password)
+    def _offload(self, function: Callable[..., T], *args) -> T:
+        """Run CPU- or network-bound work; ``AsyncRepository`` moves it off the event loop."""
+
+        return function(*args)
+
+    def _wait(self, future: Future) -> T:
+        """Block on pool work; ``AsyncRepository`` awaits it on the event loop instead."""
+
+        return future.result()
+
+    def _hash_password(self, identity: str, password: str) -> str:
+        return self._wait(password_hasher.hash(identity, password))
 
-    def _verify_password(self, password: str, password_hash: str | None) -> bool:
+    def _verify_password(self, identity: str, password: str, password_hash: str | None) -> bool:
         if not password_hash:
             return False
-        return self._pwd_context.verify(password, password_hash)
+        return self._wait(password_hasher.verify(identity, password, password_hash))
 
     def verify_guest_password(self, user_id: str, password: str) -> bool:
         user = self.session.get(User, user_id)
         if not user or user.provider != Provider.GUEST:
             return False
-        return self._verify_password(password, user.password_hash)
+        return self._verify_password(user_id, password, user.password_hash)
 
     def _get_provider_config(self, provider: Provider) -> tuple[str, str]:
         if provider == Provider.GOOGLE:
@@ -230,16 +523,6 @@ class Repository:
             return self.settings.apple_issuer, self.settings.apple_jwks_url
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported provider")
 
-    def _fetch_jwks(self, jwks_url: str) -> dict:
-        if jwks_url in self._jwks_cache:
-            return self._jwks_cache[jwks_url]
-        response = requests.get(jwks_url, timeout=5)
-        if response.status_code != 200:
-            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail="Unable to fetch provider keys")
-        data = response.json()
-        self._jwks_cache[jwks_url] = data
-        return data
-
     def _validate_oauth_token(self, provider: Provider, token: str) -> dict:
         issuer, jwks_url = self._get_provider_config(provider)
         audience = self.settings.oauth_audience
@@ -248,16 +531,13 @@ class Repository:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="OAuth audience must be configured",
             )
-        jwks = self._fetch_jwks(jwks_url)
         try:
             header = jwt.get_unverified_header(token)
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid OAuth token")
-        key = None
-        for jwk in jwks.get("keys", []):
-            if jwk.get("kid") == header.get("kid"):
-                key = jwk
-                break
+        kid = header.get("kid")
+        # Cached keys answer inline; a fetch (or waiting on another request's fetch) is offloaded.
+        key = jwks_cache.get_key(jwks_url, kid, block=False) or self._offload(jwks_cache.get_key, jwks_url, kid)
         if not key:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Unknown signing key")
         try:
@@ -266,11 +546,17 @@ class Repository:
                 "key": key,
                 "algorithms": [header.get("alg", "RS256")],
                 "issuer": issuer,
-                "audience": audience,
+                # jose compares against a single audience; OAUTH_AUDIENCE is a list, checked below.
+                "options": {"verify_aud": False},
             }
             claims = jwt.decode(**decode_kwargs)
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid OAuth token")
+        token_audience = claims.get("aud")
+        if isinstance(token_audience, str):
+            token_audience = [token_audience]
+        if not set(token_audience or []) & set(audience):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid OAuth token")
         return claims
 
     def _generate_user(
@@ -293,7 +579,7 @@ class Repository:
         return user
 
     def ensure_admin_user(self) -> User:
-        password_hash = self._hash_password("admin!")
+        password_hash = self._hash_password("admin", "admin!")
         admin = self.session.get(User, "admin")
 
         if admin:
@@ -334,18 +620,21 @@ class Repository:
                     detail="OAuth token is required",
                 )
             self._validate_oauth_token(payload.provider, payload.token)
-        if payload.password:
-            password_hash = self._hash_password(payload.password)
 
         existing_user = None
         if payload.provider == Provider.GUEST and payload.display_name:
             existing_user = self._get_user_by_display_name(
                 payload.provider, payload.display_name
             )
+        # Returning users only need a verify; hash only when a new hash will be stored. Known users share the
+        # user-id hashing bucket of verify_guest_password and change_password.
+        identity = existing_user.id if existing_user else f"{payload.provider.value}:{display_name}"
+        if payload.password and not (existing_user and existing_user.password_hash):
+            password_hash = self._hash_password(identity, payload.password)
 
         if existing_user:
             if existing_user.password_hash and not self._verify_password(
-                payload.password or "", existing_user.password_hash
+                identity, payload.password or "", existing_user.password_hash
             ):
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
@@ -371,18 +660,19 @@ class Repository:
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Password changes are only supported for guest accounts",
             )
-        if not self._verify_password(current_password, user.password_hash or ""):
+        if not self._verify_password(user_id, current_password, user.password_hash or ""):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Current password is incorrect",
             )
 
-        user.password_hash = self._hash_password(new_password)
+        user.password_hash = self._hash_password(user_id, new_password)
         self.session.add(user)
         self.session.flush()
         return UserRead.from_orm(user)
 
     def get_user(self, user_id: str) -> UserRead | None:
+        # Stays on the primary: authentication right after sign-up must not miss a lagging replica.
         user = self.session.get(User, user_id)
         return UserRead.from_orm(user) if user else None
 
@@ -394,45 +684,8 @@ class Repository:
             if not existing:
                 return code
 
-    def _membership_counts(self, room_code: str) -> tuple[int, int]:
-        counts = self.session.exec(
-            select(RoomMembership.role, func.count())
-            .where(RoomMembership.room_code == room_code)
-            .group_by(RoomMembership.role)
-        ).all()
-        player_count = 0
-        spectator_count = 0
-        for role, amount in counts:
-            if role == "spectator":
-                spectator_count = amount
-            else:
-                player_count = amount
-        return player_count, spectator_count
-
-    def _ensure_host_membership(self, room: Room) -> None:
-        if not room.host_user_id:
-            return
-        existing = self.session.get(RoomMembership, (room.code, room.host_user_id))
-        if existing:
-            return
-        membership = RoomMembership(
-            room_code=room.code,
-            user_id=room.host_user_id,
-            role="player",
-            joined_at=room.created_at,
-        )
-        self.session.add(membership)
-        self.session.flush()
-
-    def _room_to_read(self, room: Room, current_user_id: str | None = None) -> RoomRead:
-        self._ensure_host_membership(room)
-        player_count, spectator_count = self._membership_counts(room.code)
-        is_joined = False
-        if current_user_id:
-            is_joined = (
-                self.session.get(RoomMembership, (room.code, current_user_id)) is not None
-            )
-        is_joinable = room.status == "active" and player_count < room.max_players
+    def _build_room_read(self, room: Room, is_joined: bool) -> RoomRead:
+        is_joinable = room.status == "active" and room.player_count < room.max_players
         return RoomRead(
             code=room.code,
             name=room.name,
@@ -441,13 +694,111 @@ class Repository:
             max_spectators=room.max_spectators,
             visibility=room.visibility,
             status=room.status,
-            player_count=player_count,
-            spectator_count=spectator_count,
+            player_count=room.player_count,
+            spectator_count=room.spectator_count,
             is_joined=is_joined,
             is_joinable=is_joinable,
             created_at=room.created_at,
         )
 
+    def _room_to_read(self, room: Room, current_user_id: str | None = None) -> RoomRead:
+        is_joined = False
+        if current_user_id:
+            is_joined = (
+                self.read_session.get(RoomMembership, (room.code, current_user_id)) is not None
+            )
+        return self._build_room_read(room, is_joined)
+
+    def _rooms_to_read(
+        self, rooms: List[Room], current_user_id: str | None = None
+    ) -> List[RoomRead]:
+        """Build ``RoomRead`` objects for a whole page from the stored counters.
+
+        Occupancy comes from the denormalized ``Room`` columns, so the only extra
+        query is a single membership lookup for the caller's joined flags.
+        """
+
+        joined_codes: set[str] = set()
+        if rooms and current_user_id:
+            joined_codes = set(
+                self.read_session.exec(
+                    select(RoomMembership.room_code).where(
+                        RoomMembership.user_id == current_user_id,
+                        RoomMembership.room_code.in_([room.code for room in rooms]),
+                    )
+                ).all()
+            )
+        return [self._build_room_read(room, room.code in joined_codes) for room in rooms]
+
+    def verify_room_counters(self) -> List[dict]:
+        """Return rooms whose stored counters disagree with the membership table."""
+
+        is_spectator = RoomMembership.role == "spectator"
+        actual = {
+            room_code: (players or 0, spectators or 0)
+            for room_code, players, spectators in self.session.exec(
+                select(
+                    RoomMembership.room_code,
+                    func.sum(case((is_spectator, 0), else_=1)),
+                    func.sum(case((is_spectator, 1), else_=0)),
+                ).group_by(RoomMembership.room_code)
+            ).all()
+        }
+        mismatches = []
+        for code, player_count, spectator_count in self.session.exec(
+            select(Room.code, Room.player_count, Room.spectator_count)
+        ).all():
+            expected_players, expected_spectators = actual.get(code, (0, 0))
+            if (player_count, spectator_count) != (expected_players, expected_spectators):
+                mismatches.append(
+                    {
+                        "code": code,
+                        "player_count": player_count,
+                        "spectator_count": spectator_count,
+                        "expected_player_count": expected_players,
+                        "expected_spectator_count": expected_spectators,
+                    }
+                )
+        return mismatches
+
+    def rebuild_room_counters(self) -> List[dict]:
+        """Backfill missing host memberships and repair drifted room counters."""
+
+        missing_hosts = self.session.exec(
+            select(Room).where(
+                Room.host_user_id.is_not(None),
+                ~select(RoomMembership.room_code)
+                .where(
+                    RoomMembership.room_code == Room.code,
+                    RoomMembership.user_id == Room.host_user_id,
+                )
+                .exists(),
+            )
+        ).all()
+        for room in missing_hosts:
+            self.session.add(
+                RoomMembership(
+                    room_code=room.code,
+                    user_id=room.host_user_id,
+                    role="player",
+                    joined_at=room.created_at,
+                )
+            )
+        self.session.flush()
+
+        mismatches = self.verify_room_counters()
+        for mismatch in mismatches:
+            self.session.exec(
+                update(Room)
+                .where(Room.code == mismatch["code"])
+                .values(
+                    player_count=mismatch["expected_player_count"],
+                    spectator_count=mismatch["expected_spectator_count"],
+                )
+            )
+        self.session.flush()
+        return mismatches
+
     def create_room(self, payload: RoomCreate, host_user_id: str) -> RoomRead:
         code = self._generate_unique_code()
         room = Room(
@@ -458,13 +809,15 @@ class Repository:
             max_spectators=payload.max_spectators,
             visibility=payload.visibility,
             status=payload.status,
+            player_count=1,
+            spectator_count=0,
         )
         self.session.add(room)
         self.session.flush()
         host_membership = RoomMembership(room_code=room.code, user_id=host_user_id, role="player")
         self.session.add(host_membership)
         self.session.flush()
-        return self._room_to_read(room, host_user_id)
+        return self._build_room_read(room, True)
 
     def list_rooms(
         self,
@@ -474,6 +827,7 @@ class Repository:
         visibility: str | None = None,
         status: str | None = None,
         sort: str | None = None,
+        cursor: str | None = None,
     ) -> List[RoomRead]:
         base_query = select(Room)
         if status:
@@ -492,49 +846,109 @@ class Repository:
         else:
             base_query = base_query.where(Room.visibility == "public")
 
-        sort = sort or "-created_at"
-        sort_field = sort[1:] if sort.startswith("-") else sort
-        if not hasattr(Room, sort_field):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported sort field")
-        if sort.startswith("-"):
-            base_query = base_query.order_by(getattr(Room, sort_field).desc())
+        base_query = _order_rooms(base_query, sort, offset, cursor)
+        rooms = self.read_session.exec(base_query.limit(limit)).all()
+        return self._rooms_to_read(rooms, current_user_id)
+
+    def get_room(self, room_code: str, current_user_id: str | None = None) -> RoomRead:
+        room = self.read_session.get(Room, room_code)
+        if not room:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found")
+        return self._room_to_read(room, current_user_id)
+
+    def list_room_player_ids(self, room_code: str) -> List[str]:
+        return list(
+            self.read_session.exec(
+                select(RoomMembership.user_id)
+                .where(
+                    RoomMembership.room_code == room_code,
+                    RoomMembership.role != "spectator",
+                )
+                .order_by(RoomMembership.joined_at, RoomMembership.user_id)
+            ).all()
+        )
+
+    def _claim_room_seat(self, room_code: str, role: str) -> bool:
+        """Atomically reserve a seat by bumping the counter only while below capacity.
+
+        The guarded ``UPDATE`` is the first write of the join transaction, so the
+        database serializes concurrent joins on it and the capacity check is made
+        against the committed counter rather than a value read earlier.
+        """
+
+        if role == "spectator":
+            guard = Room.spectator_count < Room.max_spectators
+            values = {"spectator_count": Room.spectator_count + 1}
         else:
-            base_query = base_query.order_by(getattr(Room, sort_field).asc())
+            guard = Room.player_count < Room.max_players
+            values = {"player_count": Room.player_count + 1}
+        result = self.session.exec(
+            update(Room)
+            .where(Room.code == room_code, Room.status == "active", guard)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def _release_room_seat(self, room_code: str, role: str) -> None:
+        column = Room.spectator_count if role == "spectator" else Room.player_count
+        self.session.exec(
+            update(Room)
+            .where(Room.code == room_code)
+            .values({column: column - 1})
+            .execution_options(synchronize_session=False)
+        )
 
-        rooms = self.session.exec(base_query.offset(offset).limit(limit)).all()
-        return [self._room_to_read(room, current_user_id) for room in rooms]
+    def join_room(self, room_code: str, user_id: str, as_spectator: bool) -> tuple[RoomRead, bool]:
+        """Add the user to the room; the flag is False when they were already a member."""
 
-    def join_room(self, room_code: str, user_id: str, as_spectator: bool) -> RoomRead:
         room = self.session.get(Room, room_code)
         if not room:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Room not found")
         if room.status != "active":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Room is not joinable")
 
-        self._ensure_host_membership(room)
-
         existing = self.session.get(RoomMembership, (room_code, user_id))
         if existing:
-            return self._room_to_read(room, user_id)
+            return self._build_room_read(room, True), False
 
-        player_count, spectator_count = self._membership_counts(room_code)
         role = "spectator" if as_spectator else "player"
-        if role == "player" and player_count >= room.max_players:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Room is full for players")
-        if role == "spectator" and spectator_count >= room.max_spectators:
+        if not self._claim_room_seat(room_code, role):
+            self.session.refresh(room)
+            if room.status != "active":
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Room is not joinable")
+            if role == "player":
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Room is full for players")
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Room is full for spectators")
 
-        membership = RoomMembership(room_code=room_code, user_id=user_id, role=role)
-        self.session.add(membership)
+        # Re-check under the write lock: a concurrent request for the same user may
+        # have inserted the membership after the optimistic lookup above.
+        joined = self.session.get(RoomMembership, (room_code, user_id)) is None
+        if joined:
+            self.session.add(RoomMembership(room_code=room_code, user_id=user_id, role=role))
+        else:
+            self._release_room_seat(room_code, role)
         self.session.flush()
-        return self._room_to_read(room, user_id)
+        self.session.refresh(room)
+        return self._build_room_read(room, True), joined
 
     # User admin helpers
-    def list_users(self, limit: int, offset: int) -> List[UserRead]:
-        users = self.session.exec(select(User).offset(offset).limit(limit)).all()
+    def list_users(self, limit: int, offset: int, cursor: str | None = None) -> List[UserRead]:
+        query = select(User).order_by(User.id)
+        if cursor:
+            query = query.where(User.id > decode_cursor(cursor, str)[0])
+        else:
+            query = query.offset(offset)
+        users = self.read_session.exec(query.limit(limit)).all()
         return [UserRead.from_orm(user) for user in users]
 
-    def delete_user(self, user_id: str) -> None:
+    def delete_user(self, user_id: str) -> dict:
+        """Delete a user, their memberships and hosted rooms.
+
+        Returns the affected room codes (``left`` with the role the user held and
+        ``deleted`` for hosted rooms) so callers can notify room subscribers.
+        """
+
         user = self.session.get(User, user_id)
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
@@ -543,33 +957,52 @@ class Repository:
             select(Room.code).where(Room.host_user_id == user_id)
         ).all()
 
+        memberships = self.session.exec(
+            select(RoomMembership.room_code, RoomMembership.role).where(
+                RoomMembership.user_id == user_id,
+                RoomMembership.room_code.not_in(rooms_to_delete),
+            )
+        ).all()
+        left_as_player = [code for code, role in memberships if role != "spectator"]
+        left_as_spectator = [code for code, role in memberships if role == "spectator"]
+        if left_as_player:
+            self.session.exec(
+                update(Room)
+                .where(Room.code.in_(left_as_player))
+                .values(player_count=Room.player_count - 1)
+            )
+        if left_as_spectator:
+            self.session.exec(
+                update(Room)
+                .where(Room.code.in_(left_as_spectator))
+                .values(spectator_count=Room.spectator_count - 1)
+            )
+
         self.session.exec(delete(RoomMembership).where(RoomMembership.user_id == user_id))
 
-        for (room_code,) in rooms_to_delete:
+        for room_code in rooms_to_delete:
             self.delete_room(room_code)
 
         self.session.delete(user)
         self.session.flush()
+        return {"left": list(memberships), "deleted": list(rooms_to_delete)}
 
     # Room admin helpers
     def list_all_rooms(
-        self, limit: int, offset: int, status: str | None = None, sort: str | None = None
+        self,
+        limit: int,
+        offset: int,
+        status: str | None = None,
+        sort: str | None = None,
+        cursor: str | None = None,
     ) -> List[RoomRead]:
         base_query = select(Room)
         if status:
             base_query = base_query.where(Room.status == status)
 
-        sort = sort or "-created_at"
-        sort_field = sort[1:] if sort.startswith("-") else sort
-        if not hasattr(Room, sort_field):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported sort field")
-        if sort.startswith("-"):
-            base_query = base_query.order_by(getattr(Room, sort_field).desc())
-        else:
-            base_query = base_query.order_by(getattr(Room, sort_field).asc())
-
-        rooms = self.session.exec(base_query.offset(offset).limit(limit)).all()
-        return [self._room_to_read(room, None) for room in rooms]
+        base_query = _order_rooms(base_query, sort, offset, cursor)
+        rooms = self.read_session.exec(base_query.limit(limit)).all()
+        return self._rooms_to_read(rooms)
 
     def delete_room(self, room_code: str) -> None:
         room = self.session.get(Room, room_code)
@@ -580,6 +1013,166 @@ class Repository:
         self.session.flush()
 
 
+class DeckStreamImport:
+    """Consumes the NDJSON deck format line by line.
+
+    The first record must be the ``{"deck": ...}`` header; ``{"card": ...}``
+    records are buffered and written through ``bulk_import_cards`` every
+    ``_IN_CHUNK_SIZE`` cards, so memory is bounded by one chunk plus the card ids.
+    """
+
+    def __init__(self, repo: Repository, target: Deck | None):
+        self.repo = repo
+        self.target = target
+        self.deck: DeckBase | None = None
+        self._pending: list[CardBase] = []
+        self._card_ids: list[int] = []
+        self._line_number = 0
+
+    def feed(self, lines: Iterable[bytes]) -> None:
+        for line in lines:
+            self._line_number += 1
+            if not line.strip():
+                continue
+            kind = "deck" if self.deck is None else "card"
+            try:
+                record = json.loads(line)[kind]
+                if self.deck is None:
+                    self.deck = DeckBase.parse_obj(record)
+                else:
+                    self._pending.append(CardBase.parse_obj(record))
+            except (ValueError, KeyError, TypeError) as error:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail=f"Line {self._line_number}: expected a {kind!r} record ({error})",
+                )
+            if len(self._pending) >= _IN_CHUNK_SIZE:
+                self._flush()
+
+    def _flush(self) -> None:
+        if self._pending:
+            self._card_ids.extend(self.repo._import_cards_or_raise(self._pending, len(self._card_ids)))
+            self._pending = []
+
+    def finish(self) -> DeckRead:
+        if self.deck is None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Missing deck header line"
+            )
+        self._flush()
+        card_ids = self.repo._resolve_import_card_ids(self.deck.card_ids, self._card_ids)
+        return self.repo._save_imported_deck(self.target, self.deck, card_ids)
+
+
+class _OffloadingRepository(Repository):
+    """``Repository`` driven through ``AsyncSession.run_sync``.
+
+    Its queries already yield to the event loop through the async driver; password
+    hashing and HTTP calls run on worker threads and are awaited from the greenlet.
+    """
+
+    def _offload(self, function: Callable[..., T], *args) -> T:
+        return await_only(run_in_threadpool(function, *args))
+
+    def _wait(self, future: Future) -> T:
+        return await_only(asyncio.wrap_future(future))
+
+
+class AsyncRepository:
+    """Async facade with the same public methods as :class:`Repository`.
+
+    Each call runs the synchronous implementation on the ``AsyncSession`` with
+    ``run_sync``, so routes can ``await`` it on the event loop instead of holding
+    a threadpool worker for the whole round-trip. Use :meth:`run` for anything
+    else that touches the sessions, such as a :class:`DeckStreamImport`.
+    """
+
+    def __init__(self, session: AsyncSession, read_session: AsyncSession | None = None):
+        self.session = session
+        self.sync = _OffloadingRepository(
+            session.sync_session, read_session.sync_session if read_session else None
+        )
+
+    async def run(self, function: Callable[..., T], *args, **kwargs) -> T:
+        # Read-session queries issued inside the callback are awaited by the same greenlet.
+        return await self.session.run_sync(lambda _session: function(*args, **kwargs))
+
+
+def _async_method(name: str):
+    @wraps(getattr(Repository, name))
+    async def method(self: AsyncRepository, *args, **kwargs):
+        return await self.run(getattr(self.sync, name), *args, **kwargs)
+
+    return method
+
+
+# Generators would outlive run_sync; stream exports keep a sync session of their own.
+for _name, _member in list(vars(Repository).items()):
+    if callable(_member) and not _name.startswith("_") and _name != "iter_deck_export_ndjson":
+        setattr(Repository, _name, instrument_repository_method(_name, _member))
+        setattr(AsyncRepository, _name, _async_method(_name))
+
+
+def _room_sort_column(sort: str | None):
+    sort = sort or "-created_at"
+    sort_field = sort.lstrip("-")
+    if sort_field not in Room.__table__.columns:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported sort field")
+    return Room.__table__.columns[sort_field], sort.startswith("-")
+
+
+def _order_rooms(query, sort: str | None, offset: int, cursor: str | None):
+    """Order rooms by ``sort`` with ``code`` as tie-breaker and seek past ``cursor``.
+
+    The tie-breaker makes the order total, so a cursor holding the last row's
+    ``(sort value, code)`` resumes exactly after it even while rooms are added.
+    """
+
+    column, descending = _room_sort_column(sort)
+    if descending:
+        query = query.order_by(column.desc(), Room.code.desc())
+    else:
+        query = query.order_by(column.asc(), Room.code.asc())
+    if not cursor:
+        return query.offset(offset)
+    value, code = decode_cursor(cursor, Room.__fields__[column.name].type_, str)
+    key = tuple_(column, Room.code)
+    return query.where(key < (value, code) if descending else key > (value, code))
+
+
+def room_cursor(room: RoomRead, sort: str | None) -> str:
+    column, _ = _room_sort_column(sort)
+    return encode_cursor(getattr(room, column.name), room.code)
+
+
+def next_cursor_headers(cursor: str | None) -> dict[str, str]:
+    return {NEXT_CURSOR_HEADER: cursor} if cursor else {}
+
+
+def encode_cursor(*values) -> str:
+    """Opaque page token holding the sort key of the last row on a page."""
+
+    payload = json.dumps(list(values), separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, *types: type) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(token)
+        decoded = []
+        for value, expected in zip(values, types):
+            if expected is datetime:
+                value = datetime.fromisoformat(value)
+            elif type(value) is not expected:
+                raise ValueError(token)
+            decoded.append(value)
+        return decoded
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
 def paginate(
     limit: Optional[int], offset: Optional[int], default_limit: int, max_limit: Optional[int] = None
 ) -> Tuple[int, int]:
@@ -1,9 +1,38 @@
-from fastapi import APIRouter, Depends
+from itertools import chain
 
+from fastapi import APIRouter, BackgroundTasks, Depends, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.cache import encode_json, etag_response
 from app.config import get_settings
-from app.dependencies import get_admin_user, get_repository
-from app.models import CardRead, CardBase, DeckRead, DeckBase, DeckImport, RoomRead, UserRead
-from app.repository import Repository, paginate
+from app.db import read_session_scope
+from app.dependencies import get_admin_user, get_event_hub, get_game_engine, get_repository
+from app.events import LOBBY_CHANNEL, RoomEventHub
+from app.hashing import password_hasher
+from app.game import GameEngine
+from app.models import (
+    CardBase,
+    CardBulkImport,
+    CardBulkImportRead,
+    CardRead,
+    DeckBase,
+    DeckImport,
+    DeckRead,
+    RoomRead,
+    UserRead,
+)
+from app.repository import (
+    AsyncRepository,
+    DeckStreamImport,
+    Repository,
+    encode_cursor,
+    next_cursor_headers,
+    paginate,
+    room_cursor,
+)
+from app.routes.cards import card_page
+from app.sessions import session_tokens
 
 router = APIRouter(
     prefix="/admin", tags=["admin"], dependencies=[Depends(get_admin_user)]
@@ -11,104 +40,247 @@ router = APIRouter(
 
 
 @router.get("/verify")
-def verify_admin():
+async def verify_admin():
     return {"status": "ok"}
 
 
+@router.get("/hashing")
+async def hashing_metrics():
+    """Password-hash pool depth, rejections and latency totals for this worker process."""
+
+    return password_hasher.metrics()
+
+
 @router.post("/cards", response_model=CardRead)
-def create_card(payload: CardBase, repo: Repository = Depends(get_repository)):
-    return repo.add_card(payload)
+async def create_card(payload: CardBase, repo: AsyncRepository = Depends(get_repository)):
+    return await repo.add_card(payload)
+
+
+@router.post("/cards/bulk", response_model=CardBulkImportRead)
+async def bulk_import_cards(
+    payload: CardBulkImport, repo: AsyncRepository = Depends(get_repository)
+):
+    return await repo.bulk_import_cards(payload.cards)
 
 
 @router.get("/cards", response_model=list[CardRead])
-def list_cards(limit: int | None = None, offset: int | None = None, repo: Repository = Depends(get_repository)):
+async def list_cards(
+    request: Request,
+    limit: int | None = None,
+    offset: int | None = None,
+    cursor: str | None = None,
+    repo: AsyncRepository = Depends(get_repository),
+):
     settings = get_settings()
     limit_value, offset_value = paginate(
         limit, offset, settings.default_page_size, settings.max_page_size
     )
-    return repo.list_cards(limit_value, offset_value)
+    card_revision, _ = await repo.catalog_revisions()
+    return await etag_response(
+        request,
+        f'"cards-{card_revision}-{limit_value}-{cursor or offset_value}"',
+        lambda: card_page(repo, limit_value, offset_value, cursor),
+    )
 
 
 @router.put("/cards/{card_id}", response_model=CardRead)
-def update_card(card_id: int, payload: CardBase, repo: Repository = Depends(get_repository)):
-    return repo.update_card(card_id, payload)
+async def update_card(
+    card_id: int, payload: CardBase, repo: AsyncRepository = Depends(get_repository)
+):
+    return await repo.update_card(card_id, payload)
 
 
 @router.delete("/cards/{card_id}", status_code=204)
-def delete_card(card_id: int, repo: Repository = Depends(get_repository)):
-    repo.delete_card(card_id)
+async def delete_card(card_id: int, repo: AsyncRepository = Depends(get_repository)):
+    await repo.delete_card(card_id)
+
+
+@router.get("/cards/{card_id}/decks", response_model=list[DeckRead])
+async def list_card_decks(card_id: int, repo: AsyncRepository = Depends(get_repository)):
+    return await repo.list_card_decks(card_id)
 
 
 @router.post("/decks", response_model=DeckRead)
-def create_deck(payload: DeckBase, repo: Repository = Depends(get_repository)):
-    return repo.add_deck(payload)
+async def create_deck(payload: DeckBase, repo: AsyncRepository = Depends(get_repository)):
+    return await repo.add_deck(payload)
 
 
 @router.get("/decks", response_model=list[DeckRead])
-def list_decks(limit: int | None = None, offset: int | None = None, repo: Repository = Depends(get_repository)):
+async def list_decks(
+    request: Request,
+    limit: int | None = None,
+    offset: int | None = None,
+    cursor: str | None = None,
+    repo: AsyncRepository = Depends(get_repository),
+):
     settings = get_settings()
     limit_value, offset_value = paginate(
         limit, offset, settings.default_page_size, settings.max_page_size
     )
-    return repo.list_decks(limit_value, offset_value)
+    _, deck_revision = await repo.catalog_revisions()
+    return await etag_response(
+        request,
+        f'"decks-{deck_revision}-{limit_value}-{cursor or offset_value}"',
+        lambda: _deck_page(repo, limit_value, offset_value, cursor),
+    )
+
+
+async def _deck_page(repo: AsyncRepository, limit: int, offset: int, cursor: str | None):
+    decks = await repo.list_decks(limit, offset, cursor)
+    next_cursor = encode_cursor(decks[-1].id) if len(decks) == limit else None
+    return encode_json([deck.dict() for deck in decks]), next_cursor_headers(next_cursor)
 
 
 @router.put("/decks/{deck_id}", response_model=DeckRead)
-def update_deck(deck_id: int, payload: DeckBase, repo: Repository = Depends(get_repository)):
-    return repo.update_deck(deck_id, payload)
+async def update_deck(
+    deck_id: int, payload: DeckBase, repo: AsyncRepository = Depends(get_repository)
+):
+    return await repo.update_deck(deck_id, payload)
 
 
 @router.delete("/decks/{deck_id}", status_code=204)
-def delete_deck(deck_id: int, repo: Repository = Depends(get_repository)):
-    repo.delete_deck(deck_id)
+async def delete_deck(deck_id: int, repo: AsyncRepository = Depends(get_repository)):
+    await repo.delete_deck(deck_id)
 
 
 @router.get("/decks/{deck_id}/export")
-def export_deck(deck_id: int, repo: Repository = Depends(get_repository)):
-    return repo.export_deck(deck_id)
+async def export_deck(
+    deck_id: int, request: Request, repo: AsyncRepository = Depends(get_repository)
+):
+    card_revision, deck_revision = await repo.catalog_revisions()
+    return await etag_response(
+        request,
+        f'"deck-{deck_id}-{card_revision}-{deck_revision}"',
+        lambda: repo.export_deck_json(deck_id),
+    )
+
+
+def _stream_deck_export(deck_id: int):
+    # The request session is closed once the route returns, so the body gets its own.
+    with read_session_scope() as session:
+        yield from Repository(session).iter_deck_export_ndjson(deck_id)
+
+
+@router.get("/decks/{deck_id}/export.ndjson")
+async def export_deck_ndjson(deck_id: int):
+    lines = _stream_deck_export(deck_id)
+    # Reading the deck line before the headers go out turns a missing deck into a 404, not a truncated 200.
+    first = await run_in_threadpool(next, lines)
+    return StreamingResponse(chain([first], lines), media_type="application/x-ndjson")
+
+
+async def _consume_ndjson(
+    request: Request, repo: AsyncRepository, importer: DeckStreamImport
+) -> DeckRead:
+    buffer = b""
+    async for chunk in request.stream():
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        if lines:
+            await repo.run(importer.feed, lines)
+    await repo.run(importer.feed, [buffer])
+    return await repo.run(importer.finish)
+
+
+@router.post("/decks/import.ndjson", response_model=DeckRead)
+async def import_deck_ndjson(request: Request, repo: AsyncRepository = Depends(get_repository)):
+    return await _consume_ndjson(request, repo, await repo.stream_import_deck())
+
+
+@router.post("/decks/{deck_id}/import.ndjson", response_model=DeckRead)
+async def import_deck_ndjson_into_existing(
+    deck_id: int, request: Request, repo: AsyncRepository = Depends(get_repository)
+):
+    importer = await repo.stream_import_deck(deck_id)
+    return await _consume_ndjson(request, repo, importer)
 
 
 @router.post("/decks/import", response_model=DeckRead)
-def import_deck(payload: DeckImport, repo: Repository = Depends(get_repository)):
-    return repo.import_deck(payload)
+async def import_deck(payload: DeckImport, repo: AsyncRepository = Depends(get_repository)):
+    return await repo.import_deck(payload)
 
 
 @router.post("/decks/{deck_id}/import", response_model=DeckRead)
-def import_deck_into_existing(
-    deck_id: int, payload: DeckImport, repo: Repository = Depends(get_repository)
+async def import_deck_into_existing(
+    deck_id: int, payload: DeckImport, repo: AsyncRepository = Depends(get_repository)
 ):
-    return repo.import_deck_into_existing(deck_id, payload)
+    return await repo.import_deck_into_existing(deck_id, payload)
 
 
 @router.get("/users", response_model=list[UserRead])
-def list_users(limit: int | None = None, offset: int | None = None, repo: Repository = Depends(get_repository)):
+async def list_users(
+    response: Response,
+    limit: int | None = None,
+    offset: int | None = None,
+    cursor: str | None = None,
+    repo: AsyncRepository = Depends(get_repository),
+):
     settings = get_settings()
     limit_value, offset_value = paginate(
         limit, offset, settings.default_page_size, settings.max_page_size
     )
-    return repo.list_users(limit_value, offset_value)
+    users = await repo.list_users(limit_value, offset_value, cursor)
+    if len(users) == limit_value:
+        response.headers.update(next_cursor_headers(encode_cursor(users[-1].id)))
+    return users
+
+
+def _publish_user_removal(hub: RoomEventHub, user_id: str, affected: dict) -> None:
+    for room_code, role in affected["left"]:
+        hub.publish(room_code, {"type": "member_left", "room": room_code, "user": user_id, "role": role})
+    for room_code in affected["deleted"]:
+        _publish_room_deleted(hub, room_code)
+
+
+def _publish_room_deleted(hub: RoomEventHub, room_code: str) -> None:
+    event = {"type": "room_deleted", "room": room_code, "status": "deleted"}
+    hub.publish(room_code, event)
+    hub.publish(LOBBY_CHANNEL, event)
 
 
 @router.delete("/users/{user_id}", status_code=204)
-def delete_user(user_id: str, repo: Repository = Depends(get_repository)):
-    repo.delete_user(user_id)
+async def delete_user(
+    user_id: str,
+    background_tasks: BackgroundTasks,
+    repo: AsyncRepository = Depends(get_repository),
+    hub: RoomEventHub = Depends(get_event_hub),
+    engine: GameEngine = Depends(get_game_engine),
+):
+    affected = await repo.delete_user(user_id)
+    session_tokens.revoke_user(user_id)
+    for room_code in affected["deleted"]:
+        engine.end(room_code)
+    background_tasks.add_task(_publish_user_removal, hub, user_id, affected)
 
 
 @router.get("/rooms", response_model=list[RoomRead])
-def list_all_rooms(
+async def list_all_rooms(
+    response: Response,
     limit: int | None = None,
     offset: int | None = None,
     status: str | None = None,
     sort: str | None = None,
-    repo: Repository = Depends(get_repository),
+    cursor: str | None = None,
+    repo: AsyncRepository = Depends(get_repository),
 ):
     settings = get_settings()
     limit_value, offset_value = paginate(
         limit, offset, settings.default_page_size, settings.max_page_size
     )
-    return repo.list_all_rooms(limit_value, offset_value, status, sort)
+    rooms = await repo.list_all_rooms(limit_value, offset_value, status, sort, cursor)
+    if len(rooms) == limit_value:
+        response.headers.update(next_cursor_headers(room_cursor(rooms[-1], sort)))
+    return rooms
 
 
 @router.delete("/rooms/{room_code}", status_code=204)
-def delete_room(room_code: str, repo: Repository = Depends(get_repository)):
-    repo.delete_room(room_code)
+async def delete_room(
+    room_code: str,
+    background_tasks: BackgroundTasks,
+    repo: AsyncRepository = Depends(get_repository),
+    hub: RoomEventHub = Depends(get_event_hub),
+    engine: GameEngine = Depends(get_game_engine),
+):
+    await repo.delete_room(room_code)
+    engine.end(room_code)
+    background_tasks.add_task(_publish_room_deleted, hub, room_code)
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from pydantic import ValidationError
 
 from app.config import get_settings
-from app.dependencies import get_current_user, get_repository, get_settings_dep
-from app.models import LoginRequest, PasswordChangeRequest, Provider, UserRead
-from app.repository import Repository
+from app.dependencies import get_bearer_token, get_current_user, get_repository, get_settings_dep
+from app.models import LoginRequest, PasswordChangeRequest, Provider, SessionRead
+from app.repository import AsyncRepository
+from app.sessions import session_tokens
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -36,20 +37,31 @@ async def _parse_login_request(request: Request) -> LoginRequest:
         raise HTTPException(status_code=400, detail={"errors": exc.errors()}) from exc
 
 
-@router.post("/login", response_model=UserRead)
+@router.post("/login", response_model=SessionRead)
 async def login(
     payload: LoginRequest = Depends(_parse_login_request),
-    repo: Repository = Depends(get_repository),
+    repo: AsyncRepository = Depends(get_repository),
     settings=Depends(get_settings_dep),
 ):
     _validate_login_payload(payload, settings)
-    return repo.create_user(payload)
+    user = await repo.create_user(payload)
+    return session_tokens.issue(user)
 
 
-@router.post("/password", response_model=UserRead)
-def change_password(
+@router.post("/logout", status_code=204)
+async def logout(token: str | None = Depends(get_bearer_token)):
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session token is required")
+    session_tokens.revoke(token)
+
+
+@router.post("/password", response_model=SessionRead)
+async def change_password(
     payload: PasswordChangeRequest,
     current_user=Depends(get_current_user),
-    repo: Repository = Depends(get_repository),
+    repo: AsyncRepository = Depends(get_repository),
 ):
-    return repo.change_password(current_user.id, payload.current_password, payload.new_password)
+    user = await repo.change_password(current_user.id, payload.current_password, payload.new_password)
+    # Sessions opened with the old password end here; the caller continues with the new token.
+    session_tokens.revoke_user(user.id)
+    return session_tokens.issue(user)
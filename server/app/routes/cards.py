@@ -1,21 +1,34 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 
+from app.cache import etag_response
 from app.config import get_settings
 from app.dependencies import get_repository
 from app.models import CardRead
-from app.repository import Repository, paginate
+from app.repository import AsyncRepository, next_cursor_headers, paginate
 
 router = APIRouter(prefix="/cards", tags=["cards"])
 
 
+async def card_page(repo: AsyncRepository, limit: int, offset: int, cursor: str | None):
+    body, next_cursor = await repo.list_cards_json(limit, offset, cursor)
+    return body, next_cursor_headers(next_cursor)
+
+
 @router.get("", response_model=list[CardRead])
-def list_cards(
+async def list_cards(
+    request: Request,
     limit: int | None = None,
     offset: int | None = None,
-    repo: Repository = Depends(get_repository),
+    cursor: str | None = None,
+    repo: AsyncRepository = Depends(get_repository),
 ):
     settings = get_settings()
     limit_value, offset_value = paginate(
         limit, offset, settings.default_page_size, settings.max_page_size
     )
-    return repo.list_cards(limit_value, offset_value)
+    card_revision, _ = await repo.catalog_revisions()
+    return await etag_response(
+        request,
+        f'"cards-{card_revision}-{limit_value}-{cursor or offset_value}"',
+        lambda: card_page(repo, limit_value, offset_value, cursor),
+    )
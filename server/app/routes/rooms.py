@@ -1,30 +1,55 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response, WebSocket, status
 
 from app.config import get_settings
-from app.dependencies import get_active_user, get_optional_user, get_repository
-from app.models import Role, RoomRead, RoomCreate, UserRead, RoomJoin
-from app.repository import Repository, paginate
+from app.db import async_session_scope
+from app.dependencies import (
+    get_active_user,
+    get_event_hub,
+    get_game_engine,
+    get_optional_user,
+    get_repository,
+)
+from app.events import LOBBY_CHANNEL, RoomEventHub, room_event
+from app.game import GameEngine, MoveResult
+from app.models import MatchMove, MatchStart, Role, RoomRead, RoomCreate, UserRead, RoomJoin
+from app.repository import AsyncRepository, next_cursor_headers, paginate, room_cursor
+from app.sessions import session_tokens
 
 router = APIRouter(prefix="/rooms", tags=["rooms"])
 
 
+def _publish_room(hub: RoomEventHub, room: RoomRead, event_type: str, **fields) -> None:
+    event = room_event(room.dict(), event_type, **fields)
+    hub.publish(room.code, event)
+    if room.visibility == "public":
+        hub.publish(LOBBY_CHANNEL, event)
+
+
 @router.post("", response_model=RoomRead)
-def create_room(
+async def create_room(
     payload: RoomCreate,
+    background_tasks: BackgroundTasks,
     current_user: UserRead = Depends(get_active_user),
-    repo: Repository = Depends(get_repository),
+    repo: AsyncRepository = Depends(get_repository),
+    hub: RoomEventHub = Depends(get_event_hub),
 ):
-    return repo.create_room(payload, host_user_id=current_user.id)
+    room = await repo.create_room(payload, host_user_id=current_user.id)
+    background_tasks.add_task(_publish_room, hub, room, "room_created", name=room.name)
+    return room
 
 
 @router.get("", response_model=list[RoomRead])
-def list_rooms(
+async def list_rooms(
+    response: Response,
     limit: int | None = None,
     offset: int | None = None,
     visibility: str | None = None,
     status: str | None = "active",
     sort: str | None = "-created_at",
-    repo: Repository = Depends(get_repository),
+    cursor: str | None = None,
+    repo: AsyncRepository = Depends(get_repository),
     current_user: UserRead | None = Depends(get_optional_user),
 ):
     settings = get_settings()
@@ -36,14 +61,250 @@ def list_rooms(
             status_code=403, detail="Guest accounts cannot access this resource"
         )
     user_id = current_user.id if current_user else None
-    return repo.list_rooms(limit_value, offset_value, user_id, visibility, status, sort)
+    rooms = await repo.list_rooms(limit_value, offset_value, user_id, visibility, status, sort, cursor)
+    if len(rooms) == limit_value:
+        response.headers.update(next_cursor_headers(room_cursor(rooms[-1], sort)))
+    return rooms
 
 
 @router.post("/{code}/join", response_model=RoomRead)
-def join_room(
+async def join_room(
     code: str,
     payload: RoomJoin,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    repo: AsyncRepository = Depends(get_repository),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    room, joined = await repo.join_room(code, current_user.id, payload.as_spectator)
+    if joined:
+        role = "spectator" if payload.as_spectator else "player"
+        background_tasks.add_task(_publish_room, hub, room, "member_joined", user=current_user.id, role=role)
+    return room
+
+
+async def _can_subscribe(code: str | None, token: str | None) -> bool:
+    user = None
+    if token:
+        try:
+            user = session_tokens.verify(token)
+        except HTTPException:
+            return False
+        if user.role == Role.GUEST:
+            return False
+    if code is None:
+        return True
+    async with async_session_scope() as session:
+        try:
+            room = await AsyncRepository(session).get_room(code, user.id if user else None)
+        except HTTPException:
+            return False
+    return room.visibility == "public" or room.is_joined
+
+
+async def _stream_events(websocket: WebSocket, hub: RoomEventHub, channel: str) -> None:
+    await websocket.accept()
+    subscription = hub.subscribe(channel)
+
+    async def forward():
+        while True:
+            await websocket.send_text(await subscription.get())
+
+    sender = asyncio.create_task(forward())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        hub.unsubscribe(subscription)
+
+
+@router.websocket("/events")
+async def lobby_events(
+    websocket: WebSocket,
+    token: str | None = None,
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    """Push public room creations, occupancy and status changes to lobby clients."""
+
+    if not await _can_subscribe(None, token):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await _stream_events(websocket, hub, LOBBY_CHANNEL)
+
+
+@router.websocket("/{code}/events")
+async def room_events(
+    websocket: WebSocket,
+    code: str,
+    token: str | None = None,
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    """Push membership, status and match events for one room.
+
+    Browsers cannot set headers on WebSocket handshakes, so the caller passes its
+    session token from ``/auth/login`` as the ``token`` query parameter. Public
+    rooms accept anonymous subscribers; private rooms are limited to members.
+    """
+
+    if not await _can_subscribe(code, token):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await _stream_events(websocket, hub, code)
+
+
+async def _require_host(repo: AsyncRepository, code: str, current_user: UserRead) -> RoomRead:
+    room = await repo.get_room(code, current_user.id)
+    if room.host_user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Only the room host can manage the match")
+    return room
+
+
+def _match_event(action: str, user_id: str, move: MoveResult, code: str, **fields) -> dict:
+    return {
+        "type": "match",
+        "room": code,
+        "action": action,
+        "user": user_id,
+        "deck": move.deck_count,
+        **fields,
+    }
+
+
+@router.post("/{code}/match")
+async def start_match(
+    code: str,
+    payload: MatchStart,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    repo: AsyncRepository = Depends(get_repository),
+    engine: GameEngine = Depends(get_game_engine),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    await _require_host(repo, code, current_user)
+    exported = await repo.export_deck(payload.deck_id)
+    started = engine.start(
+        code,
+        exported["cards"],
+        exported["deck"].card_ids,
+        await repo.list_room_player_ids(code),
+        payload.seed,
+        viewer_id=current_user.id,
+    )
+    background_tasks.add_task(
+        hub.publish, code, _match_event("start", current_user.id, started, code)
+    )
+    return started.snapshot
+
+
+@router.get("/{code}/match")
+async def get_match(
+    code: str,
     current_user: UserRead = Depends(get_active_user),
-    repo: Repository = Depends(get_repository),
+    repo: AsyncRepository = Depends(get_repository),
+    engine: GameEngine = Depends(get_game_engine),
 ):
-    return repo.join_room(code, current_user.id, payload.as_spectator)
+    room = await repo.get_room(code, current_user.id)
+    if not room.is_joined:
+        raise HTTPException(status_code=403, detail="Only room members can view the match")
+    return engine.snapshot(code, current_user.id)
+
+
+@router.delete("/{code}/match", status_code=204)
+async def end_match(
+    code: str,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    repo: AsyncRepository = Depends(get_repository),
+    engine: GameEngine = Depends(get_game_engine),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    await _require_host(repo, code, current_user)
+    engine.end(code)
+    background_tasks.add_task(
+        hub.publish, code, {"type": "match", "room": code, "action": "end", "user": current_user.id}
+    )
+
+
+@router.post("/{code}/match/draw")
+def draw_card(
+    code: str,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    engine: GameEngine = Depends(get_game_engine),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    # The drawn card stays private to the player; others only learn the deck shrank.
+    move = engine.draw(code, current_user.id)
+    background_tasks.add_task(hub.publish, code, _match_event("draw", current_user.id, move, code))
+    return move.snapshot
+
+
+@router.post("/{code}/match/play")
+def play_card(
+    code: str,
+    payload: MatchMove,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    engine: GameEngine = Depends(get_game_engine),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    move = engine.play(code, current_user.id, payload.card_id)
+    background_tasks.add_task(
+        hub.publish, code, _match_event("play", current_user.id, move, code, card=payload.card_id)
+    )
+    return move.snapshot
+
+
+@router.post("/{code}/match/recall")
+def recall_card(
+    code: str,
+    payload: MatchMove,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    engine: GameEngine = Depends(get_game_engine),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    move = engine.recall(code, current_user.id, payload.card_id)
+    background_tasks.add_task(
+        hub.publish, code, _match_event("recall", current_user.id, move, code, card=payload.card_id)
+    )
+    return move.snapshot
+
+
+@router.post("/{code}/match/discard")
+def discard_card(
+    code: str,
+    payload: MatchMove,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    engine: GameEngine = Depends(get_game_engine),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    move = engine.discard(code, current_user.id, payload.card_id)
+    background_tasks.add_task(
+        hub.publish, code, _match_event("discard", current_user.id, move, code, card=payload.card_id)
+    )
+    return move.snapshot
+
+
+@router.post("/{code}/match/promote")
+def promote_card(
+    code: str,
+    payload: MatchMove,
+    background_tasks: BackgroundTasks,
+    current_user: UserRead = Depends(get_active_user),
+    engine: GameEngine = Depends(get_game_engine),
+    hub: RoomEventHub = Depends(get_event_hub),
+):
+    move = engine.promote(code, current_user.id, payload.card_id)
+    background_tasks.add_task(
+        hub.publish,
+        code,
+        _match_event(
+            "promote", current_user.id, move, code, card=payload.card_id, resources=list(move.value)
+        ),
+    )
+    return move.snapshot
@@ -0,0 +1,134 @@
+"""Short-lived signed session tokens issued at login.
+
+A token is an HS256 JWT carrying the user's id, provider, role and display name,
+so ``get_current_user`` authenticates a ``Bearer`` request without a database
+lookup or a bcrypt check. Logout, password changes and account deletion revoke
+tokens through an in-memory list that only needs to remember an entry until the
+tokens it covers expire. The list is per worker process: other workers keep
+accepting a revoked token until it expires, so keep ``SESSION_TTL_SECONDS``
+short when running several workers.
+"""
+
+import logging
+import secrets
+import threading
+import time
+
+from fastapi import HTTPException, status
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTError
+
+from app.config import get_settings
+from app.models import Provider, Role, SessionRead, UserRead
+
+logger = logging.getLogger(__name__)
+
+ALGORITHM = "HS256"
+VERIFIED_TOKEN_CACHE_SIZE = 4096
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+class SessionTokens:
+    def __init__(self, secret: str, ttl_seconds: int):
+        self.secret = secret
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # jti -> exp for single revoked tokens; user id -> cutoff for "every token issued before now".
+        self._revoked_tokens: dict[str, float] = {}
+        self._revoked_users: dict[str, float] = {}
+        # Clients resend the same token on every request: check its signature once, expiry and revocation every time.
+        self._verified: dict[str, dict] = {}
+
+    def issue(self, user: UserRead) -> SessionRead:
+        # A float iat keeps tokens issued right after revoke_user() distinguishable from older ones.
+        issued_at = time.time()
+        claims = {
+            "sub": user.id,
+            "provider": user.provider.value,
+            "role": user.role.value,
+            "name": user.display_name,
+            "jti": secrets.token_urlsafe(12),
+            "iat": issued_at,
+            "exp": int(issued_at) + self.ttl_seconds,
+        }
+        token = jwt.encode(claims, self.secret, algorithm=ALGORITHM)
+        return SessionRead(**user.dict(), user=user, access_token=token, expires_in=self.ttl_seconds)
+
+    def _decode_signed(self, token: str) -> dict:
+        try:
+            return jwt.decode(token, self.secret, algorithms=[ALGORITHM], options={"require_exp": True})
+        except ExpiredSignatureError:
+            raise _unauthorized("Session token has expired")
+        except JWTError:
+            raise _unauthorized("Invalid session token")
+
+    def _verify_signature(self, token: str) -> dict:
+        claims = self._verified.get(token)
+        if claims is None:
+            claims = self._decode_signed(token)
+            # Only correctly signed tokens are kept, at most VERIFIED_TOKEN_CACHE_SIZE of them (about 2 MB).
+            with self._lock:
+                if len(self._verified) >= VERIFIED_TOKEN_CACHE_SIZE:
+                    del self._verified[next(iter(self._verified))]
+                self._verified[token] = claims
+        return claims
+
+    def _decode(self, token: str) -> dict:
+        claims = self._verify_signature(token)
+        if claims["exp"] < time.time():
+            raise _unauthorized("Session token has expired")
+        return claims
+
+    def verify(self, token: str) -> UserRead:
+        claims = self._decode(token)
+        if claims.get("jti") in self._revoked_tokens:
+            raise _unauthorized("Session has been revoked")
+        cutoff = self._revoked_users.get(claims["sub"])
+        if cutoff is not None and claims["iat"] <= cutoff:
+            raise _unauthorized("Session has been revoked")
+        return UserRead(
+            id=claims["sub"],
+            provider=Provider(claims["provider"]),
+            role=Role(claims["role"]),
+            display_name=claims["name"],
+        )
+
+    def revoke(self, token: str) -> None:
+        claims = self._decode(token)
+        with self._lock:
+            self._prune()
+            self._revoked_tokens[claims["jti"]] = claims["exp"]
+
+    def revoke_user(self, user_id: str) -> None:
+        with self._lock:
+            self._prune()
+            self._revoked_users[user_id] = time.time()
+
+    def _prune(self) -> None:
+        now = time.time()
+        self._revoked_tokens = {jti: exp for jti, exp in self._revoked_tokens.items() if exp >= now}
+        self._revoked_users = {
+            user_id: cutoff for user_id, cutoff in self._revoked_users.items() if cutoff + self.ttl_seconds >= now
+        }
+
+
+def _build_session_tokens() -> SessionTokens:
+    settings = get_settings()
+    if settings.session_secret:
+        return SessionTokens(settings.session_secret, settings.session_ttl_seconds)
+    # Settings only allow this in development.
+    logger.warning(
+        "SESSION_SECRET is not set: signing session tokens with a random key, so they only work in this "
+        "process and stop working when it restarts"
+    )
+    return SessionTokens(secrets.token_urlsafe(32), settings.session_ttl_seconds)
+
+
+session_tokens = _build_session_tokens()
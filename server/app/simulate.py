@@ -0,0 +1,307 @@
+"""Monte Carlo balance simulator for decks.
+
+Loads a deck through the same ``DeckImport``/``CardBase`` models used by the
+admin import endpoint and plays many games per player count. Games run in
+lockstep batches: a batch of ``B`` games keeps resources in one
+``(B, players, 5)`` NumPy array, so every turn applies the drawn cards to all
+games with a handful of vector operations. Batches are fanned out across a
+``ProcessPoolExecutor``. Run from the ``server`` directory::
+
+    python -m app.simulate ../cards/sample-deck.json --games 100000 --players 3 4 5 6
+
+Rules follow the top-level README: players start as recruits with one of each
+resource and draw one card per turn. Blunders hit the drawer, scandals hit
+everyone, and the active policy picks a target for every other card. Rank-ups
+spend the resources listed in :data:`PROMOTION_COSTS`. A game ends when someone
+reaches the top rank or the deck runs out.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Sequence
+
+import numpy as np
+
+from app.game import RESOURCE_KEYS, STARTING_RESOURCES
+from app.models import CardBase, DeckImport
+
+RANKS = (
+    "recruit",
+    "soldier",
+    "sergeant",
+    "lieutenant",
+    "captain",
+    "major",
+    "colonel",
+    "general",
+)
+# Resources spent to leave each rank (row) in RESOURCE_KEYS order; the top rank has no row.
+PROMOTION_COSTS = np.array(
+    [[0, 1 + rank // 2, 1 + rank // 2, 1 + rank // 2, 1 + rank // 2] for rank in range(len(RANKS) - 1)],
+    dtype=np.int16,
+)
+SELF_ONLY_CATEGORY = "blunder"
+EVERYONE_CATEGORY = "scandal"
+DEFAULT_BATCH_SIZE = 5000
+
+Policy = Callable[[np.ndarray, np.ndarray, int, np.ndarray, np.random.Generator], np.ndarray]
+
+
+def _standing(resources: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """Comparable score per player: rank first, total resources as the tie-breaker."""
+
+    return ranks.astype(np.int32) * 1000 + resources.sum(axis=2)
+
+
+def selfish_policy(resources, ranks, current, effects, rng):
+    """Always play the drawn card on yourself."""
+
+    return np.full(effects.shape[0], current, dtype=np.intp)
+
+
+def random_policy(resources, ranks, current, effects, rng):
+    """Play the drawn card on a uniformly random player."""
+
+    return rng.integers(0, resources.shape[1], size=effects.shape[0])
+
+
+def greedy_policy(resources, ranks, current, effects, rng):
+    """Keep helpful cards and dump harmful ones on the strongest opponent."""
+
+    standing = _standing(resources, ranks)
+    standing[:, current] = np.iinfo(np.int32).min
+    leader = standing.argmax(axis=1)
+    helpful = effects.sum(axis=1) >= 0
+    return np.where(helpful, current, leader)
+
+
+POLICIES: dict[str, Policy] = {
+    "greedy": greedy_policy,
+    "random": random_policy,
+    "selfish": selfish_policy,
+}
+
+
+def resolve_policy(name: str) -> Policy:
+    """Look up a built-in policy or import one given as ``module:function``."""
+
+    if name in POLICIES:
+        return POLICIES[name]
+    module_name, _, attribute = name.partition(":")
+    if not attribute:
+        raise ValueError(f"Unknown policy {name!r}; use one of {sorted(POLICIES)} or module:function")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def load_deck(path: Path) -> list[CardBase]:
+    payload = DeckImport.parse_obj(json.loads(path.read_text(encoding="utf-8")))
+    if not payload.cards:
+        raise ValueError("Deck file must embed its cards to be simulated")
+    return list(payload.cards)
+
+
+def deck_arrays(cards: Sequence[CardBase]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    effects = np.array([[getattr(card, key) for key in RESOURCE_KEYS] for card in cards], dtype=np.int16)
+    self_only = np.array([card.category == SELF_ONLY_CATEGORY for card in cards])
+    everyone = np.array([card.category == EVERYONE_CATEGORY for card in cards])
+    return effects, self_only, everyone
+
+
+def simulate_batch(
+    effects: np.ndarray,
+    self_only: np.ndarray,
+    everyone: np.ndarray,
+    player_count: int,
+    games: int,
+    policy_name: str,
+    seed: int,
+) -> dict:
+    """Play ``games`` games in lockstep and return summed statistics."""
+
+    rng = np.random.default_rng(seed)
+    policy = resolve_policy(policy_name)
+    deck_size = effects.shape[0]
+    top_rank = len(RANKS) - 1
+    game_index = np.arange(games)
+
+    orders = rng.random((games, deck_size)).argsort(axis=1)
+    resources = np.tile(np.array(STARTING_RESOURCES, dtype=np.int16), (games, player_count, 1))
+    ranks = np.zeros((games, player_count), dtype=np.int8)
+    active = np.ones(games, dtype=bool)
+    lengths = np.full(games, deck_size, dtype=np.int32)
+    trajectory_sum = np.zeros((deck_size, len(RESOURCE_KEYS)), dtype=np.float64)
+    trajectory_games = np.zeros(deck_size, dtype=np.int64)
+
+    for turn in range(deck_size):
+        current = turn % player_count
+        cards = orders[:, turn]
+        drawn = effects[cards] * active[:, None]
+
+        targets = policy(resources, ranks, current, drawn, rng)
+        targets = np.where(self_only[cards], current, targets)
+        hits_everyone = everyone[cards]
+        single = ~hits_everyone
+        resources[game_index[single], targets[single]] += drawn[single]
+        resources[hits_everyone] += drawn[hits_everyone][:, None, :]
+        np.maximum(resources, 0, out=resources)
+
+        rank = ranks[:, current]
+        promotable = active & (rank < top_rank)
+        cost = PROMOTION_COSTS[np.minimum(rank, top_rank - 1)]
+        promotable &= (resources[:, current] >= cost).all(axis=1)
+        resources[:, current] -= cost * promotable[:, None]
+        ranks[:, current] += promotable
+
+        trajectory_sum[turn] += resources[active].mean(axis=1).sum(axis=0)
+        trajectory_games[turn] += active.sum()
+
+        finished = active & (ranks[:, current] == top_rank)
+        lengths[finished] = turn + 1
+        active &= ~finished
+        if not active.any():
+            break
+
+    standing = _standing(resources, ranks)
+    placement = (-standing).argsort(axis=1).argsort(axis=1)
+    return {
+        "lengths": np.bincount(lengths, minlength=deck_size + 1),
+        "rank_counts": np.stack(
+            [np.bincount(ranks[:, seat], minlength=len(RANKS)) for seat in range(player_count)]
+        ),
+        "placement_counts": np.stack(
+            [np.bincount(placement[:, seat], minlength=player_count) for seat in range(player_count)]
+        ),
+        "final_resources": resources.sum(axis=(0, 1)).astype(np.float64),
+        "trajectory_sum": trajectory_sum,
+        "trajectory_games": trajectory_games,
+    }
+
+
+def _merge(total: dict | None, part: dict) -> dict:
+    if total is None:
+        return part
+    return {key: total[key] + part[key] for key in total}
+
+
+def _summarize(player_count: int, games: int, totals: dict) -> dict:
+    lengths = totals["lengths"]
+    turns = np.arange(lengths.size)
+    cumulative = lengths.cumsum() / games
+
+    def length_percentile(fraction: float) -> int:
+        return int(np.searchsorted(cumulative, fraction))
+
+    rank_levels = np.arange(len(RANKS))
+    rank_counts = totals["rank_counts"]
+    reached = totals["trajectory_games"] > 0
+    trajectory = totals["trajectory_sum"][reached] / totals["trajectory_games"][reached][:, None]
+    return {
+        "players": player_count,
+        "games": games,
+        "game_length": {
+            "mean": float((turns * lengths).sum() / games),
+            "p50": length_percentile(0.5),
+            "p90": length_percentile(0.9),
+            "p99": length_percentile(0.99),
+            "histogram": lengths.tolist(),
+        },
+        "final_rank": {
+            "mean_by_seat": ((rank_counts * rank_levels).sum(axis=1) / games).round(3).tolist(),
+            "distribution_by_seat": rank_counts.tolist(),
+            "win_rate_by_seat": (totals["placement_counts"][:, 0] / games).round(4).tolist(),
+            "ranks": list(RANKS),
+        },
+        "final_resources_mean": dict(
+            zip(RESOURCE_KEYS, (totals["final_resources"] / (games * player_count)).round(3).tolist())
+        ),
+        "resource_trajectory": {
+            "resources": list(RESOURCE_KEYS),
+            "mean_per_turn": trajectory.round(3).tolist(),
+        },
+    }
+
+
+def run_simulation(
+    cards: Sequence[CardBase],
+    player_counts: Sequence[int],
+    games: int,
+    policy: str = "greedy",
+    workers: int | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    seed: int = 0,
+) -> list[dict]:
+    resolve_policy(policy)
+    effects, self_only, everyone = deck_arrays(cards)
+    jobs = []
+    for player_count in player_counts:
+        remaining = games
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            jobs.append((player_count, size, seed + len(jobs)))
+            remaining -= size
+
+    totals: dict[int, dict | None] = {player_count: None for player_count in player_counts}
+    if workers == 1:
+        results = (
+            simulate_batch(effects, self_only, everyone, count, size, policy, job_seed)
+            for count, size, job_seed in jobs
+        )
+        for (player_count, _, _), result in zip(jobs, results):
+            totals[player_count] = _merge(totals[player_count], result)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                executor.submit(simulate_batch, effects, self_only, everyone, count, size, policy, job_seed)
+                for count, size, job_seed in jobs
+            ]
+            for (player_count, _, _), future in zip(jobs, futures):
+                totals[player_count] = _merge(totals[player_count], future.result())
+    return [_summarize(player_count, games, totals[player_count]) for player_count in player_counts]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Simulate resource balance, ranks and game length for a deck")
+    parser.add_argument("deck", type=Path, help="DeckImport JSON file with embedded cards")
+    parser.add_argument("--games", type=int, default=10000, help="Games per player count")
+    parser.add_argument("--players", type=int, nargs="+", default=[3, 4, 5, 6], help="Player counts to simulate")
+    parser.add_argument("--policy", default="greedy", help=f"{sorted(POLICIES)} or module:function")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes (1 runs inline)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Games per vectorized batch")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the full JSON report to this file")
+    args = parser.parse_args(argv)
+
+    # The rules in the top-level README are written for 3-6 players.
+    if any(count < 3 or count > 6 for count in args.players):
+        parser.error("player counts must be between 3 and 6")
+    cards = load_deck(args.deck)
+
+    started = time.perf_counter()
+    report = run_simulation(
+        cards, args.players, args.games, args.policy, args.workers, args.batch_size, args.seed
+    )
+    elapsed = time.perf_counter() - started
+
+    for summary in report:
+        length = summary["game_length"]
+        print(
+            f"{summary['players']} players: length mean {length['mean']:.1f} "
+            f"(p50 {length['p50']}, p90 {length['p90']}), "
+            f"mean rank by seat {summary['final_rank']['mean_by_seat']}, "
+            f"win rate by seat {summary['final_rank']['win_rate_by_seat']}"
+        )
+    total_games = args.games * len(args.players)
+    print(f"{total_games} games in {elapsed:.1f}s ({total_games / elapsed:.0f} games/s)")
+    if args.output:
+        args.output.write_text(json.dumps({"policy": args.policy, "results": report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import importlib
+
+import pytest
+
+pytestmark = pytest.mark.sqlite_only
+
+
+@pytest.fixture()
+def load_db(tmp_path, monkeypatch):
+    def load(**environment):
+        monkeypatch.setenv("DATABASE_URL", str(tmp_path / "profile.db"))
+        monkeypatch.setenv("APP_ENV", "development")
+        for key, value in environment.items():
+            monkeypatch.setenv(key, value)
+        config = importlib.reload(importlib.import_module("app.config"))
+        config.get_settings.cache_clear()
+        return importlib.reload(importlib.import_module("app.db"))
+
+    yield load
+    monkeypatch.undo()
+    importlib.reload(importlib.import_module("app.config")).get_settings.cache_clear()
+
+
+def _pragmas(db) -> dict:
+    with db.engine.connect() as connection:
+        return {
+            name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size")
+        }
+
+
+def test_tuned_profile_applies_pragmas_and_pool_settings(load_db):
+    db = load_db(DATABASE_POOL_SIZE="3", SQLITE_BUSY_TIMEOUT_MS="1500")
+
+    assert _pragmas(db) == {
+        "journal_mode": "wal",
+        "synchronous": 1,
+        "busy_timeout": 1500,
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+    }
+    assert db.engine.pool.size() == 3
+
+
+def test_default_profile_keeps_sqlite_defaults(load_db):
+    db = load_db(DATABASE_PROFILE="default")
+
+    pragmas = _pragmas(db)
+    assert pragmas["journal_mode"] == "delete"
+    assert pragmas["synchronous"] == 2
+
+
+def test_full_urls_and_read_replica_routing(load_db, tmp_path):
+    from fastapi import HTTPException
+
+    from app.migrations import migrate
+    from app.models import DeckBase
+    from app.repository import Repository
+
+    db = load_db(DATABASE_READ_URL=f"sqlite:///{tmp_path / 'replica.db'}")
+    assert db.engine.url.get_backend_name() == "sqlite"
+    assert db.read_engine.url.database == str(tmp_path / "replica.db")
+    db.init_db()
+    # Stand-in for a replica that has not caught up with the primary yet.
+    migrate(db.read_engine)
+
+    with db.session_scope() as session, db.read_session_scope() as read_session:
+        repo = Repository(session, read_session)
+        repo.ensure_admin_user()
+        deck = repo.add_deck(DeckBase(name="Primary only"))
+
+        assert repo.list_decks(10, 0) == []
+        assert repo.list_users(10, 0) == []
+        with pytest.raises(HTTPException):
+            repo.get_deck(deck.id)
+        assert repo.get_user("admin") is not None
+
+    assert list(load_db(DATABASE_READ_URL="").get_read_session()) == [None]
+
+
+def test_async_repository_keeps_hashing_off_the_event_loop(load_db, monkeypatch):
+    import asyncio
+    import threading
+
+    from app.hashing import password_hasher
+    from app.models import LoginRequest
+    from app.repository import AsyncRepository, Repository
+
+    db = load_db()
+    db.init_db()
+    hashing_threads = []
+    hash_password = password_hasher._context.hash
+
+    def recording_hash(*args):
+        hashing_threads.append(threading.get_ident())
+        return hash_password(*args)
+
+    monkeypatch.setattr(password_hasher._context, "hash", recording_hash)
+
+    async def scenario():
+        async with db.async_session_scope() as session:
+            repo = AsyncRepository(session)
+            user = await repo.create_user(LoginRequest(provider="guest", display_name="Async", password="secret"))
+            assert await repo.verify_guest_password(user.id, "secret")
+            assert (await repo.get_user(user.id)).display_name == "Async"
+            return user.id, threading.get_ident()
+
+    user_id, loop_thread = asyncio.run(scenario())
+    assert hashing_threads and loop_thread not in hashing_threads
+    with db.session_scope() as session:
+        assert Repository(session).get_user(user_id) is not None
+
+
+def test_logins_and_password_checks_share_one_hashing_bucket_per_user(load_db, monkeypatch):
+    import threading
+    import time
+
+    from fastapi import HTTPException
+
+    from app import repository
+    from app.hashing import PasswordHasher
+    from app.models import LoginRequest
+    from app.repository import Repository
+
+    db = load_db()
+    db.init_db()
+    login = LoginRequest(provider="guest", display_name="Shared", password="secret")
+    with db.session_scope() as session:
+        user_id = Repository(session).create_user(login).id
+
+    release = threading.Event()
+
+    class BlockingContext:
+        def verify(self, password, password_hash):
+            release.wait(5)
+            return True
+
+    hasher = PasswordHasher(workers=1, queue_limit=8, identity_limit=1)
+    hasher._context = BlockingContext()
+    monkeypatch.setattr(repository, "password_hasher", hasher)
+
+    def check_header_password():
+        with db.session_scope() as session:
+            Repository(session).verify_guest_password(user_id, "secret")
+
+    checking = threading.Thread(target=check_header_password)
+    checking.start()
+    while hasher.metrics()["running"] == 0:
+        time.sleep(0.01)
+    try:
+        with db.session_scope() as session:
+            repo = Repository(session)
+            for attempt in (
+                lambda: repo.create_user(login),
+                lambda: repo.change_password(user_id, "secret", "changed"),
+            ):
+                with pytest.raises(HTTPException) as rejected:
+                    attempt()
+                assert rejected.value.status_code == 429
+    finally:
+        release.set()
+        checking.join()
+    assert hasher.metrics()["rejected"] == 2
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import threading
+
+from app.events import RoomEventHub
+
+
+def test_publish_fans_out_to_channel_subscribers_only():
+    async def scenario():
+        hub = RoomEventHub()
+        first = hub.subscribe("abc")
+        second = hub.subscribe("abc")
+        other = hub.subscribe("xyz")
+
+        hub.publish("abc", {"type": "member_joined", "players": 2})
+
+        assert json.loads(await first.get()) == {"type": "member_joined", "players": 2}
+        assert json.loads(await second.get()) == {"type": "member_joined", "players": 2}
+        assert other.pending() == 0
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        assert hub.subscriber_count("abc") == 0
+        assert hub.subscriber_count() == 1
+
+    asyncio.run(scenario())
+
+
+def test_publish_from_worker_thread_is_delivered_on_loop():
+    async def scenario():
+        hub = RoomEventHub()
+        subscription = hub.subscribe("abc")
+        worker = threading.Thread(target=hub.publish, args=("abc", {"type": "match"}))
+        worker.start()
+        worker.join()
+        return json.loads(await asyncio.wait_for(subscription.get(), timeout=1))
+
+    assert asyncio.run(scenario()) == {"type": "match"}
+
+
+def test_slow_subscriber_is_told_to_resync_instead_of_buffering():
+    async def scenario():
+        hub = RoomEventHub(queue_size=2)
+        subscription = hub.subscribe("abc")
+        for index in range(4):
+            hub.publish("abc", {"type": "match", "index": index})
+        messages = []
+        while subscription.pending():
+            messages.append(json.loads(await subscription.get()))
+        return messages
+
+    assert asyncio.run(scenario()) == [{"type": "resync"}, {"type": "match", "index": 3}]
@@ -0,0 +1,101 @@
+import pytest
+
+from app.game import MAX_HAND_SIZE, CardCatalog, GameEngine, GameError, Match
+from app.models import CardRead
+
+
+def _cards(count: int) -> list[CardRead]:
+    return [
+        CardRead(
+            id=index,
+            name=f"Card {index}",
+            description="",
+            time=1,
+            reputation=-1,
+            discipline=0,
+            documents=2,
+            technology=0,
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def _match(card_count: int = 12, players=("alice", "bob")) -> Match:
+    cards = _cards(card_count)
+    return Match("room", CardCatalog.from_cards(cards), [card.id for card in cards], players, seed=7)
+
+
+def test_draw_play_and_promote_apply_resources():
+    match = _match()
+    card_id = match.draw("alice")
+    assert match.snapshot("alice")["hand"] == [card_id]
+
+    match.play("alice", card_id)
+    assert match.snapshot("bob")["players"][0]["workspace"] == [card_id]
+
+    resources = match.promote("alice", card_id)
+    assert resources == (2, 0, 1, 3, 1)
+    snapshot = match.snapshot("alice")
+    assert snapshot["discard_count"] == 1
+    assert snapshot["players"][0]["workspace"] == []
+    assert snapshot["deck_count"] == 11
+
+
+def test_hand_limit_and_empty_deck():
+    match = _match(card_count=MAX_HAND_SIZE + 1, players=("alice",))
+    for _ in range(MAX_HAND_SIZE):
+        match.draw("alice")
+    with pytest.raises(GameError) as error:
+        match.draw("alice")
+    assert error.value.code == GameError.HAND_FULL
+
+    match.discard_card("alice", match.snapshot("alice")["hand"][0])
+    match.draw("alice")
+    with pytest.raises(GameError) as error:
+        match.discard_card("alice", 999)
+    assert error.value.code == GameError.CARD_NOT_IN_HAND
+    match.discard_card("alice", match.snapshot("alice")["hand"][0])
+    with pytest.raises(GameError) as error:
+        match.draw("alice")
+    assert error.value.code == GameError.DECK_EMPTY
+
+
+def test_moves_are_restricted_to_seated_players_and_owned_cards():
+    match = _match()
+    card_id = match.draw("alice")
+    with pytest.raises(GameError) as error:
+        match.draw("mallory")
+    assert error.value.code == GameError.NOT_A_PLAYER
+    with pytest.raises(GameError) as error:
+        match.play("bob", card_id)
+    assert error.value.code == GameError.CARD_NOT_IN_HAND
+    with pytest.raises(GameError) as error:
+        match.promote("alice", card_id)
+    assert error.value.code == GameError.CARD_NOT_IN_WORKSPACE
+
+
+def test_engine_registry_rejects_duplicate_matches():
+    engine = GameEngine()
+    cards = _cards(3)
+    engine.start("abc", cards, [1, 2, 3, 3], ["alice"], seed=1)
+    assert engine.snapshot("abc")["deck_count"] == 4
+    with pytest.raises(GameError) as error:
+        engine.start("abc", cards, [1], ["alice"])
+    assert error.value.code == GameError.ALREADY_STARTED
+    engine.end("abc")
+    with pytest.raises(GameError) as error:
+        engine.snapshot("abc")
+    assert error.value.code == GameError.NOT_FOUND
+
+
+def test_engine_moves_return_the_deck_count_and_snapshot_they_produced():
+    engine = GameEngine()
+    started = engine.start("abc", _cards(3), [1, 2, 3], ["alice"], seed=1, viewer_id="alice")
+    assert (started.deck_count, started.snapshot["hand"]) == (3, [])
+
+    drawn = engine.draw("abc", "alice")
+    played = engine.play("abc", "alice", drawn.value)
+    engine.end("abc")
+
+    assert (drawn.deck_count, drawn.snapshot["hand"]) == (2, [drawn.value])
+    assert (played.deck_count, played.snapshot["players"][0]["workspace"]) == (2, [drawn.value])
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.hashing import PasswordHasher
+
+
+class _BlockingContext:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password: str) -> str:
+        self.release.wait(5)
+        return f"hashed:{password}"
+
+
+def _blocked_hasher(queue_limit: int, identity_limit: int) -> tuple[PasswordHasher, _BlockingContext]:
+    hasher = PasswordHasher(workers=1, queue_limit=queue_limit, identity_limit=identity_limit)
+    hasher._context = _BlockingContext()
+    return hasher, hasher._context
+
+
+def test_hash_and_verify_run_on_pool_threads_and_record_latency():
+    hasher = PasswordHasher(workers=2, queue_limit=4, identity_limit=2)
+
+    password_hash = hasher.hash("alice", "secret").result()
+
+    assert hasher.verify("alice", "secret", password_hash).result()
+    assert not hasher.verify("alice", "wrong", password_hash).result()
+    metrics = hasher.metrics()
+    assert metrics["hash_seconds"]["count"] == 3
+    assert metrics["hash_seconds"]["sum"] > 0
+    assert (metrics["queued"], metrics["running"], metrics["rejected"]) == (0, 0, 0)
+
+
+def test_full_queue_rejects_with_retry_after():
+    hasher, context = _blocked_hasher(queue_limit=2, identity_limit=2)
+    pending = [hasher.hash("alice", "one"), hasher.hash("bob", "two")]
+
+    with pytest.raises(HTTPException) as rejected:
+        hasher.hash("carol", "three")
+
+    assert rejected.value.status_code == 429
+    assert rejected.value.headers == {"Retry-After": "1"}
+    context.release.set()
+    assert [future.result() for future in pending] == ["hashed:one", "hashed:two"]
+    metrics = hasher.metrics()
+    assert (metrics["peak_depth"], metrics["rejected"]) == (2, 1)
+    assert hasher.hash("carol", "three").result() == "hashed:three"
+
+
+def test_one_identity_cannot_take_the_whole_queue():
+    hasher, context = _blocked_hasher(queue_limit=8, identity_limit=2)
+    pending = [hasher.hash("mallory", str(attempt)) for attempt in range(2)]
+
+    with pytest.raises(HTTPException) as rejected:
+        hasher.hash("mallory", "again")
+    pending.append(hasher.hash("alice", "secret"))
+
+    assert rejected.value.status_code == 429
+    context.release.set()
+    assert [future.result() for future in pending] == ["hashed:0", "hashed:1", "hashed:secret"]
+    assert hasher.metrics()["rejected"] == 1
+
+
+def test_close_stops_pool_threads_and_later_jobs_start_a_fresh_pool():
+    hasher = PasswordHasher(workers=2, queue_limit=4, identity_limit=2)
+    password_hash = hasher.hash("alice", "secret").result()
+    pool_threads = set(hasher._executor._threads)
+    assert pool_threads
+
+    hasher.close()
+
+    assert not any(thread.is_alive() for thread in pool_threads)
+    assert hasher.verify("alice", "secret", password_hash).result()
+    hasher.close()
@@ -1,4 +1,5 @@
 import asyncio
+import contextvars
 import importlib
 import pytest
 
@@ -6,9 +7,16 @@ httpx = pytest.importorskip("httpx", reason="httpx is required for HTTP clients"
 
 
 class SyncASGITransport(httpx.ASGITransport):
+    # Keep one event loop per client, as under uvicorn: pooled async DB connections belong to it.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._runner = asyncio.Runner()
+
     def handle_request(self, request):  # type: ignore[override]
-        async_response = asyncio.run(self.handle_async_request(request))
-        content = asyncio.run(async_response.aread())
+        # Run with the caller's context variables (e.g. query_budget()) rather than the runner's first snapshot.
+        context = contextvars.copy_context()
+        async_response = self._runner.run(self.handle_async_request(request), context=context)
+        content = self._runner.run(async_response.aread(), context=context)
         return httpx.Response(
             status_code=async_response.status_code,
             headers=async_response.headers,
@@ -19,10 +27,14 @@ class SyncASGITransport(httpx.ASGITransport):
 
 
 @pytest.fixture()
-def client(tmp_path, monkeypatch):
-    db_path = tmp_path / "integration.db"
-    monkeypatch.setenv("DATABASE_URL", str(db_path))
+def client(database_url, tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", database_url)
     monkeypatch.setenv("APP_ENV", "development")
+    # Start from an empty catalog; app/test_loaders.py covers the bundled card files.
+    monkeypatch.setenv("CARDS_PATH", str(tmp_path / "no-cards"))
+    # Every request must stay within a loose statement budget; tests tighten it with query_budget().
+    monkeypatch.setenv("SQL_REQUEST_BUDGET", "40")
+    monkeypatch.setenv("SQL_BUDGET_ACTION", "raise")
 
     for module_name in ["app.config", "app.db", "app.main"]:
         if module_name in list(importlib.sys.modules):
@@ -162,3 +174,714 @@ def test_admin_requires_password(client, admin_credentials):
 
     assert response.status_code == 401
     assert "Invalid credentials" in response.text
+
+
+def test_saturated_hash_pool_answers_429_and_reports_metrics(client, admin_headers, monkeypatch):
+    from app.hashing import password_hasher
+
+    queue_limit = password_hasher.queue_limit
+    monkeypatch.setattr(password_hasher, "queue_limit", 0)
+    login = client.post("/auth/login", json={"provider": "guest", "display_name": "Busy", "password": "secret"})
+    assert login.status_code == 429
+    assert login.headers["retry-after"] == "1"
+    assert client.get("/admin/verify", headers=admin_headers).status_code == 429
+
+    monkeypatch.setattr(password_hasher, "queue_limit", queue_limit)
+    metrics = client.get("/admin/hashing", headers=admin_headers).json()
+    assert metrics["rejected"] >= 2
+    assert metrics["hash_seconds"]["count"] >= 1
+    assert metrics["queued"] == metrics["running"] == 0
+
+
+def test_metrics_endpoint_reports_routes_repository_calls_and_pools(client, admin_headers):
+    import re
+
+    def sample(text, pattern):
+        match = re.search(rf"^{pattern} (\S+)$", text, re.MULTILINE)
+        return float(match.group(1)) if match else 0.0
+
+    missing_export = (
+        r'joj_http_request_duration_seconds_count\{method="GET",route="/admin/decks/\{deck_id\}/export",status="404"\}'
+    )
+    list_rooms = r'joj_repository_sql_statements_total\{method="list_rooms"\}'
+    before = client.get("/metrics").text
+    assert client.get("/rooms").status_code == 200
+    assert client.get("/admin/decks/999999/export", headers=admin_headers).status_code == 404
+    assert client.get("/no/such/path").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    text = response.text
+    assert sample(text, missing_export) == sample(before, missing_export) + 1
+    assert 'route="unmatched",status="404"' in text
+    assert "/no/such/path" not in text
+    assert sample(text, list_rooms) >= sample(before, list_rooms) + 1
+    assert sample(text, r'joj_repository_call_duration_seconds_count\{method="export_deck_json"\}') >= 1
+    assert sample(text, r'joj_db_pool_size\{engine="async"\}') == 5
+    assert sample(text, "joj_password_hash_seconds_count") >= 1
+
+
+def test_session_tokens_skip_database_and_bcrypt_and_honor_revocation(client, monkeypatch):
+    import time
+
+    from jose import jwt
+
+    from app.hashing import password_hasher
+    from app.repository import AsyncRepository
+    from app.sessions import session_tokens
+
+    login = client.post("/auth/login", json={"provider": "guest", "display_name": "admin", "password": "admin!"})
+    assert login.status_code == 200
+    session = login.json()
+    assert session["role"] == session["user"]["role"] == "admin"
+    assert session["token_type"] == "bearer"
+    admin = {"Authorization": f"Bearer {session['access_token']}"}
+
+    def no_database(*args, **kwargs):
+        raise AssertionError("token authentication must not load the user")
+
+    hashes = password_hasher.metrics()["hash_seconds"]["count"]
+    with monkeypatch.context() as patched:
+        patched.setattr(AsyncRepository, "get_user", no_database)
+        assert client.get("/admin/verify", headers=admin).json() == {"status": "ok"}
+    assert password_hasher.metrics()["hash_seconds"]["count"] == hashes
+
+    guest_login = client.post("/auth/login", json={"provider": "guest", "display_name": "Tok", "password": "secret"})
+    guest = {"Authorization": f"Bearer {guest_login.json()['access_token']}"}
+    assert client.get("/rooms", headers=guest).status_code == 403
+    assert client.get("/admin/verify", headers=guest).status_code == 403
+
+    forged = {"Authorization": f"Bearer {guest_login.json()['access_token'][:-2]}xx"}
+    assert client.get("/rooms", headers=forged).status_code == 401
+    claims = jwt.get_unverified_claims(session["access_token"])
+    expired_token = jwt.encode({**claims, "exp": int(time.time()) - 5}, session_tokens.secret, algorithm="HS256")
+    expired = client.get("/admin/verify", headers={"Authorization": f"Bearer {expired_token}"})
+    assert expired.status_code == 401
+    assert "expired" in expired.text
+
+    changed = client.post(
+        "/auth/password", json={"current_password": "secret", "new_password": "secret2"}, headers=guest
+    )
+    assert changed.status_code == 200
+    assert client.get("/rooms", headers=guest).status_code == 401
+    renewed = {"Authorization": f"Bearer {changed.json()['access_token']}"}
+    assert client.get("/rooms", headers=renewed).status_code == 403
+
+    assert client.post("/auth/logout", headers=admin).status_code == 204
+    revoked = client.get("/admin/verify", headers=admin)
+    assert revoked.status_code == 401
+    assert "revoked" in revoked.text
+
+
+def test_room_listing_reports_counts_and_membership(client):
+    from app.db import session_scope
+    from app.models import Provider, Role, User
+
+    with session_scope() as session:
+        for user_id in ("host-user", "other-user"):
+            session.add(
+                User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id)
+            )
+
+    host_headers = {"X-User-Id": "host-user"}
+    other_headers = {"X-User-Id": "other-user"}
+    room_payload = {"name": "Lobby", "max_players": 2, "max_spectators": 2, "visibility": "public"}
+    first = client.post("/rooms", json=room_payload, headers=host_headers).json()
+    second = client.post("/rooms", json=room_payload, headers=host_headers).json()
+
+    join = client.post(f"/rooms/{first['code']}/join", json={"as_spectator": True}, headers=other_headers)
+    assert join.status_code == 200
+
+    listing = client.get("/rooms", headers=other_headers)
+    assert listing.status_code == 200
+    rooms = {room["code"]: room for room in listing.json()}
+    assert rooms[first["code"]]["player_count"] == 1
+    assert rooms[first["code"]]["spectator_count"] == 1
+    assert rooms[first["code"]]["is_joined"] is True
+    assert rooms[second["code"]]["is_joined"] is False
+    assert rooms[second["code"]]["is_joinable"] is True
+
+
+def test_hot_endpoints_run_a_constant_number_of_statements(client, admin_headers):
+    from app.db import session_scope
+    from app.models import Provider, Role, RoomCreate, User
+    from app.querylog import QueryBudgetExceeded, query_budget
+    from app.repository import Repository
+
+    with session_scope() as session:
+        repo = Repository(session)
+        for index in range(12):
+            session.add(User(id=f"budget-{index}", provider=Provider.GOOGLE, role=Role.USER, display_name=f"B{index}"))
+        session.flush()
+        room_payload = RoomCreate(name="Budget", max_players=4, max_spectators=2, visibility="public")
+        for index in range(0, 12, 2):
+            room = repo.create_room(room_payload, f"budget-{index}")
+            repo.join_room(room.code, f"budget-{index + 1}", as_spectator=index % 4 == 0)
+    cards = [{"name": f"Budget {index}", "description": ""} for index in range(50)]
+    client.post("/admin/cards/bulk", json={"cards": cards[:30]}, headers=admin_headers)
+    deck = {
+        "deck": {"name": "Budget", "card_ids": []},
+        "cards": cards[20:],
+    }
+
+    # Listing rooms costs the same for any number of rooms: user lookup, page and memberships.
+    with query_budget(3):
+        assert client.get("/rooms", headers={"X-User-Id": "budget-1"}).status_code == 200
+        assert client.get("/rooms").status_code == 200
+    with query_budget(3):
+        assert client.get("/cards", params={"limit": 100}).status_code == 200
+    # Admin check, cards reused or inserted in bulk under a savepoint, deck insert, membership rows and revision bump.
+    with query_budget(11):
+        assert client.post("/admin/decks/import", json=deck, headers=admin_headers).status_code == 200
+        assert client.post("/admin/decks/import", json=deck, headers=admin_headers).status_code == 200
+
+    with query_budget(0), pytest.raises(QueryBudgetExceeded, match="GET /rooms ran"):
+        client.get("/rooms")
+
+
+def test_room_counters_follow_membership_changes(client, admin_headers):
+    from app.db import session_scope
+    from app.models import Provider, Role, Room, User
+    from app.repository import Repository
+
+    with session_scope() as session:
+        for user_id in ("counter-host", "counter-player", "counter-viewer"):
+            session.add(
+                User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id)
+            )
+
+    room = client.post(
+        "/rooms",
+        json={"name": "Counters", "max_players": 2, "max_spectators": 1},
+        headers={"X-User-Id": "counter-host"},
+    ).json()
+    code = room["code"]
+    assert room["player_count"] == 1
+
+    client.post(f"/rooms/{code}/join", json={}, headers={"X-User-Id": "counter-player"})
+    full = client.post(
+        f"/rooms/{code}/join", json={"as_spectator": False}, headers={"X-User-Id": "counter-viewer"}
+    )
+    assert full.status_code == 400
+    viewer = client.post(
+        f"/rooms/{code}/join", json={"as_spectator": True}, headers={"X-User-Id": "counter-viewer"}
+    )
+    assert viewer.json()["player_count"] == 2
+    assert viewer.json()["spectator_count"] == 1
+
+    assert client.delete("/admin/users/counter-player", headers=admin_headers).status_code == 204
+    assert client.delete("/admin/users/counter-viewer", headers=admin_headers).status_code == 204
+
+    with session_scope() as session:
+        stored = session.get(Room, code)
+        assert (stored.player_count, stored.spectator_count) == (1, 0)
+        stored.player_count = 5
+        session.add(stored)
+
+    with session_scope() as session:
+        repo = Repository(session)
+        assert [m["code"] for m in repo.verify_room_counters()] == [code]
+        repo.rebuild_room_counters()
+        assert repo.verify_room_counters() == []
+
+
+def test_concurrent_joins_never_overfill_room(client):
+    import threading
+
+    from fastapi import HTTPException
+
+    from app.db import session_scope
+    from app.models import Provider, Role, Room, RoomCreate, RoomMembership, User
+    from app.repository import Repository
+    from sqlmodel import select
+
+    contenders = [f"stress-{index}" for index in range(40)]
+    with session_scope() as session:
+        for user_id in ["stress-host", *contenders]:
+            session.add(
+                User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id)
+            )
+    with session_scope() as session:
+        code = Repository(session).create_room(
+            RoomCreate(name="Stress", max_players=6, max_spectators=10), "stress-host"
+        ).code
+
+    outcomes: list[str] = []
+    errors: list[BaseException] = []
+    start = threading.Barrier(len(contenders) * 2)
+
+    def hammer(user_id: str, as_spectator: bool):
+        start.wait()
+        try:
+            with session_scope() as session:
+                Repository(session).join_room(code, user_id, as_spectator)
+            outcomes.append("joined")
+        except HTTPException as exc:
+            assert exc.status_code == 400
+            outcomes.append("full")
+        except BaseException as exc:  # pragma: no cover - surfaced by the assertion below
+            errors.append(exc)
+
+    # Every contender races twice (player and spectator) to also exercise
+    # concurrent joins for the same user.
+    threads = [
+        threading.Thread(target=hammer, args=(user_id, index % 2 == 0))
+        for user_id in contenders
+        for index in (0, 1)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with session_scope() as session:
+        room = session.get(Room, code)
+        roles = session.exec(
+            select(RoomMembership.role).where(RoomMembership.room_code == code)
+        ).all()
+        assert roles.count("player") == room.player_count == 6
+        assert roles.count("spectator") == room.spectator_count == 10
+        assert Repository(session).verify_room_counters() == []
+
+
+def test_host_runs_match_through_room_endpoints(client, admin_headers):
+    from app.db import session_scope
+    from app.models import Provider, Role, User
+
+    with session_scope() as session:
+        for user_id in ("match-host", "match-guest", "match-outsider"):
+            session.add(
+                User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id)
+            )
+    host = {"X-User-Id": "match-host"}
+    guest = {"X-User-Id": "match-guest"}
+
+    card = client.post(
+        "/admin/cards",
+        json={"name": "Match Card", "description": "", "time": 2, "technology": -1},
+        headers=admin_headers,
+    ).json()
+    deck = client.post(
+        "/admin/decks",
+        json={"name": "Match Deck", "card_ids": [card["id"], card["id"]]},
+        headers=admin_headers,
+    ).json()
+    code = client.post(
+        "/rooms", json={"name": "Match", "max_players": 2, "max_spectators": 0}, headers=host
+    ).json()["code"]
+    client.post(f"/rooms/{code}/join", json={}, headers=guest)
+
+    assert client.post(f"/rooms/{code}/match", json={"deck_id": deck["id"]}, headers=guest).status_code == 403
+    started = client.post(f"/rooms/{code}/match", json={"deck_id": deck["id"]}, headers=host)
+    assert started.status_code == 200
+    assert [player["user_id"] for player in started.json()["players"]] == ["match-host", "match-guest"]
+
+    drawn = client.post(f"/rooms/{code}/match/draw", headers=guest).json()
+    assert drawn["hand"] == [card["id"]]
+    client.post(f"/rooms/{code}/match/play", json={"card_id": card["id"]}, headers=guest)
+    promoted = client.post(f"/rooms/{code}/match/promote", json={"card_id": card["id"]}, headers=guest)
+    assert promoted.json()["players"][1]["resources"]["time"] == 3
+    assert promoted.json()["players"][1]["resources"]["technology"] == 0
+
+    missing = client.post(f"/rooms/{code}/match/discard", json={"card_id": card["id"]}, headers=guest)
+    assert missing.status_code == 400
+    assert missing.json()["code"] == "CARD_NOT_IN_HAND"
+    unknown = client.post(f"/rooms/{code}/match/play", json={"card_id": 999_999}, headers=guest)
+    assert unknown.status_code == 400
+    assert unknown.json()["code"] == "CARD_NOT_IN_HAND"
+    outsider = client.get(f"/rooms/{code}/match", headers={"X-User-Id": "match-outsider"})
+    assert outsider.status_code == 403
+
+    assert client.delete(f"/rooms/{code}/match", headers=host).status_code == 204
+    assert client.get(f"/rooms/{code}/match", headers=host).status_code == 404
+
+
+def test_room_events_stream_membership_changes(client):
+    import json
+    import sys
+
+    from starlette.testclient import TestClient
+
+    from app.db import session_scope
+    from app.models import Provider, Role, User, UserRead
+    from app.sessions import session_tokens
+
+    with session_scope() as session:
+        for user_id in ("ws-host", "ws-player", "ws-late"):
+            session.add(
+                User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id)
+            )
+    host = UserRead(id="ws-host", provider=Provider.GOOGLE, role=Role.USER, display_name="ws-host")
+    token = session_tokens.issue(host).access_token
+
+    with TestClient(sys.modules["app.main"].app) as live:
+        code = live.post(
+            "/rooms",
+            json={"name": "Events", "max_players": 3, "max_spectators": 0},
+            headers={"X-User-Id": "ws-host"},
+        ).json()["code"]
+
+        with live.websocket_connect(f"/rooms/{code}/events?token={token}") as socket:
+            live.post(f"/rooms/{code}/join", json={}, headers={"X-User-Id": "ws-player"})
+            event = json.loads(socket.receive_text())
+            # Re-joining is idempotent and silent, so the next event is the late joiner's.
+            assert live.post(f"/rooms/{code}/join", json={}, headers={"X-User-Id": "ws-player"}).status_code == 200
+            live.post(f"/rooms/{code}/join", json={}, headers={"X-User-Id": "ws-late"})
+            assert json.loads(socket.receive_text())["user"] == "ws-late"
+
+        assert event == {
+            "type": "member_joined",
+            "room": code,
+            "status": "active",
+            "players": 2,
+            "spectators": 0,
+            "user": "ws-player",
+            "role": "player",
+        }
+
+
+def test_private_room_events_require_a_member_session_token(client):
+    import sys
+
+    from starlette.testclient import TestClient
+    from starlette.websockets import WebSocketDisconnect
+
+    from app.db import session_scope
+    from app.models import Provider, Role, User, UserRead
+    from app.sessions import session_tokens
+
+    tokens = {}
+    with session_scope() as session:
+        for user_id in ("private-host", "outsider"):
+            session.add(User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id))
+            user = UserRead(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id)
+            tokens[user_id] = session_tokens.issue(user).access_token
+
+    with TestClient(sys.modules["app.main"].app) as live:
+        code = live.post(
+            "/rooms",
+            json={"name": "Hidden", "max_players": 2, "max_spectators": 0, "visibility": "private"},
+            headers={"X-User-Id": "private-host"},
+        ).json()["code"]
+
+        # A bare user id, a forged token and another user's valid token are all turned away.
+        for query in (
+            "",
+            "?user_id=private-host",
+            f"?token={tokens['private-host'][:-2]}xx",
+            f"?token={tokens['outsider']}",
+        ):
+            with pytest.raises(WebSocketDisconnect) as rejected:
+                with live.websocket_connect(f"/rooms/{code}/events{query}"):
+                    pass
+            assert rejected.value.code == 1008
+
+        with live.websocket_connect(f"/rooms/{code}/events?token={tokens['private-host']}") as socket:
+            socket.send_text("ping")
+
+
+def test_shutdown_closes_every_pooled_connection(client):
+    import sys
+
+    from starlette.testclient import TestClient
+
+    main = sys.modules["app.main"]
+    with TestClient(main.app) as live:
+        assert live.get("/rooms").status_code == 200
+        assert live.get("/cards").status_code == 200
+        assert main.engine.pool.checkedin() > 0
+
+    for pool_engine in (main.engine, main.read_engine, main.async_engine, main.async_read_engine):
+        if pool_engine is not None:
+            assert pool_engine.pool.checkedin() == 0
+
+
+def test_card_catalog_cache_tracks_revisions(client, admin_headers):
+    from sqlalchemy import text
+
+    from app.db import session_scope
+    from app.models import CatalogState
+
+    payload = {"name": "Cached Card", "description": "Ïncluded once", "category": "cache", "time": 1}
+    created = client.post("/admin/cards", json=payload, headers=admin_headers).json()
+
+    def cached_card():
+        cards = client.get("/cards", params={"limit": 100}).json()
+        return next(card for card in cards if card["id"] == created["id"])
+
+    assert cached_card() == created
+
+    # A write that does not bump the revision stays invisible to the warm cache...
+    with session_scope() as session:
+        session.execute(text("UPDATE card SET time = 5 WHERE id = :id"), {"id": created["id"]})
+    assert cached_card()["time"] == 1
+
+    # ...until another worker's commit bumps the shared revision counter.
+    with session_scope() as session:
+        state = session.get(CatalogState, 1)
+        state.card_revision += 1
+        session.add(state)
+    assert cached_card()["time"] == 5
+
+    updated = client.put(
+        f"/admin/cards/{created['id']}", json={**payload, "time": -2}, headers=admin_headers
+    ).json()
+    assert cached_card() == updated
+
+    deck = client.post(
+        "/admin/decks", json={"name": "Cached Deck", "card_ids": [created["id"]]}, headers=admin_headers
+    ).json()
+    exported = client.get(f"/admin/decks/{deck['id']}/export", headers=admin_headers).json()
+    assert exported == {"deck": deck, "cards": [updated]}
+
+    assert client.delete(f"/admin/cards/{created['id']}", headers=admin_headers).status_code == 204
+    assert all(card["id"] != created["id"] for card in client.get("/cards", params={"limit": 100}).json())
+
+
+def test_catalog_and_deck_endpoints_honor_etags(client, admin_headers):
+    def revalidate(path, headers=None):
+        first = client.get(path, headers=headers)
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        second = client.get(path, headers={**(headers or {}), "If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        return etag
+
+    cards_etag = revalidate("/cards")
+    admin_cards_etag = revalidate("/admin/cards", admin_headers)
+    decks_etag = revalidate("/admin/decks", admin_headers)
+
+    card = client.post(
+        "/admin/cards", json={"name": "ETag Card", "description": "", "time": 1}, headers=admin_headers
+    ).json()
+    assert revalidate("/cards") != cards_etag
+    assert revalidate("/admin/cards", admin_headers) != admin_cards_etag
+    assert revalidate("/admin/decks", admin_headers) == decks_etag
+
+    deck = client.post(
+        "/admin/decks", json={"name": "ETag Deck", "card_ids": [card["id"]]}, headers=admin_headers
+    ).json()
+    assert revalidate("/admin/decks", admin_headers) != decks_etag
+    export_path = f"/admin/decks/{deck['id']}/export"
+    export_etag = revalidate(export_path, admin_headers)
+
+    client.put(
+        f"/admin/cards/{card['id']}",
+        json={"name": "ETag Card", "description": "", "time": 2},
+        headers=admin_headers,
+    )
+    stale = client.get(export_path, headers={**admin_headers, "If-None-Match": export_etag})
+    assert stale.status_code == 200
+    assert stale.json()["cards"][0]["time"] == 2
+
+
+def test_bulk_card_import_reports_per_card_outcomes(client, admin_headers):
+    existing = client.post(
+        "/admin/cards",
+        json={"name": "Bulk Existing", "description": "same", "category": "bulk", "time": 1},
+        headers=admin_headers,
+    ).json()
+    cards = [
+        {"name": "Bulk Existing", "description": "same", "category": "bulk", "time": 1},
+        {"name": "Bulk Existing", "description": "changed", "category": "bulk", "time": 1},
+        {"name": "Bulk New", "description": "", "category": None, "reputation": 2},
+        {"name": "Bulk New", "description": "", "category": None, "reputation": 2},
+        {"name": "Bulk New", "description": "", "category": None, "reputation": 3},
+        {"name": "Bulk Existing", "description": "", "category": "other"},
+    ]
+
+    response = client.post("/admin/cards/bulk", json={"cards": cards}, headers=admin_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["status"] for result in body["results"]] == [
+        "reused",
+        "conflict",
+        "created",
+        "reused",
+        "conflict",
+        "created",
+    ]
+    assert (body["created"], body["reused"], body["conflicts"]) == (2, 2, 2)
+    assert body["results"][0]["id"] == existing["id"]
+    assert body["results"][2]["id"] == body["results"][3]["id"]
+    catalog = {card["id"]: card for card in client.get("/cards", params={"limit": 100}).json()}
+    assert catalog[body["results"][5]["id"]]["category"] == "other"
+
+
+def test_bulk_import_reclassifies_cards_a_concurrent_import_created(client, admin_headers, monkeypatch):
+    from app.db import session_scope
+    from app.models import CardBase
+    from app.repository import Repository
+
+    raced = client.post(
+        "/admin/cards", json={"name": "Raced", "description": "same", "category": "race"}, headers=admin_headers
+    ).json()
+    lookup = Repository._existing_cards_by_key
+    lookups = []
+
+    def stale_first_lookup(self, names, fields):
+        # The first lookup runs before the concurrent import commits, so it misses "Raced".
+        lookups.append(names)
+        return {} if len(lookups) == 1 else lookup(self, names, fields)
+
+    monkeypatch.setattr(Repository, "_existing_cards_by_key", stale_first_lookup)
+    with session_scope() as session:
+        imported = Repository(session).bulk_import_cards(
+            [
+                CardBase(name="Raced", description="same", category="race"),
+                CardBase(name="Raced", description="other", category="race"),
+                CardBase(name="Race winner", description="", category="race"),
+            ]
+        )
+
+    assert len(lookups) == 2
+    assert [result.status for result in imported.results] == ["reused", "conflict", "created"]
+    assert imported.results[0].id == raced["id"]
+    names = [card["name"] for card in client.get("/cards", params={"limit": 100}).json()]
+    assert names.count("Raced") == 1 and "Race winner" in names
+
+
+def test_deck_import_reuses_cards_and_rejects_conflicts(client, admin_headers):
+    payload = {
+        "deck": {"name": "Imported", "card_ids": []},
+        "cards": [
+            {"name": "Import A", "description": "", "time": 1},
+            {"name": "Import B", "description": "", "time": 2},
+        ],
+    }
+    first = client.post("/admin/decks/import", json=payload, headers=admin_headers)
+    assert first.status_code == 200
+    again = client.post("/admin/decks/import", json=payload, headers=admin_headers)
+    assert again.status_code == 200
+    assert again.json()["card_ids"] == first.json()["card_ids"]
+
+    payload["cards"][1]["time"] = 3
+    conflict = client.post("/admin/decks/import", json=payload, headers=admin_headers)
+    assert conflict.status_code == 400
+    assert conflict.json()["detail"]["conflicts"][0]["index"] == 1
+
+
+def test_deck_membership_table_serves_card_lookups_and_deletes(client, admin_headers):
+    from app.db import session_scope
+    from app.models import DeckCard
+
+    cards = [{"name": f"Member {index}", "description": ""} for index in range(3)]
+    a, b, c = (
+        result["id"]
+        for result in client.post("/admin/cards/bulk", json={"cards": cards}, headers=admin_headers).json()["results"]
+    )
+    first = client.post("/admin/decks", json={"name": "First", "card_ids": [a, b, a]}, headers=admin_headers).json()
+    second = client.post("/admin/decks", json={"name": "Second", "card_ids": [c]}, headers=admin_headers).json()
+    client.put(f"/admin/decks/{second['id']}", json={"name": "Second", "card_ids": [c, a]}, headers=admin_headers)
+
+    using_a = client.get(f"/admin/cards/{a}/decks", headers=admin_headers)
+    assert using_a.status_code == 200
+    assert [deck["id"] for deck in using_a.json()] == [first["id"], second["id"]]
+    assert client.get("/admin/cards/999999/decks", headers=admin_headers).status_code == 404
+    exported = client.get(f"/admin/decks/{first['id']}/export", headers=admin_headers).json()
+    assert [card["id"] for card in exported["cards"]] == [a, b]
+
+    assert client.delete(f"/admin/cards/{a}", headers=admin_headers).status_code == 204
+    assert client.get(f"/admin/decks/{first['id']}/export", headers=admin_headers).json()["deck"]["card_ids"] == [b]
+    assert client.get(f"/admin/cards/{c}/decks", headers=admin_headers).json()[0]["card_ids"] == [c]
+    assert client.delete(f"/admin/decks/{second['id']}", headers=admin_headers).status_code == 204
+    with session_scope() as session:
+        rows = session.query(DeckCard.deck_id, DeckCard.position, DeckCard.card_id).order_by(DeckCard.position)
+        assert [tuple(row) for row in rows] == [(first["id"], 1, b)]
+
+
+def test_deck_ndjson_export_round_trips_through_streaming_import(client, admin_headers):
+    import json
+
+    cards = [{"name": f"Stream {index}", "description": "", "time": index % 3} for index in range(600)]
+    card_ids = [
+        result["id"]
+        for result in client.post("/admin/cards/bulk", json={"cards": cards}, headers=admin_headers).json()["results"]
+    ]
+    deck_ids = card_ids[::-1] + card_ids[:3]
+    deck = client.post(
+        "/admin/decks", json={"name": "Streamed", "card_ids": deck_ids}, headers=admin_headers
+    ).json()
+
+    exported = client.get(f"/admin/decks/{deck['id']}/export.ndjson", headers=admin_headers)
+    assert exported.status_code == 200
+    assert exported.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in exported.text.splitlines()]
+    assert lines[0]["deck"]["card_ids"] == deck_ids
+    assert [line["card"]["id"] for line in lines[1:]] == card_ids[::-1]
+    missing = client.get("/admin/decks/999999/export.ndjson", headers=admin_headers)
+    assert (missing.status_code, missing.json()) == (404, {"detail": "Deck not found"})
+
+    imported = client.post("/admin/decks/import.ndjson", content=exported.content, headers=admin_headers)
+    assert imported.status_code == 200
+    assert imported.json()["card_ids"] == deck_ids
+    assert imported.json()["id"] != deck["id"]
+
+    lines[550]["card"]["time"] = 5
+    changed = "\n".join(json.dumps(line) for line in lines).encode()
+    conflict = client.post(
+        f"/admin/decks/{deck['id']}/import.ndjson", content=changed, headers=admin_headers
+    )
+    assert conflict.status_code == 400
+    assert conflict.json()["detail"]["conflicts"][0]["index"] == 549
+
+    headerless = client.post(
+        "/admin/decks/import.ndjson", content=exported.text.split("\n", 1)[1], headers=admin_headers
+    )
+    assert headerless.status_code == 422
+    assert headerless.json()["detail"].startswith("Line 1:")
+
+
+def _walk_cursor_pages(client, path, headers, **params):
+    pages = []
+    response = client.get(path, params=params, headers=headers)
+    while True:
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+        response = client.get(path, params={**params, "cursor": cursor}, headers=headers)
+
+
+def test_cursor_pagination_walks_every_list_without_gaps(client, admin_headers):
+    from app.db import session_scope
+    from app.models import Provider, Role, User
+
+    with session_scope() as session:
+        session.add(User(id="cursor-host", provider=Provider.GOOGLE, role=Role.USER, display_name="Cursor"))
+    host_headers = {"X-User-Id": "cursor-host"}
+    room_payload = {"name": "Paged", "max_players": 4, "max_spectators": 0, "visibility": "public"}
+    created = [client.post("/rooms", json=room_payload, headers=host_headers).json()["code"] for _ in range(7)]
+
+    first = client.get("/rooms", params={"limit": 3}, headers=host_headers)
+    # A room created between pages sorts before the cursor and must not shift later pages.
+    client.post("/rooms", json=room_payload, headers=host_headers)
+    seen = [room["code"] for room in first.json()]
+    for page in _walk_cursor_pages(
+        client, "/rooms", host_headers, limit=3, cursor=first.headers["X-Next-Cursor"]
+    ):
+        seen.extend(room["code"] for room in page)
+    assert sorted(seen) == sorted(created)
+    assert len(seen) == len(set(seen))
+
+    by_name = _walk_cursor_pages(client, "/admin/rooms", admin_headers, limit=2, sort="name")
+    codes = [room["code"] for page in by_name for room in page]
+    assert len(codes) == len(set(codes)) == 8
+
+    paged_cards = [{"name": f"Paged {index}", "description": ""} for index in range(5)]
+    client.post("/admin/cards/bulk", json={"cards": paged_cards}, headers=admin_headers)
+    card_pages = _walk_cursor_pages(client, "/cards", host_headers, limit=4)
+    card_ids = [card["id"] for page in card_pages for card in page]
+    assert card_ids == sorted(card["id"] for card in client.get("/cards", params={"limit": 100}).json())
+
+    user_pages = _walk_cursor_pages(client, "/admin/users", admin_headers, limit=1)
+    user_ids = [user["id"] for page in user_pages for user in page]
+    assert user_ids == sorted(user_ids) and "cursor-host" in user_ids
+
+    assert client.get("/rooms", params={"cursor": "not-a-cursor"}, headers=host_headers).status_code == 400
+    assert client.get("/cards", params={"cursor": first.headers["X-Next-Cursor"]}).status_code == 400
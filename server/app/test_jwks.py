@@ -0,0 +1,200 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from jose import jwk, jwt
+
+from app.jwks import JWKSCache
+
+
+class _StubKeyServer:
+    """Serves a JWKS document on localhost and counts the requests it gets."""
+
+    def __init__(self):
+        self.keys: list[dict] = []
+        self.cache_control = "public, max-age=600"
+        self.age: int | None = None
+        self.delay = 0.0
+        self.status = 200
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # noqa: N802
+                stub.requests += 1
+                time.sleep(stub.delay)
+                body = json.dumps({"keys": stub.keys}).encode()
+                self.send_response(stub.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", stub.cache_control)
+                if stub.age is not None:
+                    self.send_header("Age", str(stub.age))
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}/certs"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def add_key(self, kid: str) -> str:
+        """Publish a new RSA public key and return the matching private key as PEM."""
+
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public = jwk.construct(pem, algorithm="RS256").public_key().to_dict()
+        self.keys.append({**public, "kid": kid, "use": "sig", "alg": "RS256"})
+        return pem
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture()
+def key_server():
+    server = _StubKeyServer()
+    yield server
+    server.close()
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_keys_are_cached_for_max_age_minus_age(key_server):
+    key_server.add_key("k1")
+    key_server.cache_control = "public, max-age=140, must-revalidate"
+    key_server.age = 20
+    clock = _Clock()
+    cache = JWKSCache(default_ttl=3600, refetch_interval=10, clock=clock)
+
+    assert cache.get_key(key_server.url, "k1")["kid"] == "k1"
+    clock.now += 90
+    assert cache.get_key(key_server.url, "k1", block=False)["kid"] == "k1"
+    assert key_server.requests == 1
+
+    clock.now += 31
+    assert cache.get_key(key_server.url, "k1", block=False) is None
+    assert cache.get_key(key_server.url, "k1")["kid"] == "k1"
+    assert key_server.requests == 2
+
+
+def test_keys_refresh_in_background_before_expiry(key_server):
+    key_server.add_key("k1")
+    key_server.cache_control = "max-age=100"
+    clock = _Clock()
+    cache = JWKSCache(default_ttl=3600, refetch_interval=10, clock=clock)
+    cache.get_key(key_server.url, "k1")
+
+    key_server.delay = 0.2
+    clock.now += 85
+    started = time.monotonic()
+    assert cache.get_key(key_server.url, "k1", block=False)["kid"] == "k1"
+    assert time.monotonic() - started < 0.1
+    _wait_for(lambda: key_server.requests == 2 and not cache._inflight)
+
+    clock.now += 50
+    assert cache.get_key(key_server.url, "k1", block=False)["kid"] == "k1"
+    assert key_server.requests == 2
+
+
+def test_close_waits_for_refreshes_and_drops_cached_keys(key_server):
+    key_server.add_key("k1")
+    key_server.cache_control = "max-age=100"
+    clock = _Clock()
+    cache = JWKSCache(default_ttl=3600, refetch_interval=10, clock=clock)
+    cache.get_key(key_server.url, "k1")
+
+    key_server.delay = 0.2
+    clock.now += 85
+    cache.get_key(key_server.url, "k1", block=False)
+    cache.close()
+
+    assert key_server.requests == 2
+    assert not cache._inflight
+    assert cache.get_key(key_server.url, "k1", block=False) is None
+
+
+def test_unknown_kid_herd_triggers_one_refetch(key_server):
+    key_server.add_key("old")
+    clock = _Clock()
+    cache = JWKSCache(default_ttl=3600, refetch_interval=30, clock=clock)
+    cache.get_key(key_server.url, "old")
+
+    key_server.add_key("rotated")
+    key_server.delay = 0.2
+    clock.now += 60
+    with ThreadPoolExecutor(max_workers=20) as pool:
+        keys = list(pool.map(lambda _: cache.get_key(key_server.url, "rotated"), range(20)))
+
+    assert all(key["kid"] == "rotated" for key in keys)
+    assert key_server.requests == 2
+    # Unknown ids right after a fetch are answered from the cache instead of refetching.
+    assert cache.get_key(key_server.url, "forged") is None
+    assert key_server.requests == 2
+
+
+def test_failed_fetch_is_reported_to_every_waiter(key_server):
+    key_server.status = 500
+    key_server.delay = 0.1
+    cache = JWKSCache(default_ttl=3600, refetch_interval=30)
+
+    def lookup(_):
+        with pytest.raises(HTTPException) as failed:
+            cache.get_key(key_server.url, "k1")
+        return failed.value.status_code
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        assert set(pool.map(lookup, range(5))) == {502}
+    assert key_server.requests == 1
+
+
+def test_oauth_login_validates_against_shared_cache(key_server, monkeypatch):
+    from app import repository
+    from app.config import get_settings
+    from app.models import Provider
+
+    private_key = key_server.add_key("k1")
+    settings = get_settings().copy(update={"google_jwks_url": key_server.url, "oauth_audience": ["joj"]})
+    monkeypatch.setattr(repository, "jwks_cache", JWKSCache(default_ttl=3600, refetch_interval=30))
+    claims = {"iss": settings.google_issuer, "aud": "joj", "sub": "g-1", "exp": int(time.time()) + 60}
+    token = jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": "k1"})
+
+    for _ in range(3):
+        repo = repository.Repository(session=None)
+        repo.settings = settings
+        assert repo._validate_oauth_token(Provider.GOOGLE, token)["sub"] == "g-1"
+    assert key_server.requests == 1
+
+    unknown = jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": "k9"})
+    with pytest.raises(HTTPException) as rejected:
+        repo._validate_oauth_token(Provider.GOOGLE, unknown)
+    assert rejected.value.detail == "Unknown signing key"
+
+    other_audience = jwt.encode({**claims, "aud": "other"}, private_key, algorithm="RS256", headers={"kid": "k1"})
+    with pytest.raises(HTTPException) as rejected:
+        repo._validate_oauth_token(Provider.GOOGLE, other_audience)
+    assert rejected.value.detail == "Invalid OAuth token"
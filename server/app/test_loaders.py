@@ -0,0 +1,118 @@
+import importlib
+import json
+import re
+from pathlib import Path
+
+import pytest
+from sqlalchemy import event
+
+BUNDLED_CARDS = Path(__file__).resolve().parents[2] / "cards"
+
+
+@pytest.fixture()
+def db(database_url, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    monkeypatch.setenv("APP_ENV", "development")
+    importlib.reload(importlib.import_module("app.config"))
+    db = importlib.reload(importlib.import_module("app.db"))
+    db.init_db()
+    return db
+
+
+def _card(name: str, **fields) -> dict:
+    return {"name": name, "description": f"{name} text", "category": "test", "time": 1, **fields}
+
+
+def _load(db, cards_path: Path):
+    from app.loaders import load_cards_from_disk
+
+    with db.session_scope() as session:
+        return load_cards_from_disk(session, cards_path)
+
+
+def _outcomes(report) -> dict:
+    return {outcome.name: (outcome.status, outcome.reason) for outcome in report.outcomes}
+
+
+def test_bundled_deck_file_loads_once(db):
+    from app.models import Card, Deck
+
+    report = _load(db, BUNDLED_CARDS)
+
+    assert [outcome.name for outcome in report.loaded] == ["sample-deck.json"]
+    with db.session_scope() as session:
+        deck = session.query(Deck).one()
+        assert session.query(Card).count() == 152
+        assert len(deck.card_ids) == 152
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        again = _load(db, BUNDLED_CARDS)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert _outcomes(again) == {"sample-deck.json": ("skipped", "unchanged since last load")}
+    # Only the manifest is read: no card or deck table is touched.
+    assert not [sql for sql in statements if re.search(r"\b(card|deck)\b", sql)]
+
+
+def test_mixed_files_report_reasons_and_reapply_changes_in_place(db, tmp_path):
+    from app.models import Card, CardFile, Deck
+
+    (tmp_path / "alpha.json").write_text(json.dumps(_card("Alpha")))
+    (tmp_path / "beta.json").write_text(json.dumps(_card("Beta")))
+    (tmp_path / "clash.json").write_text(json.dumps(_card("Alpha", time=5)))
+    (tmp_path / "broken.json").write_text("{not json")
+    (tmp_path / "bounds.json").write_text(json.dumps(_card("Gamma", time=99)))
+    deck = {"deck": {"name": "Pair", "card_ids": [1, 2]}, "cards": [_card("Alpha"), _card("Delta")]}
+    (tmp_path / "pair.json").write_text(json.dumps(deck))
+
+    report = _load(db, tmp_path)
+
+    outcomes = _outcomes(report)
+    assert report.summary() == "3 loaded, 0 skipped, 3 failed"
+    assert outcomes["clash.json"] == ("failed", "Alpha: Differs from an earlier card with the same name and category")
+    assert outcomes["broken.json"][1].startswith("invalid JSON")
+    assert outcomes["bounds.json"][1].startswith("not a valid card file: time:")
+    assert outcomes["pair.json"][0] == "loaded"
+    with db.session_scope() as session:
+        alpha_id = session.query(Card).filter_by(name="Alpha").one().id
+        pair = session.query(Deck).one()
+        pair_id = pair.id
+        assert len(pair.card_ids) == 2 and alpha_id in pair.card_ids
+
+    (tmp_path / "alpha.json").write_text(json.dumps(_card("Alpha", description="Rewritten")))
+    deck["deck"]["name"] = "Pair v2"
+    deck["cards"] = [_card("Alpha", description="Rewritten"), _card("Delta", description="Edited in the deck")]
+    (tmp_path / "pair.json").write_text(json.dumps(deck))
+    (tmp_path / "clash.json").unlink()
+
+    report = _load(db, tmp_path)
+
+    outcomes = _outcomes(report)
+    assert outcomes["beta.json"] == ("skipped", "unchanged since last load")
+    assert outcomes["alpha.json"] == ("loaded", f"card {alpha_id}")
+    assert outcomes["pair.json"] == ("loaded", f"deck {pair_id}")
+    with db.session_scope() as session:
+        delta = session.query(Card).filter_by(name="Delta").one()
+        delta_id = delta.id
+        assert delta.description == "Edited in the deck"
+        assert session.get(Card, alpha_id).description == "Rewritten"
+        pair = session.query(Deck).one()
+        assert (pair.name, pair.card_ids) == ("Pair v2", [alpha_id, delta_id])
+
+    # A renamed card keeps its id, also for manifest entries that predate recorded card ids.
+    deck["cards"][1] = _card("Delta prime")
+    (tmp_path / "pair.json").write_text(json.dumps(deck))
+    assert _outcomes(_load(db, tmp_path))["pair.json"] == ("loaded", f"deck {pair_id}")
+    with db.session_scope() as session:
+        assert session.get(Card, delta_id).name == "Delta prime"
+        session.get(CardFile, "pair.json").card_ids = None
+    deck["cards"][1] = _card("Delta prime", description="Legacy edit")
+    (tmp_path / "pair.json").write_text(json.dumps(deck))
+    assert _outcomes(_load(db, tmp_path))["pair.json"] == ("loaded", f"deck {pair_id}")
+    with db.session_scope() as session:
+        assert session.get(Card, delta_id).description == "Legacy edit"
+        assert session.query(Card).count() == 3
+        assert session.query(Deck).one().card_ids == [alpha_id, delta_id]
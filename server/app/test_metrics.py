@@ -0,0 +1,44 @@
+from app.metrics import Counter, Histogram, instrument_repository_method, repository_sql_statements
+
+
+def test_histogram_renders_cumulative_buckets_per_label_set():
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(("/a",), value)
+    histogram.observe(('/b"q',), 0.2)
+
+    assert histogram.render() == [
+        "# HELP demo_seconds Demo.",
+        "# TYPE demo_seconds histogram",
+        'demo_seconds_bucket{route="/a",le="0.1"} 1',
+        'demo_seconds_bucket{route="/a",le="1.0"} 2',
+        'demo_seconds_bucket{route="/a",le="+Inf"} 3',
+        'demo_seconds_sum{route="/a"} 5.55',
+        'demo_seconds_count{route="/a"} 3',
+        'demo_seconds_bucket{route="/b\\"q",le="0.1"} 0',
+        'demo_seconds_bucket{route="/b\\"q",le="1.0"} 1',
+        'demo_seconds_bucket{route="/b\\"q",le="+Inf"} 1',
+        'demo_seconds_sum{route="/b\\"q"} 0.2',
+        'demo_seconds_count{route="/b\\"q"} 1',
+    ]
+    counter = Counter("demo_total", "Demo.")
+    counter.inc()
+    assert counter.render()[-1] == "demo_total 1"
+
+
+def test_nested_repository_calls_are_charged_to_the_outermost_method():
+    from app.metrics import _count_statement
+
+    inner = instrument_repository_method("metrics_test_inner", lambda: _count_statement())
+
+    def run():
+        _count_statement()
+        inner()
+
+    outer = instrument_repository_method("metrics_test_outer", run)
+    outer()
+
+    assert repository_sql_statements.value(("metrics_test_outer",)) == 2
+    assert repository_sql_statements.value(("metrics_test_inner",)) == 0
+    inner()
+    assert repository_sql_statements.value(("metrics_test_inner",)) == 1
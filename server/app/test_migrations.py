@@ -0,0 +1,132 @@
+import importlib
+import sqlite3
+import threading
+
+import pytest
+
+pytestmark = pytest.mark.sqlite_only
+
+# Tables as created by releases before the user role, room status/counters, card resources and catalog state.
+LEGACY_SCHEMA = """
+CREATE TABLE user (id VARCHAR PRIMARY KEY, provider VARCHAR NOT NULL, display_name VARCHAR NOT NULL);
+CREATE TABLE card (
+    id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description VARCHAR NOT NULL, category VARCHAR,
+    CONSTRAINT uq_card_name_category UNIQUE (name, category)
+);
+CREATE TABLE deck (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description VARCHAR, card_ids JSON);
+CREATE TABLE room (
+    code VARCHAR PRIMARY KEY, name VARCHAR NOT NULL, host_user_id VARCHAR NOT NULL REFERENCES user (id),
+    max_players INTEGER NOT NULL, visibility VARCHAR NOT NULL, created_at DATETIME NOT NULL
+);
+CREATE TABLE roommembership (
+    room_code VARCHAR NOT NULL REFERENCES room (code), user_id VARCHAR NOT NULL REFERENCES user (id),
+    role VARCHAR NOT NULL, joined_at DATETIME NOT NULL, PRIMARY KEY (room_code, user_id)
+);
+INSERT INTO user VALUES ('host', 'google', 'Host'), ('fan', 'google', 'Fan');
+INSERT INTO room VALUES ('ROOM01', 'Old room', 'host', 4, 'public', '2024-01-01 00:00:00');
+INSERT INTO roommembership VALUES ('ROOM01', 'fan', 'spectator', '2024-01-01 00:01:00');
+INSERT INTO deck VALUES (1, 'Old deck', NULL, '[3, 1, 3]'), (2, 'Empty deck', NULL, NULL);
+"""
+
+
+@pytest.fixture()
+def database(tmp_path, monkeypatch):
+    def load(schema: str | None = None):
+        db_path = tmp_path / "migrations.db"
+        if schema:
+            with sqlite3.connect(db_path) as connection:
+                connection.executescript(schema)
+        monkeypatch.setenv("DATABASE_URL", str(db_path))
+        monkeypatch.setenv("APP_ENV", "development")
+        importlib.reload(importlib.import_module("app.config"))
+        return importlib.reload(importlib.import_module("app.db"))
+
+    return load
+
+
+def _query(db, sql: str) -> list[tuple]:
+    with db.engine.connect() as connection:
+        return [tuple(row) for row in connection.exec_driver_sql(sql)]
+
+
+def test_new_database_is_stamped_without_running_steps(database):
+    from app.migrations import LATEST_VERSION, migrate
+
+    db = database()
+    assert migrate(db.engine) == []
+    assert _query(db, "SELECT version FROM schema_version") == [(LATEST_VERSION,)]
+    assert _query(db, "SELECT id, card_revision, deck_revision FROM catalogstate") == [(1, 0, 0)]
+
+
+def test_legacy_database_is_upgraded_in_one_pass(database):
+    from app.migrations import LATEST_VERSION, MIGRATIONS, migrate
+
+    db = database(LEGACY_SCHEMA)
+    applied = migrate(db.engine)
+
+    assert [step.version for step in applied] == [step.version for step in MIGRATIONS]
+    assert _query(db, "SELECT version FROM schema_version") == [(LATEST_VERSION,)]
+    assert _query(db, "SELECT role FROM user WHERE id = 'host'") == [("guest",)]
+    assert _query(db, "SELECT status, max_spectators, player_count, spectator_count FROM room") == [
+        ("active", 0, 1, 1)
+    ]
+    assert _query(db, "SELECT count(*) FROM roommembership WHERE user_id = 'host'") == [(1,)]
+    columns = {row[1] for row in _query(db, "PRAGMA table_info('card')")}
+    assert {"time", "reputation", "discipline", "documents", "technology"} <= columns
+    indexes = {row[0] for row in _query(db, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {"ix_room_status_visibility_created_at", "ix_roommembership_user_id", "ix_deckcard_card_id"} <= indexes
+    assert _query(db, "SELECT deck_id, position, card_id FROM deckcard ORDER BY deck_id, position") == [
+        (1, 0, 3),
+        (1, 1, 1),
+        (1, 2, 3),
+    ]
+
+
+def test_current_database_costs_one_query_and_pending_steps_run_alone(database):
+    from sqlalchemy import event
+
+    from app.migrations import LATEST_VERSION, migrate
+
+    db = database()
+    migrate(db.engine)
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        assert migrate(db.engine) == []
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert statements == ["SELECT version FROM schema_version"]
+
+    with db.engine.begin() as connection:
+        connection.exec_driver_sql("DROP INDEX ix_user_provider_display_name")
+        # Step 6 creates the index; only it and later steps may run.
+        connection.exec_driver_sql("UPDATE schema_version SET version = 5")
+    assert [step.version for step in migrate(db.engine)] == list(range(6, LATEST_VERSION + 1))
+    indexes = {row[0] for row in _query(db, "SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "ix_user_provider_display_name" in indexes
+
+
+def test_concurrent_workers_apply_each_step_once(database):
+    from app.migrations import MIGRATIONS, migrate
+
+    db = database(LEGACY_SCHEMA)
+    barrier = threading.Barrier(4)
+    results, errors = [], []
+
+    def worker():
+        barrier.wait()
+        try:
+            results.append(migrate(db.engine))
+        except Exception as error:  # pragma: no cover - reported by the assertion below
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(len(applied) for applied in results) == [0, 0, 0, len(MIGRATIONS)]
+    assert _query(db, "SELECT count(*) FROM roommembership WHERE user_id = 'host'") == [(1,)]
@@ -0,0 +1,122 @@
+import importlib
+import re
+
+import pytest
+
+pytestmark = pytest.mark.sqlite_only
+
+# Statements that read a whole table on purpose, matched by a fragment of their SQL.
+INTENTIONAL_SCANS = {
+    # The catalog cache loads every card once per card revision.
+    "FROM card ORDER BY card.id": "catalog cache reload",
+    # OFFSET pages walk the rowid in order and stop after LIMIT + OFFSET rows.
+    "FROM deck ORDER BY deck.id LIMIT": "offset deck page",
+    # Counter maintenance compares every room with the membership table.
+    "SELECT room.code, room.player_count, room.spectator_count FROM room": "room counter verification",
+}
+_TABLE_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+@pytest.fixture()
+def database(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", str(tmp_path / "plans.db"))
+    monkeypatch.setenv("APP_ENV", "development")
+    importlib.reload(importlib.import_module("app.config"))
+    db = importlib.reload(importlib.import_module("app.db"))
+    importlib.reload(importlib.import_module("app.repository"))
+    db.init_db()
+    return db
+
+
+def _capture_statements(engine):
+    from sqlalchemy import event
+
+    captured = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    return captured, lambda: event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _exercise_repository(session):
+    from app.models import (
+        CardBase,
+        DeckBase,
+        DeckImport,
+        LoginRequest,
+        Provider,
+        Role,
+        RoomCreate,
+        User,
+    )
+    from app.repository import Repository, encode_cursor, room_cursor
+
+    repo = Repository(session)
+    repo.ensure_admin_user()
+    repo.create_user(LoginRequest(provider="guest", display_name="Planner", password="secret"))
+    for user_id in ("host", "guest"):
+        session.add(User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id))
+    session.flush()
+
+    card = repo.add_card(CardBase(name="Plan", description="", category="plan"))
+    repo.update_card(card.id, CardBase(name="Plan", description="changed", category="plan"))
+    imported = repo.bulk_import_cards([CardBase(name=f"Plan {index}", description="") for index in range(3)])
+    card_ids = [result.id for result in imported.results]
+    _, card_token = repo.list_cards_json(2, 0)
+    repo.list_cards_json(2, 0, card_token)
+
+    deck = repo.add_deck(DeckBase(name="Plans", card_ids=card_ids))
+    repo.update_deck(deck.id, DeckBase(name="Plans", card_ids=card_ids + [card.id]))
+    repo.list_decks(10, 0)
+    repo.list_decks(10, 0, encode_cursor(deck.id))
+    repo.list_card_decks(card.id)
+    repo.export_deck(deck.id)
+    repo.export_deck_json(deck.id)
+    list(repo.iter_deck_export_ndjson(deck.id))
+    repo.import_deck(DeckImport(deck=DeckBase(name="Copy"), cards=[CardBase(name="Plan 0", description="")]))
+    repo.delete_card(card.id)
+
+    room = repo.create_room(RoomCreate(name="Plans", max_players=4, max_spectators=2, visibility="public"), "host")
+    repo.join_room(room.code, "guest", as_spectator=False)
+    repo.get_room(room.code, "guest")
+    repo.list_room_player_ids(room.code)
+    for user_id in (None, "guest"):
+        for visibility in (None, "public"):
+            for sort in ("-created_at", "name"):
+                first = repo.list_rooms(10, 0, user_id, visibility, "active", sort)
+                repo.list_rooms(10, 0, user_id, visibility, "active", sort, room_cursor(first[0], sort))
+    for status in (None, "active"):
+        first = repo.list_all_rooms(10, 0, status)
+        repo.list_all_rooms(10, 0, status, None, room_cursor(first[0], None))
+    repo.verify_room_counters()
+
+    users = repo.list_users(10, 0)
+    repo.list_users(10, 0, encode_cursor(users[0].id))
+    repo.delete_user("guest")
+    repo.delete_room(room.code)
+
+
+def test_repository_queries_avoid_full_table_scans(database):
+    captured, stop = _capture_statements(database.engine)
+    try:
+        with database.session_scope() as session:
+            _exercise_repository(session)
+    finally:
+        stop()
+
+    assert len(captured) > 40
+    failures = []
+    with database.engine.connect() as connection:
+        for statement, parameters in captured:
+            flattened = " ".join(statement.split())
+            if any(fragment in flattened for fragment in INTENTIONAL_SCANS):
+                continue
+            plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+            scans = [detail for detail in plan if _TABLE_SCAN.match(detail)]
+            if scans:
+                failures.append(f"{flattened}\n    {plan}")
+    assert not failures, "Full table scans:\n" + "\n".join(failures)
+
@@ -0,0 +1,58 @@
+import asyncio
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.querylog import QueryBudgetExceeded, QueryBudgetMiddleware, install
+
+
+def _request(app, path: str = "/decks"):
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    asyncio.run(app(scope, receive, send))
+
+
+def _app_running(engine, statements: int):
+    async def app(scope, receive, send):
+        with engine.connect() as connection:
+            for index in range(statements):
+                connection.execute(text("SELECT :index"), {"index": index})
+
+    return app
+
+
+def test_slow_statements_are_logged_with_parameters_and_route(caplog):
+    engine = create_engine("sqlite://")
+    install(engine, slow_query_ms=0)
+
+    with caplog.at_level(logging.WARNING, logger="app.querylog"):
+        _request(QueryBudgetMiddleware(_app_running(engine, 1), budget=None))
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 2
+    assert "in GET /decks: SELECT ?; parameters: (0,)" in messages[0]
+    assert "in no request: SELECT 1" in messages[1]
+
+
+def test_requests_over_budget_warn_or_raise(caplog):
+    engine = create_engine("sqlite://")
+    install(engine, slow_query_ms=None)
+
+    with caplog.at_level(logging.WARNING, logger="app.querylog"):
+        _request(QueryBudgetMiddleware(_app_running(engine, 3), budget=3))
+        _request(QueryBudgetMiddleware(_app_running(engine, 4), budget=3))
+    assert [record.getMessage() for record in caplog.records] == [
+        "GET /decks ran 4 SQL statements, over its budget of 3"
+    ]
+
+    with pytest.raises(QueryBudgetExceeded):
+        _request(QueryBudgetMiddleware(_app_running(engine, 4), budget=3, action="raise"))
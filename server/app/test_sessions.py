@@ -0,0 +1,57 @@
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.models import Provider, Role, UserRead
+from app.sessions import SessionTokens
+
+USER = UserRead(id="u1", provider=Provider.GUEST, role=Role.ADMIN, display_name="Ada")
+
+
+def test_verified_tokens_are_memoized_but_still_expire_and_revoke(monkeypatch):
+    tokens = SessionTokens("secret", ttl_seconds=60)
+    token = tokens.issue(USER).access_token
+
+    assert tokens.verify(token) == USER
+    assert tokens.verify(token) == USER
+    for garbage in ("not-a-token", token[:-2] + "xx"):
+        with pytest.raises(HTTPException, match="Invalid"):
+            tokens.verify(garbage)
+    assert list(tokens._verified) == [token]
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    with pytest.raises(HTTPException, match="expired"):
+        tokens.verify(token)
+
+    monkeypatch.setattr(time, "time", lambda: now)
+    tokens.revoke(token)
+    with pytest.raises(HTTPException, match="revoked"):
+        tokens.verify(token)
+
+
+def test_tokens_signed_with_another_secret_are_rejected():
+    token = SessionTokens("other", ttl_seconds=60).issue(USER).access_token
+
+    with pytest.raises(HTTPException) as rejected:
+        SessionTokens("secret", ttl_seconds=60).verify(token)
+
+    assert rejected.value.status_code == 401
+    assert rejected.value.headers == {"WWW-Authenticate": "Bearer"}
+
+
+@pytest.mark.parametrize("environment", ["staging", "production"])
+def test_settings_require_a_session_secret_outside_development(monkeypatch, environment):
+    from pydantic import ValidationError
+
+    from app.config import Settings
+
+    monkeypatch.setenv("APP_ENV", environment)
+    monkeypatch.setenv("ALLOWED_ORIGIN_REGEX", "")
+    monkeypatch.setenv("SESSION_SECRET", "")
+    with pytest.raises(ValidationError, match="SESSION_SECRET must be set"):
+        Settings()
+
+    monkeypatch.setenv("SESSION_SECRET", "shared")
+    assert Settings().session_secret == "shared"
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("numpy", reason="numpy is required for the simulator")
+
+from app.simulate import RANKS, load_deck, main, run_simulation  # noqa: E402
+
+SAMPLE_DECK = Path(__file__).resolve().parents[2] / "cards" / "sample-deck.json"
+
+
+def test_simulation_reports_distributions_per_player_count():
+    cards = load_deck(SAMPLE_DECK)
+    report = run_simulation(cards, [3, 6], games=200, workers=1, batch_size=64, seed=3)
+
+    assert [summary["players"] for summary in report] == [3, 6]
+    for summary in report:
+        assert sum(summary["game_length"]["histogram"]) == 200
+        assert len(summary["final_rank"]["distribution_by_seat"]) == summary["players"]
+        assert all(sum(seat) == 200 for seat in summary["final_rank"]["distribution_by_seat"])
+        assert sum(summary["final_rank"]["win_rate_by_seat"]) == pytest.approx(1.0)
+        assert len(summary["final_rank"]["ranks"]) == len(RANKS)
+        assert len(summary["resource_trajectory"]["mean_per_turn"][0]) == 5
+
+
+def test_simulation_is_reproducible_for_a_seed():
+    cards = load_deck(SAMPLE_DECK)
+    first = run_simulation(cards, [4], games=100, policy="random", workers=1, seed=11)
+    second = run_simulation(cards, [4], games=100, policy="random", workers=1, seed=11)
+    assert first == second
+
+
+@pytest.mark.parametrize("players", ["2", "7"])
+def test_cli_rejects_player_counts_outside_the_rules(players, capsys):
+    with pytest.raises(SystemExit) as exited:
+        main([str(SAMPLE_DECK), "--players", players])
+
+    assert exited.value.code == 2
+    assert "between 3 and 6" in capsys.readouterr().err
@@ -0,0 +1,8 @@
+"""Summary statistics shared by the benchmark scripts."""
+
+
+def percentile(samples: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of ``samples``; ``fraction`` is 0.5 for the median, 0.99 for p99."""
+
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
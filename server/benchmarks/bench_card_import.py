@@ -0,0 +1,73 @@
+"""Time bulk card imports into a fresh SQLite database.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_card_import --cards 1000 5000
+
+Each size is imported twice: once into an empty catalog (all ``created``) and
+once more with the same payload (all ``reused``), reporting wall time and the
+number of SQL statements issued.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_room_listing import _count_statements
+
+
+def _cards(count: int, prefix: str):
+    from app.models import CardBase
+
+    return [
+        CardBase(
+            name=f"{prefix} card {index}",
+            description="Generated for the import benchmark",
+            category=("blunder", "support", "decision", None)[index % 4],
+            time=index % 3 - 1,
+            reputation=index % 5 - 2,
+        )
+        for index in range(count)
+    ]
+
+
+def run(sizes: list[int]) -> list[dict]:
+    from app.db import engine, init_db, session_scope
+    from app.repository import Repository
+
+    init_db()
+    results = []
+    for size in sizes:
+        cards = _cards(size, f"bench-{size}")
+        for phase in ("created", "reused"):
+            with _count_statements(engine) as counter:
+                started = time.perf_counter()
+                with session_scope() as session:
+                    summary = Repository(session).bulk_import_cards(cards)
+                elapsed = time.perf_counter() - started
+            assert getattr(summary, phase) == size, summary
+            results.append(
+                {"cards": size, "phase": phase, "ms": elapsed * 1000, "statements": counter["statements"]}
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[150, 1000, 5000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = str(Path(tmp_dir) / "bench.db")
+        os.environ.setdefault("APP_ENV", "development")
+        results = run(args.cards)
+
+    print(f"{'cards':>6} {'phase':>8} {'ms':>9} {'SQL':>5}")
+    for row in results:
+        print(f"{row['cards']:>6} {row['phase']:>8} {row['ms']:>9.1f} {row['statements']:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare peak memory of the JSON and NDJSON deck exports.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_deck_export --cards 1000 10000 50000
+
+Each size seeds a deck of that many distinct cards and measures the
+``tracemalloc`` peak while rendering ``export_deck`` (the ORM path behind the
+JSON endpoint) and while iterating ``iter_deck_export_ndjson`` chunk by chunk.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.bench_card_import import _cards
+
+
+def _measure(render) -> tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    render()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024 / 1024
+
+
+def run(sizes: list[int]) -> list[dict]:
+    from app.db import init_db, session_scope
+    from app.models import DeckBase
+    from app.repository import Repository
+
+    init_db()
+    results = []
+    for size in sizes:
+        with session_scope() as session:
+            repo = Repository(session)
+            imported = repo.bulk_import_cards(_cards(size, f"export-{size}"))
+            deck = repo.add_deck(DeckBase(name=f"Deck {size}", card_ids=[r.id for r in imported.results]))
+
+        def render_json():
+            with session_scope() as session:
+                Repository(session).export_deck(deck.id)
+
+        def render_ndjson():
+            with session_scope() as session:
+                for _ in Repository(session).iter_deck_export_ndjson(deck.id):
+                    pass
+
+        for export, render in (("json", render_json), ("ndjson", render_ndjson)):
+            elapsed, peak = _measure(render)
+            results.append({"cards": size, "export": export, "ms": elapsed, "peak_mb": peak})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = str(Path(tmp_dir) / "bench.db")
+        os.environ.setdefault("APP_ENV", "development")
+        results = run(args.cards)
+
+    print(f"{'cards':>6} {'export':>7} {'ms':>9} {'peak MB':>8}")
+    for row in results:
+        print(f"{row['cards']:>6} {row['export']:>7} {row['ms']:>9.1f} {row['peak_mb']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measure per-request dependency resolution overhead of representative routes.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_dependencies --iterations 5000
+
+For each route, FastAPI's ``solve_dependencies`` resolves the route's whole
+dependency tree (session, repository, authentication, settings) for a
+synthetic request, then the per-request exit stack is closed as it would be
+after the response. No endpoint body runs, so the timings isolate what every
+request pays before route code starts. Authenticated routes use a bearer
+session token, so authentication itself stays off the database.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+
+from benchmarks._stats import percentile
+
+LOGIN_BODY = b'{"provider": "guest", "display_name": "bench", "password": "secret"}'
+ROUTES = (
+    ("GET", "/cards"),
+    ("GET", "/rooms"),
+    ("GET", "/admin/cards"),
+    ("POST", "/auth/login"),
+)
+
+
+def _scope(method: str, path: str, token: str) -> dict:
+    return {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"authorization", f"Bearer {token}".encode()), (b"content-type", b"application/json")],
+        "path_params": {},
+    }
+
+
+async def _receive() -> dict:
+    return {"type": "http.request", "body": LOGIN_BODY, "more_body": False}
+
+
+async def _time_route(app, route, method: str, path: str, token: str, iterations: int) -> list[float]:
+    from fastapi.dependencies.utils import solve_dependencies
+    from starlette.requests import Request
+
+    samples: list[float] = []
+    for _ in range(iterations):
+        request = Request(_scope(method, path, token), _receive)
+        started = time.perf_counter()
+        async with AsyncExitStack() as stack:
+            await solve_dependencies(
+                request=request,
+                dependant=route.dependant,
+                body=None,
+                dependency_overrides_provider=app,
+                async_exit_stack=stack,
+            )
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _run_all(iterations: int) -> list[dict]:
+    from app.main import _startup, app
+    from app.models import Provider, Role, UserRead
+    from app.sessions import session_tokens
+
+    _startup()
+    admin = UserRead(id="admin", provider=Provider.GUEST, role=Role.ADMIN, display_name="admin")
+    token = session_tokens.issue(admin).access_token
+    rows = []
+    for method, path in ROUTES:
+        route = next(
+            candidate
+            for candidate in app.routes
+            if getattr(candidate, "path", None) == path and method in getattr(candidate, "methods", ())
+        )
+        await _time_route(app, route, method, path, token, min(iterations, 200))
+        samples = await _time_route(app, route, method, path, token, iterations)
+        rows.append(
+            {
+                "route": f"{method} {path}",
+                "mean_us": sum(samples) / len(samples) * 1e6,
+                "p50_us": percentile(samples, 0.50) * 1e6,
+                "p99_us": percentile(samples, 0.99) * 1e6,
+            }
+        )
+    return rows
+
+
+def run(iterations: int) -> list[dict]:
+    return asyncio.run(_run_all(iterations))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000, help="Resolutions timed per route")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = str(Path(tmp_dir) / "bench.db")
+        os.environ.setdefault("APP_ENV", "development")
+        rows = run(args.iterations)
+
+    print(f"{'route':>18} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}")
+    for row in rows:
+        print(f"{row['route']:>18} {row['mean_us']:>9.1f} {row['p50_us']:>9.1f} {row['p99_us']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
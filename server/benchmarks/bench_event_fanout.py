@@ -0,0 +1,132 @@
+"""Load test WebSocket fan-out latency for room events.
+
+Starts the real ASGI app under uvicorn on a throwaway SQLite database, opens
+``--sockets`` idle WebSocket connections to one room's event stream and then
+publishes ``--events`` events through the hub, reporting delivery latency
+percentiles across every socket. Run from the ``server`` directory::
+
+    python -m benchmarks.bench_event_fanout --sockets 1000 --events 20
+
+The ``websockets`` client ships with ``uvicorn[standard]``. Raise the open file
+limit (``ulimit -n``) before testing more than ~1000 sockets.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks._stats import percentile
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _start_server(port: int):
+    import uvicorn
+
+    from app.main import app
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", ws_ping_interval=None)
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def _seed_room() -> str:
+    from app.db import session_scope
+    from app.models import Provider, Role, RoomCreate, User
+    from app.repository import Repository
+
+    with session_scope() as session:
+        session.add(User(id="bench-host", provider=Provider.GOOGLE, role=Role.USER, display_name="Bench"))
+        session.flush()
+        room = Repository(session).create_room(
+            RoomCreate(name="Fan-out", max_players=6, max_spectators=10, visibility="public"),
+            "bench-host",
+        )
+    return room.code
+
+
+async def _run_clients(url: str, socket_count: int, event_count: int, publish) -> list[float]:
+    import websockets
+
+    latencies: list[float] = []
+    connections = []
+    for _ in range(socket_count):
+        connections.append(await websockets.connect(url, max_queue=event_count + 1))
+
+    async def receive(connection):
+        for _ in range(event_count):
+            event = json.loads(await connection.recv())
+            latencies.append(time.time() - event["sent"])
+
+    receivers = [asyncio.create_task(receive(connection)) for connection in connections]
+    for sequence in range(event_count):
+        publish({"type": "bench", "seq": sequence, "sent": time.time()})
+        await asyncio.sleep(0.05)
+    await asyncio.wait_for(asyncio.gather(*receivers), timeout=60)
+    for connection in connections:
+        await connection.close()
+    return latencies
+
+
+def run(socket_count: int, event_count: int) -> dict:
+    from app.events import event_hub
+
+    port = _free_port()
+    server, thread = _start_server(port)
+    try:
+        code = _seed_room()
+        url = f"ws://127.0.0.1:{port}/rooms/{code}/events"
+        latencies = asyncio.run(
+            _run_clients(url, socket_count, event_count, lambda event: event_hub.publish(code, event))
+        )
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+    return {
+        "sockets": socket_count,
+        "events": event_count,
+        "deliveries": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sockets", type=int, default=500)
+    parser.add_argument("--events", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = str(Path(tmp_dir) / "bench.db")
+        os.environ.setdefault("APP_ENV", "development")
+        result = run(args.sockets, args.events)
+
+    print(
+        f"{result['sockets']} sockets x {result['events']} events = {result['deliveries']} deliveries: "
+        f"p50 {result['p50_ms']:.2f} ms, p95 {result['p95_ms']:.2f} ms, "
+        f"p99 {result['p99_ms']:.2f} ms, mean {result['mean_ms']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
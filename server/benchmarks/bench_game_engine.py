@@ -0,0 +1,84 @@
+"""Measure match memory footprint and per-move latency of the in-memory game engine.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_game_engine --matches 5000 --players 4
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from app.game import MAX_HAND_SIZE, GameEngine
+from app.models import CardRead
+
+
+def _catalog_cards(count: int) -> list[CardRead]:
+    return [
+        CardRead(
+            id=index,
+            name=f"Card {index}",
+            description="",
+            time=index % 3 - 1,
+            reputation=index % 5 - 2,
+            discipline=index % 2,
+            documents=-(index % 2),
+            technology=index % 4 - 1,
+        )
+        for index in range(1, count + 1)
+    ]
+
+
+def run(match_count: int, player_count: int, deck_size: int) -> dict:
+    cards = _catalog_cards(deck_size)
+    deck = [card.id for card in cards]
+    players = [f"player-{seat}" for seat in range(player_count)]
+    engine = GameEngine()
+
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    for index in range(match_count):
+        engine.start(f"room-{index}", cards, deck, players, seed=index)
+    setup_seconds = time.perf_counter() - started
+    resident, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    moves = 0
+    started = time.perf_counter()
+    for index in range(match_count):
+        room = f"room-{index}"
+        for player in players:
+            for _ in range(MAX_HAND_SIZE // 2):
+                card_id = engine.draw(room, player).value
+                engine.play(room, player, card_id)
+                engine.promote(room, player, card_id)
+                moves += 3
+    move_seconds = time.perf_counter() - started
+
+    return {
+        "matches": match_count,
+        "bytes_per_match": (resident - baseline) / match_count,
+        "setup_us_per_match": setup_seconds / match_count * 1e6,
+        "moves": moves,
+        "us_per_move": move_seconds / moves * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--matches", type=int, default=5000)
+    parser.add_argument("--players", type=int, default=4)
+    parser.add_argument("--deck-size", type=int, default=150)
+    args = parser.parse_args()
+
+    result = run(args.matches, args.players, args.deck_size)
+    print(
+        f"{result['matches']} matches: {result['bytes_per_match'] / 1024:.1f} KiB each, "
+        f"setup {result['setup_us_per_match']:.1f} us/match, "
+        f"{result['us_per_move']:.2f} us/move over {result['moves']} moves"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""Load-test the full ASGI app with seeded data and mixed lobby, login, join and import traffic.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_load --users 2000 --rooms 500 --cards 2000 --decks 50 \\
+        --concurrency 50 --requests 2000 --output load.json
+
+A throwaway SQLite database is seeded with ``--users`` player accounts (plus
+``--guests`` guest accounts sharing one password hash), ``--rooms`` public rooms
+whose hosts are joined by ``--members-per-room`` other players, ``--cards``
+cards and ``--decks`` decks. Each scenario then drives ``app.main.app`` through
+``httpx.ASGITransport`` from ``--concurrency`` client tasks on one event loop,
+i.e. one worker with its middleware, dependencies, pools and password-hash
+threads, but no sockets:
+
+- ``login``: guest logins, existing names (bcrypt verify) and new sign-ups (hash);
+- ``lobby``: ``GET /rooms`` polling by players with bearer session tokens;
+- ``join``: ``POST /rooms/{code}/join`` storms; full rooms answer 400;
+- ``import``: ``POST /admin/decks/import`` with new and reused cards;
+- ``mixed``: the ``--mix`` weights of the four above.
+
+Scenarios run in order on the same database, so later ones see the rooms
+filled and the cards imported by earlier ones. Latencies are measured by the
+client per endpoint (route template) and reported as p50/p95/p99 with
+throughput and status counts. ``--output`` writes them as JSON along with the
+commit, arguments and platform; ``--baseline`` prints the p95 change against
+such a file from another commit. Runs are reproducible for a given ``--seed``,
+up to scheduling noise.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks._stats import percentile
+
+SCENARIOS = ("login", "lobby", "join", "import", "mixed")
+ENDPOINTS = {
+    "login": "POST /auth/login",
+    "lobby": "GET /rooms",
+    "join": "POST /rooms/{code}/join",
+    "import": "POST /admin/decks/import",
+}
+GUEST_PASSWORD = "load-test"
+IMPORT_CARDS = 20
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"unknown workload {name!r}; choose from {sorted(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _seed(args: argparse.Namespace) -> dict:
+    """Fill the database and return the ids the workloads pick from."""
+
+    from sqlmodel import select
+
+    from app.db import session_scope
+    from app.hashing import password_hasher
+    from app.models import Card, CardBase, DeckBase, Provider, Role, Room, RoomMembership, User
+    from app.repository import Repository
+
+    rng = random.Random(args.seed)
+    password_hash = password_hasher.hash("seed", GUEST_PASSWORD).result()
+    players = [f"player-{index}" for index in range(args.users)]
+    guests = [f"guest-{index}" for index in range(args.guests)]
+    with session_scope() as session:
+        repo = Repository(session)
+        session.add_all(
+            User(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id) for user_id in players
+        )
+        session.add_all(
+            User(id=name, provider=Provider.GUEST, role=Role.GUEST, display_name=name, password_hash=password_hash)
+            for name in guests
+        )
+        session.flush()
+
+        codes = [f"L{index:05d}" for index in range(args.rooms)]
+        rooms, memberships = [], []
+        for index, code in enumerate(codes):
+            members = rng.sample(players, min(len(players), 1 + args.members_per_room))
+            rooms.append(
+                Room(
+                    code=code,
+                    name=f"Load {index}",
+                    host_user_id=members[0],
+                    max_players=6,
+                    max_spectators=4,
+                    visibility="public",
+                    player_count=len(members),
+                )
+            )
+            memberships += [RoomMembership(room_code=code, user_id=user_id) for user_id in members]
+        session.add_all(rooms)
+        session.flush()
+        session.add_all(memberships)
+
+        repo.bulk_import_cards(
+            [CardBase(name=f"Seed {index}", description="", category="load") for index in range(args.cards)]
+        )
+        card_ids = list(session.exec(select(Card.id)))
+        for index in range(args.decks):
+            repo.add_deck(DeckBase(name=f"Seed deck {index}", card_ids=rng.sample(card_ids, min(len(card_ids), 40))))
+    return {"players": players, "guests": guests, "rooms": codes}
+
+
+class Workloads:
+    def __init__(self, client, seeded: dict, admin_token: str, rng: random.Random):
+        from app.models import Provider, Role, UserRead
+        from app.sessions import session_tokens
+
+        self.client = client
+        self.seeded = seeded
+        self.rng = rng
+        self.admin = {"Authorization": f"Bearer {admin_token}"}
+        self.players = [
+            {
+                "Authorization": "Bearer "
+                + session_tokens.issue(
+                    UserRead(id=user_id, provider=Provider.GOOGLE, role=Role.USER, display_name=user_id)
+                ).access_token
+            }
+            for user_id in seeded["players"]
+        ]
+        self._sequence = 0
+
+    def _next(self) -> int:
+        self._sequence += 1
+        return self._sequence
+
+    async def login(self):
+        # Half the storm re-authenticates seeded guests, half signs up new ones.
+        guests = self.seeded["guests"]
+        if guests and self.rng.random() < 0.5:
+            name = self.rng.choice(guests)
+        else:
+            name = f"load-guest-{self._next()}"
+        payload = {"provider": "guest", "display_name": name, "password": GUEST_PASSWORD}
+        return await self.client.post("/auth/login", json=payload)
+
+    async def lobby(self):
+        return await self.client.get("/rooms", headers=self.rng.choice(self.players))
+
+    async def join(self):
+        code = self.rng.choice(self.seeded["rooms"])
+        payload = {"as_spectator": self.rng.random() < 0.25}
+        return await self.client.post(f"/rooms/{code}/join", json=payload, headers=self.rng.choice(self.players))
+
+    async def import_deck(self):
+        batch = self._next()
+        # New cards plus half as many seeded ones, so imports exercise both inserts and reuse.
+        names = [f"Load {batch}-{index}" for index in range(IMPORT_CARDS)]
+        names += [f"Seed {index}" for index in range(0, IMPORT_CARDS, 2)]
+        cards = [{"name": name, "description": "", "category": "load"} for name in names]
+        payload = {"deck": {"name": f"Load deck {batch}", "card_ids": []}, "cards": cards}
+        return await self.client.post("/admin/decks/import", json=payload, headers=self.admin)
+
+    def pick(self, mix: dict[str, float]):
+        name = self.rng.choices(list(mix), weights=list(mix.values()))[0]
+        return name, {"login": self.login, "lobby": self.lobby, "join": self.join, "import": self.import_deck}[name]
+
+
+async def _run_scenario(
+    workloads: Workloads, scenario: str, mix: dict[str, float], concurrency: int, requests: int
+) -> dict:
+    latencies: dict[str, list[float]] = defaultdict(list)
+    statuses: dict[str, Counter] = defaultdict(Counter)
+    remaining = iter(range(requests))
+    weights = mix if scenario == "mixed" else {scenario: 1.0}
+
+    async def client() -> None:
+        for _ in remaining:
+            name, send = workloads.pick(weights)
+            started = time.perf_counter()
+            response = await send()
+            latencies[ENDPOINTS[name]].append(time.perf_counter() - started)
+            statuses[ENDPOINTS[name]][str(response.status_code)] += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    endpoints = {
+        endpoint: {
+            "count": len(samples),
+            "rps": len(samples) / elapsed,
+            "p50_ms": percentile(samples, 0.50) * 1000,
+            "p95_ms": percentile(samples, 0.95) * 1000,
+            "p99_ms": percentile(samples, 0.99) * 1000,
+            "max_ms": max(samples) * 1000,
+            "statuses": dict(sorted(statuses[endpoint].items())),
+        }
+        for endpoint, samples in sorted(latencies.items())
+    }
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": requests,
+        "elapsed_s": elapsed,
+        "rps": requests / elapsed,
+        "endpoints": endpoints,
+    }
+
+
+async def _run_all(args: argparse.Namespace, seeded: dict) -> list[dict]:
+    import httpx
+
+    from app import main
+
+    rng = random.Random(args.seed)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+        admin = {"provider": "guest", "display_name": "admin", "password": "admin!"}
+        login = await client.post("/auth/login", json=admin)
+        workloads = Workloads(client, seeded, login.json()["access_token"], rng)
+        results = []
+        for scenario in args.scenarios:
+            requests = args.login_requests if scenario == "login" else args.requests
+            results.append(await _run_scenario(workloads, scenario, args.mix, args.concurrency, requests))
+    await main.async_engine.dispose()
+    return results
+
+
+def run(args: argparse.Namespace) -> dict:
+    from app import main
+
+    main._startup()
+    seed_started = time.perf_counter()
+    seeded = _seed(args)
+    seed_seconds = time.perf_counter() - seed_started
+    scenarios = asyncio.run(_run_all(args, seeded))
+    return {
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "arguments": {key: value for key, value in vars(args).items() if key not in {"output", "baseline"}},
+        "seed_seconds": seed_seconds,
+        "scenarios": scenarios,
+    }
+
+
+def _print_report(report: dict, baseline: dict | None) -> None:
+    previous = {
+        (scenario["scenario"], endpoint): stats["p95_ms"]
+        for scenario in (baseline or {}).get("scenarios", [])
+        for endpoint, stats in scenario["endpoints"].items()
+    }
+    header = f"{'scenario':>8} {'endpoint':>26} {'count':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    print(header + (f" {'p95 vs base':>11}" if baseline else "") + "  statuses")
+    for scenario in report["scenarios"]:
+        for endpoint, stats in scenario["endpoints"].items():
+            line = (
+                f"{scenario['scenario']:>8} {endpoint:>26} {stats['count']:>6} {stats['rps']:>8.1f} "
+                f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+            )
+            if baseline:
+                before = previous.get((scenario["scenario"], endpoint))
+                line += f" {(stats['p95_ms'] / before - 1) * 100:>+10.1f}%" if before else f" {'-':>11}"
+            statuses = " ".join(f"{code}:{count}" for code, count in stats["statuses"].items())
+            print(f"{line}  {statuses}")
+        print(f"{scenario['scenario']:>8} {'all':>26} {scenario['requests']:>6} {scenario['rps']:>8.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000, help="Seeded player accounts")
+    parser.add_argument("--guests", type=int, default=200, help="Seeded guest accounts for login storms")
+    parser.add_argument("--rooms", type=int, default=300)
+    parser.add_argument("--members-per-room", type=int, default=2, help="Players joined to each room besides its host")
+    parser.add_argument("--cards", type=int, default=1000)
+    parser.add_argument("--decks", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument(
+        "--mix",
+        type=_parse_mix,
+        default=_parse_mix("lobby=20,join=4,login=1,import=1"),
+        help="Workload weights of the mixed scenario, e.g. lobby=20,join=4,login=1,import=1",
+    )
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent client tasks")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument(
+        "--login-requests", type=int, default=100, help="Requests of the login scenario (each one runs bcrypt)"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="Write the results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Earlier --output file to compare p95 latencies with")
+    args = parser.parse_args()
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else None
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = str(Path(tmp_dir) / "bench.db")
+        os.environ["CARDS_PATH"] = str(Path(tmp_dir) / "no-cards")
+        os.environ.setdefault("APP_ENV", "development")
+        report = run(args)
+
+    _print_report(report, baseline)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
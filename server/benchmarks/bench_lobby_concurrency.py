@@ -0,0 +1,169 @@
+"""Compare threadpool and async repository calls for concurrent lobby requests.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_lobby_concurrency --concurrency 10 100 400 --requests 2000 --logins 1
+
+Each mode serves ``--requests`` lobby requests (a ``get_user`` lookup plus a
+``list_rooms`` page, like ``GET /rooms``) from ``--concurrency`` concurrent
+tasks on one event loop, i.e. one worker, while ``--logins`` back-to-back guest
+logins hash passwords in the background. ``threadpool`` runs the sync ``Repository`` through
+``run_in_threadpool`` the way sync routes do; ``async`` awaits
+``AsyncRepository``. The report lists throughput, latency percentiles and the
+worst event-loop stall seen by a 5 ms heartbeat.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks._stats import percentile
+
+MODES = ("threadpool", "async")
+ROOMS = 200
+HEARTBEAT_S = 0.005
+
+
+def _seed() -> None:
+    from app.db import init_db, session_scope
+    from app.models import Provider, Role, RoomCreate, User
+    from app.repository import Repository
+
+    init_db()
+    with session_scope() as session:
+        session.add(User(id="lobby-user", provider=Provider.GOOGLE, role=Role.USER, display_name="Lobby"))
+        session.flush()
+        repo = Repository(session)
+        for index in range(ROOMS):
+            repo.create_room(
+                RoomCreate(name=f"Room {index}", max_players=4, max_spectators=2, visibility="public"),
+                "lobby-user",
+            )
+
+
+def _sync_lobby_request() -> None:
+    from app.db import session_scope
+    from app.repository import Repository
+
+    with session_scope() as session:
+        repo = Repository(session)
+        repo.get_user("lobby-user")
+        repo.list_rooms(50, 0, "lobby-user", None, "active", "-created_at")
+
+
+async def _async_lobby_request() -> None:
+    from app.db import async_session_scope
+    from app.repository import AsyncRepository
+
+    async with async_session_scope() as session:
+        repo = AsyncRepository(session)
+        await repo.get_user("lobby-user")
+        await repo.list_rooms(50, 0, "lobby-user", None, "active", "-created_at")
+
+
+async def _login(mode: str, index: int) -> None:
+    from fastapi.concurrency import run_in_threadpool
+
+    from app.db import async_session_scope, session_scope
+    from app.models import LoginRequest
+    from app.repository import AsyncRepository, Repository
+
+    payload = LoginRequest(provider="guest", display_name=f"{mode}-guest-{index}", password="secret")
+    if mode == "async":
+        async with async_session_scope() as session:
+            await AsyncRepository(session).create_user(payload)
+        return
+
+    def login() -> None:
+        with session_scope() as session:
+            Repository(session).create_user(payload)
+
+    await run_in_threadpool(login)
+
+
+async def _run_mode(mode: str, concurrency: int, requests: int, logins: int) -> dict:
+    from fastapi.concurrency import run_in_threadpool
+
+    latencies: list[float] = []
+    remaining = iter(range(requests))
+    worst_stall = 0.0
+    done = asyncio.Event()
+
+    async def heartbeat() -> None:
+        nonlocal worst_stall
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(HEARTBEAT_S)
+            worst_stall = max(worst_stall, time.perf_counter() - started - HEARTBEAT_S)
+
+    async def login_loop(offset: int) -> None:
+        index = offset
+        while not done.is_set():
+            await _login(mode, index)
+            index += logins
+
+    async def client() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            if mode == "async":
+                await _async_lobby_request()
+            else:
+                await run_in_threadpool(_sync_lobby_request)
+            latencies.append(time.perf_counter() - started)
+
+    background = [asyncio.create_task(heartbeat())]
+    background += [asyncio.create_task(login_loop(offset)) for offset in range(logins)]
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    done.set()
+    await asyncio.gather(*background)
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "stall_ms": worst_stall * 1000,
+    }
+
+
+async def _run_all(concurrency_levels: list[int], requests: int, logins: int) -> list[dict]:
+    # One loop for every run, as in a worker: the async engine's pool is bound to it.
+    return [
+        await _run_mode(mode, concurrency, requests, logins)
+        for concurrency in concurrency_levels
+        for mode in MODES
+    ]
+
+
+def run(concurrency_levels: list[int], requests: int, logins: int) -> list[dict]:
+    _seed()
+    return asyncio.run(_run_all(concurrency_levels, requests, logins))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 400])
+    parser.add_argument("--requests", type=int, default=2000, help="Lobby requests per run")
+    parser.add_argument("--logins", type=int, default=1, help="Concurrent background login loops")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = str(Path(tmp_dir) / "bench.db")
+        os.environ.setdefault("APP_ENV", "development")
+        rows = run(args.concurrency, args.requests, args.logins)
+
+    print(f"{'mode':>10} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'stall ms':>9}")
+    for row in rows:
+        print(
+            f"{row['mode']:>10} {row['concurrency']:>8} {row['rps']:>8.0f} "
+            f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['stall_ms']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Compare OFFSET and cursor pagination latency at increasing page depths.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_pagination --rows 50000 --repeat 20
+
+Seeds ``--rows`` rooms and users, then times ``list_all_rooms`` (default
+``-created_at`` sort) and ``list_users`` for a page at the start, middle and
+end of the table, once with ``offset`` and once with the equivalent cursor.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+PAGE_SIZE = 50
+DEPTHS = (0.0, 0.5, 0.99)
+
+
+def _seed(session, rows: int) -> None:
+    from app.models import Provider, Role, Room, User
+
+    started = datetime(2024, 1, 1)
+    session.add_all(
+        User(id=f"user-{index:07d}", provider=Provider.GOOGLE, role=Role.USER, display_name=f"User {index}")
+        for index in range(rows)
+    )
+    session.flush()
+    session.add_all(
+        Room(
+            code=f"r{index:07d}",
+            name=f"Room {index}",
+            host_user_id="user-0000000",
+            max_players=6,
+            max_spectators=10,
+            visibility="public",
+            created_at=started + timedelta(seconds=index),
+        )
+        for index in range(rows)
+    )
+
+
+def _mean_ms(build, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - started)
+    return statistics.mean(timings) * 1000
+
+
+def run(rows: int, repeat: int) -> list[dict]:
+    from app.db import init_db, session_scope
+    from app.repository import Repository, encode_cursor, room_cursor
+
+    init_db()
+    with session_scope() as session:
+        _seed(session, rows)
+
+    results = []
+    with session_scope() as session:
+        repo = Repository(session)
+        for depth in DEPTHS:
+            offset = int(rows * depth)
+            # The cursor for a page is the key of the row just before it.
+            previous_room = repo.list_all_rooms(1, offset - 1)[0] if offset else None
+            previous_user = repo.list_users(1, offset - 1)[0] if offset else None
+            room_token = room_cursor(previous_room, None) if previous_room else None
+            user_token = encode_cursor(previous_user.id) if previous_user else None
+            results.append(
+                {
+                    "offset": offset,
+                    "rooms_offset_ms": _mean_ms(lambda: repo.list_all_rooms(PAGE_SIZE, offset), repeat),
+                    "rooms_cursor_ms": _mean_ms(
+                        lambda: repo.list_all_rooms(PAGE_SIZE, 0, cursor=room_token), repeat
+                    ),
+                    "users_offset_ms": _mean_ms(lambda: repo.list_users(PAGE_SIZE, offset), repeat),
+                    "users_cursor_ms": _mean_ms(lambda: repo.list_users(PAGE_SIZE, 0, user_token), repeat),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="Rooms and users to seed")
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["DATABASE_URL"] = str(Path(tmp_dir) / "bench.db")
+        os.environ.setdefault("APP_ENV", "development")
+        results = run(args.rows, args.repeat)
+
+    print(f"{'offset':>7} {'rooms offset':>13} {'rooms cursor':>13} {'users offset':>13} {'users cursor':>13}")
+    for row in results:
+        print(
+            f"{row['offset']:>7} {row['rooms_offset_ms']:>13.2f} {row['rooms_cursor_ms']:>13.2f} "
+            f"{row['users_offset_ms']:>13.2f} {row['users_cursor_ms']:>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Compare per-room and batched lobby listing on a seeded SQLite database.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_room_listing --rooms 200 --repeat 20
+
+For each page size the script reports the number of SQL statements and the
+mean latency of building the page with the legacy per-room ``_room_to_read``
+path and with the batched ``_rooms_to_read`` path used by ``list_rooms``.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+PAGE_SIZES = (10, 50, 100)
+
+
+def _configure_database(directory: Path) -> None:
+    os.environ["DATABASE_URL"] = str(directory / "bench.db")
+    os.environ.setdefault("APP_ENV", "development")
+
+
+@contextmanager
+def _count_statements(engine):
+    from sqlalchemy import event
+
+    counter = {"statements": 0}
+
+    def _before_cursor_execute(*_args, **_kwargs):
+        counter["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _seed(session, room_count: int, members_per_room: int) -> None:
+    from app.models import Provider, Role, Room, RoomMembership, User
+
+    users = [
+        User(id=f"user-{index}", provider=Provider.GOOGLE, role=Role.USER, display_name=f"User {index}")
+        for index in range(members_per_room + 1)
+    ]
+    session.add_all(users)
+    roles = ["spectator" if index % 3 == 2 else "player" for index in range(members_per_room)]
+    for index in range(room_count):
+        code = f"r{index:05d}"
+        session.add(
+            Room(
+                code=code,
+                name=f"Room {index}",
+                host_user_id="user-0",
+                max_players=6,
+                max_spectators=10,
+                visibility="public",
+                player_count=roles.count("player"),
+                spectator_count=roles.count("spectator"),
+            )
+        )
+        for member_index, role in enumerate(roles):
+            session.add(RoomMembership(room_code=code, user_id=f"user-{member_index}", role=role))
+    session.flush()
+
+
+def _measure(engine, build, repeat: int) -> tuple[int, float]:
+    timings = []
+    statements = 0
+    for _ in range(repeat):
+        with _count_statements(engine) as counter:
+            started = time.perf_counter()
+            build()
+            timings.append(time.perf_counter() - started)
+        statements = counter["statements"]
+    return statements, statistics.mean(timings) * 1000
+
+
+def run(room_count: int, members_per_room: int, repeat: int) -> list[dict]:
+    from sqlmodel import select
+
+    from app.db import engine, init_db, session_scope
+    from app.models import Room
+    from app.repository import Repository
+
+    init_db()
+    with session_scope() as session:
+        _seed(session, room_count, members_per_room)
+
+    results = []
+    with session_scope() as session:
+        repo = Repository(session)
+        for page_size in PAGE_SIZES:
+            statement = select(Room).order_by(Room.created_at.desc()).limit(page_size)
+
+            def per_room():
+                rooms = session.exec(statement).all()
+                return [repo._room_to_read(room, "user-1") for room in rooms]
+
+            def batched():
+                rooms = session.exec(statement).all()
+                return repo._rooms_to_read(rooms, "user-1")
+
+            legacy_statements, legacy_ms = _measure(engine, per_room, repeat)
+            batched_statements, batched_ms = _measure(engine, batched, repeat)
+            results.append(
+                {
+                    "page_size": page_size,
+                    "per_room_statements": legacy_statements,
+                    "per_room_ms": legacy_ms,
+                    "batched_statements": batched_statements,
+                    "batched_ms": batched_ms,
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rooms", type=int, default=200, help="Rooms to seed")
+    parser.add_argument("--members", type=int, default=4, help="Memberships per room")
+    parser.add_argument("--repeat", type=int, default=20, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        _configure_database(Path(tmp_dir))
+        results = run(args.rooms, args.members, args.repeat)
+
+    print(f"{'page':>5} {'per-room SQL':>13} {'per-room ms':>12} {'batched SQL':>12} {'batched ms':>11}")
+    for row in results:
+        print(
+            f"{row['page_size']:>5} {row['per_room_statements']:>13} {row['per_room_ms']:>12.2f} "
+            f"{row['batched_statements']:>12} {row['batched_ms']:>11.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Compare SQLite engine profiles under concurrent writers.
+
+Run from the ``server`` directory::
+
+    python -m benchmarks.bench_write_contention --workers 8 --ops 200
+
+Each profile gets a fresh database. ``--workers`` processes (like uvicorn
+workers) then alternate guest sign-ups, which look a user up by display name
+and insert it, with joins into one shared room, which update its counters. The
+report lists throughput, latency percentiles and how many operations failed
+with ``database is locked``.
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from benchmarks._stats import percentile
+
+PROFILES = {
+    "default": {"DATABASE_PROFILE": "default"},
+    "tuned": {"DATABASE_PROFILE": "tuned"},
+    "tuned-full-sync": {"DATABASE_PROFILE": "tuned", "SQLITE_SYNCHRONOUS": "full"},
+}
+ROOM_CODE = "BENCH1"
+
+
+def _configure(database_url: str, profile: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("APP_ENV", "development")
+    for key in ("DATABASE_PROFILE", "SQLITE_SYNCHRONOUS"):
+        os.environ.pop(key, None)
+    os.environ.update(PROFILES[profile])
+
+
+def _seed() -> None:
+    from app.db import init_db, session_scope
+    from app.models import Provider, Role, Room, RoomMembership, User
+
+    init_db()
+    with session_scope() as session:
+        session.add(User(id="bench-host", provider=Provider.GOOGLE, role=Role.USER, display_name="Host"))
+        session.flush()
+        session.add(
+            Room(
+                code=ROOM_CODE,
+                name="Contention",
+                host_user_id="bench-host",
+                max_players=1_000_000,
+                max_spectators=0,
+                visibility="public",
+                player_count=1,
+            )
+        )
+        session.flush()
+        session.add(RoomMembership(room_code=ROOM_CODE, user_id="bench-host", role="player"))
+
+
+def _seed_in_process(database_url: str, profile: str) -> None:
+    _configure(database_url, profile)
+    _seed()
+
+
+def _worker(database_url: str, profile: str, worker_index: int, ops: int, barrier) -> dict:
+    _configure(database_url, profile)
+    from sqlalchemy.exc import OperationalError
+
+    from app.db import session_scope
+    from app.models import Provider, Role, User
+    from app.repository import Repository
+
+    latencies: list[float] = []
+    locked = 0
+    # Start together once every process has imported the app, so startup is not timed.
+    barrier.wait()
+    began = time.perf_counter()
+    for op_index in range(ops):
+        user_id = f"w{worker_index}-u{op_index // 2}"
+        started = time.perf_counter()
+        try:
+            with session_scope() as session:
+                repo = Repository(session)
+                if op_index % 2 == 0:
+                    if repo._get_user_by_display_name(Provider.GUEST, user_id) is None:
+                        session.add(User(id=user_id, provider=Provider.GUEST, role=Role.USER, display_name=user_id))
+                else:
+                    repo.join_room(ROOM_CODE, user_id, as_spectator=False)
+        except OperationalError as error:
+            if "locked" not in str(error):
+                raise
+            locked += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    return {"latencies": latencies, "locked": locked, "elapsed": time.perf_counter() - began}
+
+
+def run(profile: str, workers: int, ops: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_url = str(Path(tmp_dir) / "bench.db")
+        with ProcessPoolExecutor(max_workers=1) as seeder:
+            seeder.submit(_seed_in_process, database_url, profile).result()
+        with multiprocessing.Manager() as manager, ProcessPoolExecutor(max_workers=workers) as executor:
+            barrier = manager.Barrier(workers)
+            futures = [
+                executor.submit(_worker, database_url, profile, index, ops, barrier) for index in range(workers)
+            ]
+            results = [future.result() for future in futures]
+        elapsed = max(result["elapsed"] for result in results)
+
+    latencies = [sample for result in results for sample in result["latencies"]]
+    return {
+        "profile": profile,
+        "ok": len(latencies),
+        "locked": sum(result["locked"] for result in results),
+        "ops_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else 0.0,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else 0.0,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent writer processes")
+    parser.add_argument("--ops", type=int, default=200, help="Operations per worker")
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=list(PROFILES))
+    args = parser.parse_args()
+
+    print(f"{'profile':>16} {'ok':>6} {'locked':>7} {'ops/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for profile in args.profiles:
+        row = run(profile, args.workers, args.ops)
+        print(
+            f"{row['profile']:>16} {row['ok']:>6} {row['locked']:>7} {row['ops_per_s']:>8.0f} "
+            f"{row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['mean_ms']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()